@@ -1,75 +1,285 @@
 """ Resume Analysis Agent """
+import time
 import logging
-from typing import Optional
-from dotenv import load_dotenv
-from llama_index.core.agent.workflow import FunctionAgent
-from llama_index.llms.openai import OpenAI
+import threading
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional
+from candidate_search import search_candidates
+import llm_registry
+from llama_index.core.agent.workflow import AgentStream, FunctionAgent, ToolCall, ToolCallResult
 from llama_index.core.tools import FunctionTool
 from prompts import AGENT_SYSTEM_PROMPT
 from resume_skill import analyze_resume,query_resume
-load_dotenv()
+from resume_store import get_resume_store
+from scheduler import priority
+from singleflight import get_flight_group
+from text_utils import content_hash
+from tracing import latency_percentiles
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-)
 logger = logging.getLogger(__name__)
 
-llm = OpenAI(model="gpt-3.5-turbo")
+def analyze_stored_resume(resume_id: str) -> Dict[str, Any]:
+    """Run the full analysis pipeline on a stored resume.
+
+    Args:
+        resume_id (str): ID of the resume, as given in the user message.
+    """
+    return analyze_resume(get_resume_store().get(resume_id), resume_id=resume_id)
+
+
+def query_stored_resume(resume_id: str, query: str) -> str:
+    """Answer a question about a stored resume.
+
+    Args:
+        resume_id (str): ID of the resume, as given in the user message.
+        query (str): The question to answer from the resume.
+    """
+    resume_text = get_resume_store().get(resume_id)
+    return query_resume(resume_text=resume_text, query=query, resume_id=resume_id)
+
 
 analyze_resume_tool = FunctionTool.from_defaults(
     name="analyze_resume",
     description=(
-        "Use this tool when the user provides resume text and wants it analyzed. "
-        "The tool extracts skills, experience, projects, seniority, strengths, weaknesses, "
-        "and produces a structured evaluation of the resume."
+        "Use this tool when the user wants a resume analyzed. Pass the resume_id "
+        "from the user message. The tool extracts skills, experience, projects, "
+        "seniority, strengths, weaknesses, and produces a structured evaluation of the resume."
     ),
-    fn=analyze_resume
+    fn=analyze_stored_resume
 )
 
 query_resume_tool = FunctionTool.from_defaults(
     name="query_resume_data",
     description=(
         "Use this tool when the user asks a question about a resume or wants to retrieve "
-        "information from it. This tool answers queries such as skills, tech stack, "
-        "experience match, and specific capability checks using the provided resume text."
+        "information from it. Pass the resume_id from the user message and the question. "
+        "This tool answers queries such as skills, tech stack, experience match, and "
+        "specific capability checks."
+    ),
+    fn=query_stored_resume
+)
+
+def search_analyzed_candidates(query: str, min_years: Optional[float] = None,
+                               role_type: Optional[str] = None,
+                               top_k: int = 5) -> List[Dict[str, Any]]:
+    """Find the best matching candidates among every analyzed resume.
+
+    Args:
+        query (str): What to look for, e.g. "Python developers with RAG experience".
+        min_years (Optional[float]): Minimum years of experience.
+        role_type (Optional[str]): TECH, NON_TECH or UNKNOWN.
+        top_k (int): Number of candidates to return.
+    """
+    matches = search_candidates(query=query, min_years=min_years,
+                                role_type=role_type, top_k=top_k)
+    return [
+        {
+            "resume_id": match.resume_id,
+            "score": match.score,
+            "matched_skills": match.matched_skills,
+            "role_type": match.profile.role_type.value,
+            "years_of_experience": match.profile.years_of_experience,
+            "summary": match.profile.summary,
+        }
+        for match in matches
+    ]
+
+
+search_candidates_tool = FunctionTool.from_defaults(
+    name="search_candidates",
+    description=(
+        "Use this tool when the user wants to find candidates across all analyzed "
+        "resumes (e.g. 'Show me Python developers with RAG experience'). Returns "
+        "ranked resume_ids with matched skills, experience and summary."
     ),
-    fn=query_resume
+    fn=search_analyzed_candidates
 )
 
+def build_resume_agent(tools: Optional[List[FunctionTool]] = None) -> FunctionAgent:
+    """Create a resume FunctionAgent (defaults to the shared analyze/query tools)."""
+    return FunctionAgent(
+        name="Resume Agent",
+        tools=tools or [analyze_resume_tool, query_resume_tool, search_candidates_tool],
+        system_prompt=AGENT_SYSTEM_PROMPT,
+        llm=llm_registry.get_agent_llm()
+    )
+
+
+_resume_agent: Optional[FunctionAgent] = None
+
+
+def get_resume_agent() -> FunctionAgent:
+    """Return the shared stateless agent used by one-shot runs.
+
+    Each ``run`` without a ``Context`` starts from empty memory, so one
+    instance can serve concurrent calls.
+    """
+    global _resume_agent  # pylint: disable=global-statement
+    if _resume_agent is None:
+        _resume_agent = build_resume_agent()
+    return _resume_agent
+
+
 async def run_resume_agent(resume_text: Optional[str] = None,
-                           query: Optional[str] = None) -> str:
+                           query: Optional[str] = None,
+                           resume_id: Optional[str] = None) -> str:
     """Run the resume analysis agent.
 
+    The resume is stored once and only its ID plus a short synopsis are sent
+    to the LLM; the tools look the full text up by ID.
+
+    Concurrent runs with the same prompt (resume ID, which defaults to the
+    normalized content hash, plus query) share one agent run. Its LLM calls
+    are scheduled as "interactive" unless the caller set a priority.
+
     Args:
         resume_text (Optional[str]): The resume text provided by the user.
         query (Optional[str]): A follow-up query related to the resume.
+        resume_id (Optional[str]): ID of an already stored resume, or the ID to
+            store resume_text under.
 
     Returns:
         str: The agent's final response.
 
     Raises:
-        ValueError: If neither resume_text nor query is provided.
+        ValueError: If neither resume_text nor resume_id is provided.
+        UnknownResumeError: If resume_id is unknown and no resume_text is given.
     """
-    agent_worker = FunctionAgent(
-        name="Resume Agent",
-        tools=[analyze_resume_tool, query_resume_tool],
-        system_prompt=AGENT_SYSTEM_PROMPT,
-        llm=llm
-    )
+    agent_worker = get_resume_agent()
+    prompt = build_agent_prompt(resume_text=resume_text, query=query, resume_id=resume_id)
+    with priority("interactive", override=False):
+        response, shared = await get_flight_group("run_resume_agent").ado(
+            content_hash(prompt), lambda: _run_agent(agent_worker, prompt))
+    if shared:
+        logger.info("Joined an in-flight agent run for the same resume and query.")
+    #print(response)
+    return response
 
-    if resume_text and query:
-        prompt = (
-            "Analyze the resume and then answer the query.\n\n"
-            f"Resume:\n{resume_text}\n\nQuery: {query}"
-        )
 
-    elif resume_text and not query:
-        prompt = f"Analyze the resume:\n\n{resume_text}"
+async def _run_agent(agent_worker: FunctionAgent, prompt: str):
+    return await agent_worker.run(user_msg=prompt)
 
-    else:
-        raise ValueError("You must provide at least resume_text or query")
 
-    response = await agent_worker.run(user_msg=prompt)
-    #print(response)
-    return response
+def agent_coalescing_stats() -> Dict[str, int]:
+    """How many ``run_resume_agent`` calls ran the agent vs. joined one in flight."""
+    return get_flight_group("run_resume_agent").stats()
+
+
+def store_agent_resume(resume_text: Optional[str] = None,
+                       resume_id: Optional[str] = None) -> str:
+    """Store resume_text (when given) and return the ID the agent refers to.
+
+    Raises:
+        ValueError: If neither resume_text nor resume_id is provided.
+        UnknownResumeError: If resume_id is unknown and no resume_text is given.
+    """
+    if not resume_text and not resume_id:
+        raise ValueError("You must provide at least resume_text or resume_id")
+    store = get_resume_store()
+    if resume_text:
+        return store.put(resume_text, resume_id=resume_id)
+    store.get(resume_id)
+    return resume_id
+
+
+def build_agent_prompt(resume_text: Optional[str] = None,
+                       query: Optional[str] = None,
+                       resume_id: Optional[str] = None) -> str:
+    """Store the resume if needed and build the ID + synopsis user message.
+
+    Raises:
+        ValueError: If neither resume_text nor resume_id is provided.
+        UnknownResumeError: If resume_id is unknown and no resume_text is given.
+    """
+    resume_id = store_agent_resume(resume_text, resume_id)
+    handle = f"resume_id: {resume_id}\nSynopsis: {get_resume_store().synopsis(resume_id)}"
+
+    if query:
+        return f"Analyze the resume and then answer the query.\n\n{handle}\n\nQuery: {query}"
+    return f"Analyze the resume:\n\n{handle}"
+
+
+class StreamingMetrics:
+    """Rolling time-to-first-token and total-duration samples for streamed runs."""
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self._ttft: Deque[float] = deque(maxlen=window)
+        self._total: Deque[float] = deque(maxlen=window)
+
+    def record(self, ttft: Optional[float], total: float) -> None:
+        """Add one finished run."""
+        with self._lock:
+            if ttft is not None:
+                self._ttft.append(ttft)
+            self._total.append(total)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Count plus p50/p95 of time-to-first-token and total time, in milliseconds."""
+        with self._lock:
+            return {
+                "runs": len(self._total),
+                "time_to_first_token": latency_percentiles(self._ttft, (50, 95)),
+                "total_time": latency_percentiles(self._total, (50, 95)),
+            }
+
+
+streaming_metrics = StreamingMetrics()
+
+
+async def stream_resume_agent(resume_text: Optional[str] = None,
+                              query: Optional[str] = None,
+                              resume_id: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+    """Streaming variant of ``run_resume_agent``.
+
+    Yields event dicts as the agent works:
+
+    - ``{"type": "tool_call", "tool", "arguments"}`` when a tool starts
+    - ``{"type": "tool_result", "tool", "output", ...}`` when it finishes; for
+      ``analyze_resume`` also ``router``, ``profile`` and ``faithfulness_score``
+    - ``{"type": "token", "delta"}`` for every LLM token delta
+    - ``{"type": "done", "response", "time_to_first_token", "total_time"}`` last
+
+    Every event carries ``elapsed`` (seconds since the call started).
+
+    Raises:
+        ValueError: If neither resume_text nor resume_id is provided.
+        UnknownResumeError: If resume_id is unknown and no resume_text is given.
+    """
+    start = time.perf_counter()
+    ttft: Optional[float] = None
+    prompt = build_agent_prompt(resume_text=resume_text, query=query, resume_id=resume_id)
+    # The workflow's tasks start here and keep this context's priority
+    with priority("interactive", override=False):
+        handler = get_resume_agent().run(user_msg=prompt)
+
+    async for event in handler.stream_events():
+        elapsed = time.perf_counter() - start
+        if isinstance(event, AgentStream):
+            if not event.delta:
+                continue
+            if ttft is None:
+                ttft = elapsed
+            yield {"type": "token", "delta": event.delta, "elapsed": elapsed}
+        elif isinstance(event, ToolCallResult):
+            yield {"type": "tool_result", "tool": event.tool_name, "elapsed": elapsed,
+                   **_tool_result_fields(event)}
+        elif isinstance(event, ToolCall):
+            yield {"type": "tool_call", "tool": event.tool_name,
+                   "arguments": event.tool_kwargs, "elapsed": elapsed}
+
+    response = await handler
+    total = time.perf_counter() - start
+    streaming_metrics.record(ttft, total)
+    yield {"type": "done", "response": str(response), "elapsed": total,
+           "time_to_first_token": ttft, "total_time": total}
+
+
+def _tool_result_fields(event: ToolCallResult) -> Dict[str, Any]:
+    raw = getattr(event.tool_output, "raw_output", None)
+    fields: Dict[str, Any] = {"output": str(event.tool_output)}
+    if isinstance(raw, dict) and "passed_check" in raw:
+        classification = raw.get("classification")
+        fields["router"] = raw.get("route")
+        fields["profile"] = classification.model_dump(mode="json") if classification else None
+        fields["faithfulness_score"] = (raw.get("evaluation") or {}).get("faithfulness_score")
+    return fields
@@ -0,0 +1,144 @@
+""" Batch Resume Analysis """
+import os
+import asyncio
+import logging
+import itertools
+from collections import deque
+from typing import Any, AsyncIterable, AsyncIterator, Dict, Iterable, Optional, Tuple, Union
+from doc_extract import DEFAULT_TIMEOUT, aextract_documents
+from resume_skill import aanalyze_resume
+from scheduler import PRIORITIES, priority
+from text_utils import make_resume_id
+
+logger = logging.getLogger(__name__)
+
+ResumeItem = Union[str, Tuple[str, str]]
+
+
+async def analyze_resumes(resumes: Union[Iterable[ResumeItem], AsyncIterable[ResumeItem]],
+                          concurrency: int = 8,
+                          index_candidates: bool = True,
+                          priority_class: str = "bulk") -> AsyncIterator[Dict[str, Any]]:
+    """Analyze many resumes concurrently, yielding results as they complete.
+
+    The input is consumed lazily and at most ``concurrency`` analyses are in
+    flight at once, so arbitrarily large corpora run in bounded memory. A
+    failure on one resume is reported on its result and never aborts the batch.
+
+    Args:
+        resumes: Resume texts, or ``(resume_id, resume_text)`` pairs. May be a
+            regular or an async iterable.
+        concurrency (int): Maximum number of resumes analyzed at the same time.
+        index_candidates (bool): Add passed profiles to the candidate search
+            index (see ``aanalyze_resume``).
+        priority_class (str): Scheduler class of the LLM calls ("bulk" by
+            default, so interactive queries are served first); an enclosing
+            ``scheduler.priority`` block wins. A resume whose calls are
+            dropped at the bulk deadline is reported with an error.
+
+    Yields:
+        Dict[str, Any]: ``{"index", "resume_id", "result", "error"}`` where
+        ``result`` is the ``analyze_resume`` dict (None on error) and ``error``
+        is the error message (None on success). Order is completion order.
+
+    Raises:
+        ValueError: If concurrency is less than 1 or priority_class is unknown.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1.")
+    if priority_class not in PRIORITIES:
+        raise ValueError(f"Unknown priority {priority_class!r}; expected one of {PRIORITIES}")
+
+    pending = set()
+    index = 0
+    async for item in _aiter(resumes):
+        resume_id, resume_text = _unpack(item)
+        pending.add(asyncio.ensure_future(
+            _analyze_one(index, resume_id, resume_text, index_candidates, priority_class)))
+        index += 1
+        if len(pending) >= concurrency:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            yield task.result()
+
+
+async def analyze_documents(paths: Iterable[str],
+                            concurrency: int = 8,
+                            max_workers: Optional[int] = None,
+                            timeout: Optional[float] = DEFAULT_TIMEOUT,
+                            index_candidates: bool = True) -> AsyncIterator[Dict[str, Any]]:
+    """Extract PDF / DOCX / HTML / text files and analyze them as one stream.
+
+    Text extraction runs in a process pool (``doc_extract.aextract_documents``)
+    and each document is handed to ``analyze_resumes`` as soon as it is
+    extracted, so the CPU-bound and LLM-bound stages overlap.
+
+    Args:
+        paths (Iterable[str]): Input files; consumed lazily.
+        concurrency (int): Maximum number of resumes analyzed at the same time.
+        max_workers (Optional[int]): Extraction processes (default: one per core).
+        timeout (Optional[float]): Per-file extraction limit in seconds.
+        index_candidates (bool): Add passed profiles to the candidate search index.
+
+    Yields:
+        Dict[str, Any]: ``analyze_resumes`` items plus ``path``. The resume ID
+        is the file name without its extension. A file whose extraction
+        failed is yielded with ``result`` None and the extraction ``error``.
+    """
+    failed: deque = deque()
+    # analyze_resumes index -> path, for the in-flight window only
+    paths_by_position: Dict[int, str] = {}
+    positions = itertools.count()
+
+    async def texts() -> AsyncIterator[Tuple[str, str]]:
+        async for document in aextract_documents(paths, max_workers=max_workers,
+                                                 timeout=timeout):
+            resume_id = os.path.splitext(os.path.basename(document.path))[0]
+            if document.error is not None:
+                failed.append({"index": None, "resume_id": resume_id, "path": document.path,
+                               "result": None, "error": document.error})
+                continue
+            paths_by_position[next(positions)] = document.path
+            yield resume_id, document.text
+
+    async for item in analyze_resumes(texts(), concurrency=concurrency,
+                                      index_candidates=index_candidates):
+        while failed:
+            yield failed.popleft()
+        yield {**item, "path": paths_by_position.pop(item["index"])}
+    while failed:
+        yield failed.popleft()
+
+
+async def _analyze_one(index: int, resume_id: str, resume_text: str,
+                       index_candidate: bool, priority_class: str) -> Dict[str, Any]:
+    try:
+        # Runs in its own task, so the priority stays with this resume's calls
+        with priority(priority_class, override=False):
+            result = await aanalyze_resume(resume_text, resume_id,
+                                           index_candidate=index_candidate)
+        return {"index": index, "resume_id": resume_id, "result": result, "error": None}
+    except Exception as e:  # pylint: disable=broad-except
+        logger.error("Batch item %s (%s) failed: %s", index, resume_id, e)
+        return {"index": index, "resume_id": resume_id, "result": None, "error": str(e)}
+
+
+def _unpack(item: ResumeItem) -> Tuple[str, str]:
+    if isinstance(item, str):
+        return make_resume_id(item), item
+    resume_id, resume_text = item
+    return resume_id, resume_text
+
+
+async def _aiter(items: Union[Iterable[ResumeItem], AsyncIterable[ResumeItem]]):
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
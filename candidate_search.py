@@ -0,0 +1,377 @@
+""" Hybrid Candidate Search """
+import re
+import time
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Set
+import numpy as np
+import llm_registry
+from field_extractor import get_skill_matcher
+from schema import CandidateMatch, Profile, RoleType
+
+logger = logging.getLogger(__name__)
+
+# Standard reciprocal rank fusion constant
+RRF_K = 60
+# Hits taken from each ranking (structured, vector) before fusion
+FUSION_CANDIDATES = 200
+# Summaries per embedding request in the background embedder
+EMBED_BATCH = 256
+# Seconds the background embedder waits before retrying a failed request
+EMBED_RETRY_DELAY = 5.0
+
+_ROLE_CODES = {role: code for code, role in enumerate(RoleType)}
+_MIN_YEARS_RE = re.compile(r"(\d{1,2}(?:\.\d+)?)\s*\+?\s*(?:years?|yrs?)\b", re.IGNORECASE)
+
+
+def normalize_skill(skill: str) -> Optional[str]:
+    """Canonical lower-case skill key ("postgres" → "postgresql"); None for placeholders."""
+    skill = skill.strip()
+    if not skill or skill.startswith("MISSING_FIELD"):
+        return None
+    found = get_skill_matcher().find(skill)
+    return (found[0] if found else skill).lower()
+
+
+class CandidateSearchIndex:
+    """
+    In-memory search over classified ``Profile`` records.
+
+    Every resume owns one row in a set of numpy columns:
+      - ``years`` / ``confidence`` (NaN when missing) for range filters
+      - ``role`` code for role_type filtering
+      - a unit-normalized summary embedding, filled in batches by a
+        background thread (``flush``) that ``add`` wakes
+    plus an inverted index skill → rows over normalized ``technical_skills``.
+
+    The skill-match ranking and the summary-similarity ranking are combined
+    with reciprocal rank fusion. A query is a few vectorized passes over the
+    columns and one matrix-vector product — no LLM calls. Embedding requests
+    never run under the index lock: a search ranks the summaries embedded
+    so far, and a failed request leaves its summaries pending for a retry.
+    """
+    def __init__(self, embed_model: Any = None, embed_summaries: bool = True,
+                 initial_capacity: int = 1024, background_embedding: bool = True):
+        self._embed_model = embed_model
+        self.embed_summaries = embed_summaries
+        self.background_embedding = background_embedding
+        self._lock = threading.RLock()
+        # One flush at a time; taken before _lock, never while holding it
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._embedder: Optional[threading.Thread] = None
+        self._profiles: Dict[str, Profile] = {}
+        self._rows: Dict[str, int] = {}
+        self._row_ids: List[Optional[str]] = []
+        self._free_rows: List[int] = []
+        self._skills: Dict[str, Set[int]] = {}
+        self._skill_arrays: Dict[str, np.ndarray] = {}
+        self._skills_by_id: Dict[str, List[str]] = {}
+        self._pending: Dict[str, str] = {}
+        self._alive = np.zeros(initial_capacity, dtype=bool)
+        self._years = np.full(initial_capacity, np.nan, dtype=np.float32)
+        self._confidence = np.full(initial_capacity, np.nan, dtype=np.float32)
+        self._role = np.full(initial_capacity, -1, dtype=np.int8)
+        self._embedded = np.zeros(initial_capacity, dtype=bool)
+        self._vectors: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self._profiles)
+
+    def __contains__(self, resume_id: str) -> bool:
+        return resume_id in self._profiles
+
+    def add(self, resume_id: str, profile: Profile) -> None:
+        """Insert or replace the record for resume_id."""
+        with self._lock:
+            if resume_id in self._profiles:
+                self._remove(resume_id)
+            row = self._allocate(resume_id)
+            self._profiles[resume_id] = profile
+
+            skills = sorted({key for key in map(normalize_skill, _list(profile.technical_skills))
+                             if key})
+            self._skills_by_id[resume_id] = skills
+            for skill in skills:
+                self._skills.setdefault(skill, set()).add(row)
+                self._skill_arrays.pop(skill, None)
+            self._alive[row] = True
+            self._years[row] = _number(profile.years_of_experience)
+            self._confidence[row] = _number(profile.confidence_score)
+            self._role[row] = _ROLE_CODES.get(profile.role_type, -1)
+            summary = profile.summary
+            if self.embed_summaries and summary and not summary.startswith("MISSING_FIELD"):
+                self._pending[resume_id] = summary
+                if self.background_embedding:
+                    self._start_embedder()
+                    self._wake.set()
+
+    def remove(self, resume_id: str) -> None:
+        """Drop resume_id from every index (no-op when unknown)."""
+        with self._lock:
+            if resume_id in self._profiles:
+                self._remove(resume_id)
+
+    def get(self, resume_id: str) -> Profile:
+        """Return the stored profile.
+
+        Raises:
+            KeyError: If resume_id is not indexed.
+        """
+        return self._profiles[resume_id]
+
+    def search(self,
+               query: Optional[str] = None,
+               skills: Optional[List[str]] = None,
+               min_years: Optional[float] = None,
+               max_years: Optional[float] = None,
+               min_confidence: Optional[float] = None,
+               max_confidence: Optional[float] = None,
+               role_type: Optional[RoleType] = None,
+               require_all_skills: bool = False,
+               top_k: int = 10) -> List[CandidateMatch]:
+        """Rank indexed candidates for a query.
+
+        Args:
+            query (Optional[str]): Free text, e.g. "Python developers with RAG
+                experience". Skills and "N+ years" are parsed from it when
+                ``skills`` / ``min_years`` are not given, and it drives the
+                summary similarity ranking.
+            skills (Optional[List[str]]): Skills to match (aliases accepted).
+            min_years, max_years (Optional[float]): Inclusive experience range.
+            min_confidence, max_confidence (Optional[float]): Inclusive
+                classifier confidence range.
+            role_type (Optional[RoleType]): Restrict to one role type.
+            require_all_skills (bool): Keep only candidates having every skill.
+            top_k (int): Number of matches to return.
+
+        Returns:
+            List[CandidateMatch]: Best matches first.
+        """
+        if skills is None and query:
+            skills = get_skill_matcher().find(query)
+        wanted = list(dict.fromkeys(key for key in map(normalize_skill, skills or []) if key))
+        if min_years is None and query:
+            match = _MIN_YEARS_RE.search(query)
+            min_years = float(match.group(1)) if match else None
+
+        query_vector = self._query_vector(query) if query else None
+        with self._lock:
+            size = len(self._row_ids)
+            mask = self._filter_mask(size, min_years, max_years,
+                                     min_confidence, max_confidence, role_type)
+            counts = np.zeros(size, dtype=np.int16)
+            for skill in wanted:
+                counts[self._skill_rows(skill)] += 1
+            if require_all_skills and wanted:
+                mask &= counts == len(wanted)
+
+            # Rank by matched skills, then experience, then confidence
+            tie_break = (np.nan_to_num(self._years[:size], nan=0.0) * 10.0
+                         + np.nan_to_num(self._confidence[:size], nan=0.0))
+            if wanted:
+                structured = _top_rows(np.where(mask & (counts > 0), counts * 1e4 + tie_break,
+                                                -np.inf), FUSION_CANDIDATES)
+            else:
+                structured = np.empty(0, dtype=np.int64)
+            semantic = self._semantic_rows(query_vector, mask)
+            if not wanted and not len(semantic):
+                # Filters only
+                structured = _top_rows(np.where(mask, tie_break, -np.inf), top_k)
+
+            scores: Dict[int, float] = {}
+            for ranking in (structured, semantic):
+                for rank, row in enumerate(ranking.tolist()):
+                    scores[row] = scores.get(row, 0.0) + 1.0 / (RRF_K + rank + 1)
+
+            best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+            wanted_set = set(wanted)
+            matches = []
+            for row, score in best:
+                resume_id = self._row_ids[row]
+                matches.append(CandidateMatch.model_construct(
+                    resume_id=resume_id,
+                    score=round(score, 6),
+                    matched_skills=[s for s in self._skills_by_id[resume_id] if s in wanted_set],
+                    profile=self._profiles[resume_id],
+                ))
+            return matches
+
+    def flush(self) -> int:
+        """Embed every pending summary, ``EMBED_BATCH`` per request.
+
+        The embedding requests run outside the index lock. A summary leaves
+        the pending set only once its vector is written, so a failed request
+        loses nothing; summaries replaced or removed meanwhile are skipped.
+
+        Returns:
+            int: Number of vectors written.
+
+        Raises:
+            Exception: Whatever the embedding model raised (pending summaries stay).
+        """
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = list(self._pending.items())[:EMBED_BATCH]
+                if not batch:
+                    return written
+                vectors = np.asarray(self._get_embed_model().get_text_embedding_batch(
+                    [text for _, text in batch]), dtype=np.float32)
+                vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+                with self._lock:
+                    if self._vectors is None:
+                        self._vectors = np.zeros((len(self._alive), vectors.shape[1]),
+                                                 dtype=np.float32)
+                    for (resume_id, text), vector in zip(batch, vectors):
+                        if self._pending.get(resume_id) is not text:
+                            continue  # replaced or removed while embedding
+                        del self._pending[resume_id]
+                        row = self._rows[resume_id]
+                        self._vectors[row] = vector
+                        self._embedded[row] = True
+                        written += 1
+
+    def pending(self) -> int:
+        """Summaries not embedded yet (not yet visible to similarity ranking)."""
+        with self._lock:
+            return len(self._pending)
+
+    def _start_embedder(self) -> None:
+        if self._embedder is not None and self._embedder.is_alive():
+            return
+
+        def loop() -> None:
+            while True:
+                self._wake.wait()
+                self._wake.clear()
+                try:
+                    self.flush()
+                except Exception as e:  # pylint: disable=broad-except
+                    logger.warning("Embedding profile summaries failed; retrying in %ss: %s",
+                                   EMBED_RETRY_DELAY, e)
+                    time.sleep(EMBED_RETRY_DELAY)
+                    self._wake.set()
+
+        self._embedder = threading.Thread(target=loop, name="candidate-embedder", daemon=True)
+        self._embedder.start()
+
+    def _filter_mask(self, size: int, min_years, max_years, min_confidence,
+                     max_confidence, role_type) -> np.ndarray:
+        mask = self._alive[:size].copy()
+        for column, low, high in ((self._years, min_years, max_years),
+                                  (self._confidence, min_confidence, max_confidence)):
+            # NaN (missing) fails every comparison, so it drops out here
+            if low is not None:
+                mask &= column[:size] >= low
+            if high is not None:
+                mask &= column[:size] <= high
+        if role_type is not None:
+            mask &= self._role[:size] == _ROLE_CODES[RoleType(role_type)]
+        return mask
+
+    def _query_vector(self, query: str) -> Optional[np.ndarray]:
+        """Unit query embedding, or None when no summary is embedded yet."""
+        if not self.embed_summaries or self._vectors is None:
+            return None
+        vector = np.asarray(self._get_embed_model().get_query_embedding(query), dtype=np.float32)
+        return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+    def _semantic_rows(self, query_vector: Optional[np.ndarray], mask: np.ndarray) -> np.ndarray:
+        if query_vector is None or self._vectors is None:
+            return np.empty(0, dtype=np.int64)
+        size = len(mask)
+        scores = self._vectors[:size] @ query_vector
+        return _top_rows(np.where(mask & self._embedded[:size], scores, -np.inf),
+                         FUSION_CANDIDATES)
+
+    def _skill_rows(self, skill: str) -> np.ndarray:
+        rows = self._skill_arrays.get(skill)
+        if rows is None:
+            postings = self._skills.get(skill, ())
+            rows = np.fromiter(postings, dtype=np.int64, count=len(postings))
+            self._skill_arrays[skill] = rows
+        return rows
+
+    def _allocate(self, resume_id: str) -> int:
+        if self._free_rows:
+            row = self._free_rows.pop()
+            self._row_ids[row] = resume_id
+        else:
+            row = len(self._row_ids)
+            self._row_ids.append(resume_id)
+            if row >= len(self._alive):
+                self._grow(2 * len(self._alive))
+        self._rows[resume_id] = row
+        return row
+
+    def _grow(self, capacity: int) -> None:
+        def grown(column: np.ndarray, fill) -> np.ndarray:
+            new = np.full((capacity,) + column.shape[1:], fill, dtype=column.dtype)
+            new[:len(column)] = column
+            return new
+
+        self._alive = grown(self._alive, False)
+        self._years = grown(self._years, np.nan)
+        self._confidence = grown(self._confidence, np.nan)
+        self._role = grown(self._role, -1)
+        self._embedded = grown(self._embedded, False)
+        if self._vectors is not None:
+            self._vectors = grown(self._vectors, 0.0)
+
+    def _remove(self, resume_id: str) -> None:
+        self._profiles.pop(resume_id)
+        row = self._rows.pop(resume_id)
+        for skill in self._skills_by_id.pop(resume_id, []):
+            postings = self._skills.get(skill)
+            if postings is not None:
+                postings.discard(row)
+                self._skill_arrays.pop(skill, None)
+                if not postings:
+                    del self._skills[skill]
+        self._pending.pop(resume_id, None)
+        self._alive[row] = False
+        self._embedded[row] = False
+        self._row_ids[row] = None
+        self._free_rows.append(row)
+
+    def _get_embed_model(self):
+        if self._embed_model is None:
+            self._embed_model = llm_registry.get_embed_model()
+        return self._embed_model
+
+
+def _top_rows(scores: np.ndarray, limit: int) -> np.ndarray:
+    """Rows of the ``limit`` highest finite scores, best first."""
+    finite = np.flatnonzero(np.isfinite(scores))
+    if len(finite) > limit:
+        finite = finite[np.argpartition(-scores[finite], limit - 1)[:limit]]
+    return finite[np.argsort(-scores[finite], kind="stable")]
+
+
+def _list(value: Any) -> List[str]:
+    return [v for v in value if isinstance(v, str)] if isinstance(value, list) else []
+
+
+def _number(value: Any) -> float:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return np.nan
+
+
+_candidate_index: Optional[CandidateSearchIndex] = None
+
+
+def get_candidate_index() -> CandidateSearchIndex:
+    """Return the process-wide candidate search index, creating it on first use."""
+    global _candidate_index  # pylint: disable=global-statement
+    if _candidate_index is None:
+        _candidate_index = CandidateSearchIndex()
+    return _candidate_index
+
+
+def search_candidates(query: Optional[str] = None, top_k: int = 10,
+                      **filters: Any) -> List[CandidateMatch]:
+    """Search every analyzed resume (see ``CandidateSearchIndex.search``)."""
+    return get_candidate_index().search(query=query, top_k=top_k, **filters)
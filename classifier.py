@@ -1,46 +1,416 @@
 """Profile classification schema used for structured metadata extraction."""
 
+import json
+import asyncio
 import logging
-from llama_index.llms.openai import OpenAI
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from pydantic import ValidationError
+from llama_index.core.output_parsers import PydanticOutputParser
+from llama_index.core.output_parsers.utils import extract_json_str
 from llama_index.core.program import LLMTextCompletionProgram
-from dotenv import load_dotenv
-from schema import Profile
-from prompts import CLASSIFIER_PROMPT
-# Load environment variables
-load_dotenv()
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
+import llm_registry
+from schema import (
+    BatchRoleAssessment, ContactInfo, Profile, ResumeRoleAssessment, RoleAssessment,
+    ExtractedFields, LLM_PROFILE_FIELDS, profile_from_dict
 )
+from prompts import CLASSIFIER_PROMPT, CLASSIFIER_BATCH_PROMPT
+from rate_limiter import estimate_tokens
+from structured_output import StructuredProgram
+from result_cache import get_result_cache
+from scheduler import DeadlineExceeded, current_priority, most_urgent, priority
+from text_utils import content_hash
+from tracing import get_tracer
+from field_extractor import EXTRACTOR_VERSION, extract_fields
+from micro_batch import DEFAULT_WINDOW, MicroBatcher
+
 logger = logging.getLogger(__name__)
 
-# Initialize LLM
-llm = OpenAI(model="gpt-3.5-turbo")
+# Derived from the prompt text, so editing the prompt invalidates cached profiles
+CLASSIFIER_PROMPT_VERSION = content_hash(CLASSIFIER_PROMPT.format(resume_text=""))
+
+# Defaults for classify_resumes: resumes per request and prompt-side token budget
+DEFAULT_BATCH_SIZE = 8
+DEFAULT_BATCH_TOKEN_BUDGET = 6000
+# Rough completion tokens per assessment, reserved inside the budget
+_BATCH_OUTPUT_TOKENS = 96
+_BATCH_PROMPT_TOKENS = estimate_tokens(CLASSIFIER_BATCH_PROMPT.format(resumes=""))
+
+_micro_batcher: Optional[MicroBatcher] = None
+
+
+def classifier_model_name() -> str:
+    """Name of the model behind the shared LLM (part of every cache key)."""
+    return llm_registry.get_llm().metadata.model_name
+
 
-def classify_resume(resume_text: str):
+def classifier_cache_key(resume_text: str) -> str:
+    """Cache key for a resume under the current classifier prompt and model."""
+    return content_hash(
+        resume_text, "classify_resume", CLASSIFIER_PROMPT_VERSION, EXTRACTOR_VERSION,
+        classifier_model_name()
+    )
+
+
+def classify_resume(resume_text: str, use_cache: bool = True):
     """
     Classify a resume as TECH or NON_TECH using LLM.
     
     Args:
         resume_text (str): Raw resume text
+        use_cache (bool): Reuse a cached Profile for identical text/prompt/model.
+
+    Contact info, skills and experience come from ``field_extractor``; the
+    LLM only supplies role_type, confidence_score and summary.
         
     Returns:
         ClassificationOutput: Structured classification result
     """
-    logger.info("Starting resume classification...")
-    try:
-        prompt = CLASSIFIER_PROMPT.format(resume_text=resume_text)
-        classifier_program = LLMTextCompletionProgram.from_defaults(
-            output_cls=Profile,
-            llm=llm,
-            prompt_template_str=prompt,
-            verbose=False,
-        )
-        # Call the LLM program
-        output = classifier_program(resume_text=resume_text)
-        return output
-    except Exception as e:
-        logger.error("Error during classification: %s", e)
-        raise
+    tracer = get_tracer()
+    cache = get_result_cache()
+    key = classifier_cache_key(resume_text)
+    with tracer.span("classifier", cache_hit=False) as span:
+        if use_cache:
+            cached = cache.get(key)
+            if cached is not None:
+                logger.info("Classification cache hit.")
+                span.set(cache_hit=True)
+                return profile_from_dict(cached)
+
+        logger.info("Starting resume classification...")
+        try:
+            with tracer.span("classifier.extract_fields"):
+                fields = extract_fields(resume_text)
+            # Call the LLM program
+            with tracer.span("classifier.llm"):
+                assessment = llm_registry.get("classifier_program")(resume_text=resume_text)
+            output = _merge_profile(assessment, fields)
+            cache.set(key, output.model_dump(mode="json"))
+            return output
+        except Exception as e:
+            logger.error("Error during classification: %s", e)
+            raise
+
+
+async def aclassify_resume(resume_text: str, use_cache: bool = True):
+    """
+    Async variant of ``classify_resume`` using the LLM's async API.
+
+    While micro-batching is enabled (``enable_micro_batching``), uncached
+    resumes from concurrent callers are pooled for a short window and
+    classified together through ``aclassify_resumes``.
+
+    Args:
+        resume_text (str): Raw resume text
+        use_cache (bool): Reuse a cached Profile for identical text/prompt/model.
+
+    Returns:
+        Profile: Structured classification result
+    """
+    batcher = _micro_batcher
+    if batcher is None or not use_cache:
+        return await _aclassify_one(resume_text, use_cache=use_cache)
+    cached = get_result_cache().get(classifier_cache_key(resume_text))
+    if cached is not None:
+        with get_tracer().span("classifier", cache_hit=True):
+            logger.info("Classification cache hit.")
+            return profile_from_dict(cached)
+    with get_tracer().span("classifier.micro_batch"):
+        return await batcher.submit((resume_text, current_priority()))
+
+
+async def _aclassify_one(resume_text: str, use_cache: bool = True) -> Profile:
+    """Classify a single resume with the single-resume prompt."""
+    tracer = get_tracer()
+    cache = get_result_cache()
+    key = classifier_cache_key(resume_text)
+    with tracer.span("classifier", cache_hit=False) as span:
+        if use_cache:
+            cached = cache.get(key)
+            if cached is not None:
+                logger.info("Classification cache hit.")
+                span.set(cache_hit=True)
+                return profile_from_dict(cached)
+
+        logger.info("Starting async resume classification...")
+        try:
+            with tracer.span("classifier.extract_fields"):
+                fields = extract_fields(resume_text)
+            with tracer.span("classifier.llm"):
+                assessment = await llm_registry.get("classifier_program").acall(
+                    resume_text=resume_text)
+            output = _merge_profile(assessment, fields)
+            cache.set(key, output.model_dump(mode="json"))
+            return output
+        except Exception as e:
+            logger.error("Error during classification: %s", e)
+            raise
+
+
+def classify_resumes(resumes: Iterable[Tuple[str, str]],
+                     batch_size: int = DEFAULT_BATCH_SIZE,
+                     token_budget: int = DEFAULT_BATCH_TOKEN_BUDGET,
+                     use_cache: bool = True) -> List[Profile]:
+    """
+    Classify many resumes, packing several into each LLM request.
+
+    For bulk backfills: the system prompt and JSON schema are sent once per
+    batch instead of once per resume. Resumes are packed greedily, up to
+    ``batch_size`` per request and ``token_budget`` estimated tokens
+    (prompt plus expected output). Assessments that come back missing,
+    mis-tagged or invalid are re-run one by one through ``classify_resume``.
+    LLM calls are scheduled as "bulk" unless the caller set a priority.
+
+    Args:
+        resumes (Iterable[Tuple[str, str]]): ``(resume_id, resume_text)`` pairs.
+        batch_size (int): Maximum resumes per request (1 disables packing).
+        token_budget (int): Estimated tokens allowed per request.
+        use_cache (bool): Reuse / store Profiles in the result cache.
+
+    Returns:
+        List[Profile]: One profile per input, in input order.
+
+    Raises:
+        ValueError: If a resume_id repeats or batch_size is less than 1.
+        DeadlineExceeded: If a batch was still queued at its scheduling deadline.
+    """
+    items, profiles, pending = _prepare_batch(resumes, batch_size, use_cache)
+    with priority("bulk", override=False):
+        for group in _pack(pending, batch_size, token_budget):
+            profiles.update(_classify_group(group))
+
+        for resume_id, resume_text in pending:
+            if resume_id not in profiles:
+                logger.info("Re-queuing resume %s for individual classification.", resume_id)
+                profiles[resume_id] = classify_resume(resume_text, use_cache=use_cache)
+    return [profiles[resume_id] for resume_id, _ in items]
+
+
+async def aclassify_resumes(resumes: Iterable[Tuple[str, str]],
+                            batch_size: int = DEFAULT_BATCH_SIZE,
+                            token_budget: int = DEFAULT_BATCH_TOKEN_BUDGET,
+                            use_cache: bool = True) -> List[Profile]:
+    """
+    Async variant of ``classify_resumes``; the batches run concurrently.
+
+    Returns:
+        List[Profile]: One profile per input, in input order.
+
+    Raises:
+        ValueError: If a resume_id repeats or batch_size is less than 1.
+        DeadlineExceeded: If a batch was still queued at its scheduling deadline.
+    """
+    items, profiles, pending = _prepare_batch(resumes, batch_size, use_cache)
+    groups = _pack(pending, batch_size, token_budget)
+    with priority("bulk", override=False):
+        for result in await asyncio.gather(*(_aclassify_group(group) for group in groups)):
+            profiles.update(result)
+
+        missing = [(resume_id, text) for resume_id, text in pending
+                   if resume_id not in profiles]
+        if missing:
+            logger.info("Re-queuing %d resumes for individual classification.", len(missing))
+            retried = await asyncio.gather(
+                *(_aclassify_one(text, use_cache=use_cache) for _, text in missing))
+            profiles.update(zip((resume_id for resume_id, _ in missing), retried))
+    return [profiles[resume_id] for resume_id, _ in items]
+
+
+def enable_micro_batching(window: float = DEFAULT_WINDOW,
+                          max_batch: int = DEFAULT_BATCH_SIZE) -> MicroBatcher:
+    """
+    Pool concurrent ``aclassify_resume`` calls into batched LLM requests.
+
+    Meant for long-running services, where independent requests arrive
+    close together: uncached resumes submitted within ``window`` seconds
+    (up to ``max_batch``) share one ``aclassify_resumes`` call.
+
+    Returns:
+        MicroBatcher: The active batcher (for its ``stats()``).
+    """
+    global _micro_batcher  # pylint: disable=global-statement
+    _micro_batcher = MicroBatcher("classifier", _classify_micro_batch,
+                                  window=window, max_batch=max_batch)
+    return _micro_batcher
+
+
+def disable_micro_batching() -> None:
+    """Classify every ``aclassify_resume`` call on its own again."""
+    global _micro_batcher  # pylint: disable=global-statement
+    _micro_batcher = None
+
+
+def micro_batch_stats() -> Optional[Dict[str, Any]]:
+    """Stats of the active classifier micro-batcher, None when disabled."""
+    batcher = _micro_batcher
+    return batcher.stats() if batcher is not None else None
+
+
+async def _classify_micro_batch(items: List[Tuple[str, str]]) -> List[Profile]:
+    """Classify ``(resume_text, priority)`` items at the most urgent priority among them."""
+    texts = [text for text, _ in items]
+    # Identical resumes submitted together are classified once
+    unique = list(dict.fromkeys(texts))
+    with priority(most_urgent(name for _, name in items)):
+        profiles = await aclassify_resumes(
+            [(str(i), text) for i, text in enumerate(unique)], batch_size=len(unique))
+    by_text = dict(zip(unique, profiles))
+    return [by_text[text] for text in texts]
+
+
+def _prepare_batch(resumes: Iterable[Tuple[str, str]], batch_size: int, use_cache: bool):
+    """Split input into cache hits and resumes still to classify."""
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1.")
+    items = list(resumes)
+    if len({resume_id for resume_id, _ in items}) != len(items):
+        raise ValueError("resume_ids must be unique.")
+
+    profiles: Dict[str, Profile] = {}
+    pending: List[Tuple[str, str]] = []
+    cache = get_result_cache()
+    for resume_id, resume_text in items:
+        cached = cache.get(classifier_cache_key(resume_text)) if use_cache else None
+        if cached is not None:
+            profiles[resume_id] = profile_from_dict(cached)
+        else:
+            pending.append((resume_id, resume_text))
+    return items, profiles, pending
+
+
+def _pack(pending: Sequence[Tuple[str, str]], batch_size: int,
+          token_budget: int) -> List[List[Tuple[str, str, int]]]:
+    """Greedily group resumes under batch_size and token_budget."""
+    groups: List[List[Tuple[str, str, int]]] = []
+    group: List[Tuple[str, str, int]] = []
+    used = _BATCH_PROMPT_TOKENS
+    for resume_id, resume_text in pending:
+        cost = estimate_tokens(resume_text) + _BATCH_OUTPUT_TOKENS
+        if group and (len(group) >= batch_size or used + cost > token_budget):
+            groups.append(group)
+            group, used = [], _BATCH_PROMPT_TOKENS
+        group.append((resume_id, resume_text, cost))
+        used += cost
+    if group:
+        groups.append(group)
+    return groups
+
+
+def _classify_group(group: List[Tuple[str, str, int]]) -> Dict[str, Profile]:
+    if len(group) == 1:
+        # Nothing to share; the single-resume prompt is cheaper
+        return {}
+    with get_tracer().span("classifier.batch", batch_size=len(group)):
+        try:
+            batch = llm_registry.get("classifier_batch_program")(resumes=_format_batch(group))
+        except DeadlineExceeded:
+            # Stale work: re-queuing the members one by one would restart their wait
+            raise
+        except Exception as e:  # pylint: disable=broad-except
+            logger.warning("Batched classification of %d resumes failed: %s", len(group), e)
+            return {}
+        return _collect(group, batch)
+
+
+async def _aclassify_group(group: List[Tuple[str, str, int]]) -> Dict[str, Profile]:
+    if len(group) == 1:
+        return {}
+    with get_tracer().span("classifier.batch", batch_size=len(group)):
+        try:
+            batch = await llm_registry.get("classifier_batch_program").acall(
+                resumes=_format_batch(group))
+        except DeadlineExceeded:
+            raise
+        except Exception as e:  # pylint: disable=broad-except
+            logger.warning("Batched classification of %d resumes failed: %s", len(group), e)
+            return {}
+        return _collect(group, batch)
+
+
+def _format_batch(group: List[Tuple[str, str, int]]) -> str:
+    return "\n".join(f'<resume id="{resume_id}">\n{resume_text}\n</resume>'
+                     for resume_id, resume_text, _ in group)
+
+
+def _collect(group: List[Tuple[str, str, int]], batch: BatchRoleAssessment) -> Dict[str, Profile]:
+    """Merge each returned assessment with locally extracted fields and cache it."""
+    texts = {resume_id: resume_text for resume_id, resume_text, _ in group}
+    cache = get_result_cache()
+    profiles: Dict[str, Profile] = {}
+    for assessment in batch.assessments:
+        resume_text = texts.get(assessment.resume_id)
+        if resume_text is None or assessment.resume_id in profiles:
+            continue
+        profile = _merge_profile(assessment, extract_fields(resume_text))
+        cache.set(classifier_cache_key(resume_text), profile.model_dump(mode="json"))
+        profiles[assessment.resume_id] = profile
+    return profiles
+
+
+class _BatchAssessmentParser(PydanticOutputParser):
+    """Keeps the valid assessments of a batch instead of failing the whole batch."""
+    def parse(self, text: str) -> Any:
+        data = json.loads(extract_json_str(text))
+        raw = data.get("assessments", []) if isinstance(data, dict) else []
+        assessments = []
+        for item in raw if isinstance(raw, list) else []:
+            try:
+                assessments.append(ResumeRoleAssessment.model_validate(item))
+            except ValidationError as e:
+                logger.warning("Dropping malformed batch assessment: %s", e)
+        return BatchRoleAssessment(assessments=assessments)
+
+
+def _build_classifier_program() -> StructuredProgram:
+    """Shared program; the resume is a template variable, so one instance serves every call."""
+    return StructuredProgram(
+        "classifier",
+        output_cls=RoleAssessment,
+        llm=llm_registry.get_llm(),
+        prompt=CLASSIFIER_PROMPT,
+    )
+
+
+def refresh_profile(profile: Profile, resume_text: str) -> Profile:
+    """
+    Rebuild a Profile for an edited copy of the resume it came from.
+
+    The LLM-produced fields (role_type, confidence_score, summary) are kept
+    and the deterministic fields are re-extracted from resume_text, so a
+    near-duplicate costs no LLM call.
+
+    Args:
+        profile (Profile): Profile of the earlier version.
+        resume_text (str): The edited resume text.
+
+    Returns:
+        Profile: The refreshed profile.
+    """
+    with get_tracer().span("classifier.extract_fields"):
+        fields = extract_fields(resume_text)
+    assessment = RoleAssessment(**{name: getattr(profile, name) for name in LLM_PROFILE_FIELDS})
+    return _merge_profile(assessment, fields)
+
+
+def _merge_profile(assessment: RoleAssessment, fields: ExtractedFields) -> Profile:
+    """Combine the LLM's role assessment with the locally extracted fields."""
+    return Profile(
+        role_type=assessment.role_type,
+        confidence_score=assessment.confidence_score,
+        contact_info=ContactInfo(email=fields.email or "", phone=fields.phone or ""),
+        years_of_experience=fields.years_of_experience,
+        technical_skills=fields.technical_skills or None,
+        summary=assessment.summary,
+    )
+
+
+def _build_classifier_batch_program() -> LLMTextCompletionProgram:
+    return LLMTextCompletionProgram.from_defaults(
+        output_parser=_BatchAssessmentParser(BatchRoleAssessment),
+        llm=llm_registry.get_llm(),
+        prompt=CLASSIFIER_BATCH_PROMPT,
+        verbose=False,
+    )
+
+
+llm_registry.register("classifier_program", _build_classifier_program)
+llm_registry.register("classifier_batch_program", _build_classifier_batch_program)
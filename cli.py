@@ -0,0 +1,365 @@
+""" Bulk Resume Analysis CLI
+
+Usage:
+    python cli.py analyze resumes/ --output profiles.jsonl   # PDF, DOCX, HTML, text
+    python cli.py analyze resumes.jsonl --output profiles.jsonl --concurrency 16
+    python cli.py analyze resumes.csv --text-field body --id-field candidate_id -o out.jsonl
+
+Re-running the same command after a crash or Ctrl-C resumes from the
+checkpoint (``<output>.checkpoint`` by default).
+"""
+import os
+import sys
+import csv
+import json
+import time
+import bisect
+import asyncio
+import logging
+import argparse
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+from batch import analyze_resumes
+from doc_extract import DEFAULT_TIMEOUT, aextract_documents, document_format
+from text_utils import make_resume_id
+
+logger = logging.getLogger(__name__)
+
+INPUT_FORMATS = ("auto", "dir", "jsonl", "csv")
+DEFAULT_CHECKPOINT_EVERY = 10
+
+
+class Checkpoint:
+    """
+    Resumable progress of one bulk run, saved atomically as JSON.
+
+    Results finish out of order, so progress is a low watermark (every
+    input index below it is done) plus the runs of indices done above it,
+    as sorted ``[start, end)`` pairs. Every gap between runs is a resume
+    still in flight, so there are at most as many runs as in-flight
+    resumes (``--concurrency`` plus the extraction window), however long
+    one slow resume holds the watermark back. ``output_offset`` is the
+    output length those records occupy. On resume the output is truncated
+    back to it, so records written after the last save are redone rather
+    than duplicated.
+    """
+    def __init__(self, path: str, source: Dict[str, str]):
+        self.path = path
+        self.source = source
+        self.watermark = 0
+        self.done_above: List[Tuple[int, int]] = []
+        self.output_offset = 0
+        self.processed = 0
+        self.failed = 0
+        self.complete = False
+
+    @classmethod
+    def load(cls, path: str, source: Dict[str, str]) -> "Checkpoint":
+        """Read the checkpoint at path, or start a new one when it does not exist.
+
+        Raises:
+            ValueError: If the checkpoint belongs to a different input.
+        """
+        checkpoint = cls(path, source)
+        if not os.path.exists(path):
+            return checkpoint
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data["source"] != source:
+            raise ValueError(f"Checkpoint {path} is for {data['source']}, not {source}; "
+                             "delete it or pass another --checkpoint.")
+        checkpoint.watermark = data["watermark"]
+        checkpoint.done_above = [tuple(run) for run in data["done_above"]]
+        checkpoint.output_offset = data["output_offset"]
+        checkpoint.processed = data["processed"]
+        checkpoint.failed = data["failed"]
+        checkpoint.complete = data.get("complete", False)
+        return checkpoint
+
+    def is_done(self, index: int) -> bool:
+        """Whether the record for input index is already in the output."""
+        if index < self.watermark:
+            return True
+        i = bisect.bisect_right(self.done_above, (index, sys.maxsize)) - 1
+        return i >= 0 and index < self.done_above[i][1]
+
+    def mark_done(self, index: int, output_offset: int, failed: bool) -> None:
+        """Record that index's output ends at output_offset."""
+        runs = self.done_above
+        i = bisect.bisect_left(runs, (index, index))
+        start, end = index, index + 1
+        if i > 0 and runs[i - 1][1] == start:
+            i -= 1
+            start = runs.pop(i)[0]
+        if i < len(runs) and runs[i][0] == end:
+            end = runs.pop(i)[1]
+        if start == self.watermark:
+            self.watermark = end
+        else:
+            runs.insert(i, (start, end))
+        self.output_offset = output_offset
+        self.processed += 1
+        self.failed += int(failed)
+
+    def save(self) -> None:
+        """Write the checkpoint atomically (temp file + rename)."""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "source": self.source,
+                "watermark": self.watermark,
+                "done_above": self.done_above,
+                "output_offset": self.output_offset,
+                "processed": self.processed,
+                "failed": self.failed,
+                "complete": self.complete,
+            }, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+
+def detect_format(path: str) -> str:
+    """Guess the input format from the path ("dir", "jsonl" or "csv").
+
+    Raises:
+        ValueError: If the format cannot be inferred.
+    """
+    if os.path.isdir(path):
+        return "dir"
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".jsonl", ".ndjson"):
+        return "jsonl"
+    if extension == ".csv":
+        return "csv"
+    raise ValueError(f"Cannot infer the input format of {path}; pass --format.")
+
+
+def iter_resumes(path: str, input_format: str, text_field: str = "text",
+                 id_field: str = "id") -> Iterator[Tuple[int, str, str, str, Optional[str]]]:
+    """Stream resumes from a JSONL or CSV file.
+
+    Records are read one at a time in a stable order, so input indices are
+    the same on every run. Blank JSONL lines are skipped; records without
+    text are still yielded, so every index gets an output record. A JSONL
+    line that is not a JSON object is yielded with empty text and an error.
+
+    Args:
+        path (str): Input file.
+        input_format (str): "jsonl" or "csv".
+        text_field (str): JSONL key / CSV column holding the resume text.
+        id_field (str): JSONL key / CSV column holding the resume ID
+            (content-derived when missing).
+
+    Yields:
+        Tuple[int, str, str, str, Optional[str]]: ``(index, resume_id,
+        resume_text, source, error)`` where source is ``path:line``.
+    """
+    if input_format == "jsonl":
+        with open(path, "r", encoding="utf-8") as f:
+            index = 0
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                source = f"{path}:{line_number}"
+                try:
+                    record = json.loads(line)
+                    error = None if isinstance(record, dict) else "record is not a JSON object"
+                except ValueError as e:
+                    error = f"invalid JSON: {e}"
+                if error is not None:
+                    logger.warning("Skipping %s: %s", source, error)
+                    yield index, make_resume_id(line), "", source, error
+                else:
+                    text = record.get(text_field) or ""
+                    yield (index, str(record.get(id_field) or make_resume_id(text)), text,
+                           source, None)
+                index += 1
+    elif input_format == "csv":
+        csv.field_size_limit(min(sys.maxsize, 2**31 - 1))
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            reader = csv.DictReader(f)
+            for index, row in enumerate(reader):
+                text = row.get(text_field) or ""
+                yield (index, str(row.get(id_field) or make_resume_id(text)), text,
+                       f"{path}:{reader.line_num}", None)
+    else:
+        raise ValueError(f"iter_resumes reads jsonl or csv, got {input_format!r}")
+
+
+def list_documents(path: str) -> Iterator[str]:
+    """Stream the names of the supported files in directory path.
+
+    Names come in directory order, without sorting, so memory does not grow
+    with the directory. That order is stable while the directory is
+    unchanged; ``run_analyze`` ties the checkpoint to its modification time.
+    """
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_file() and document_format(entry.name) is not None:
+                yield entry.name
+
+
+async def stream_resumes(args: argparse.Namespace, input_format: str,
+                         checkpoint: "Checkpoint") -> AsyncIterator[Tuple[int, str, str, str,
+                                                                          Optional[str]]]:
+    """Unfinished resumes of the input as ``(index, resume_id, text, source, error)``.
+
+    Directory files go through ``doc_extract`` in a process pool (PDF, DOCX,
+    HTML, text) and arrive in completion order; ``error`` is set when
+    extraction failed. JSONL / CSV records arrive in input order; ``error``
+    is set for a line that is not a JSON object.
+    """
+    if input_format != "dir":
+        for index, resume_id, resume_text, source, error in iter_resumes(
+                args.input, input_format, args.text_field, args.id_field):
+            if not checkpoint.is_done(index):
+                yield index, resume_id, resume_text, source, error
+        return
+
+    # Extraction window only: full path -> input index
+    index_of: Dict[str, int] = {}
+
+    def todo() -> Iterator[str]:
+        for index, name in enumerate(list_documents(args.input)):
+            if not checkpoint.is_done(index):
+                full_path = os.path.join(args.input, name)
+                index_of[full_path] = index
+                yield full_path
+
+    async for document in aextract_documents(todo(), max_workers=args.workers,
+                                             timeout=args.extract_timeout):
+        name = os.path.basename(document.path)
+        yield (index_of.pop(document.path), os.path.splitext(name)[0], document.text, name,
+               document.error)
+
+
+def to_record(index: int, source: str, item: Dict[str, Any]) -> Dict[str, Any]:
+    """Flatten a ``batch.analyze_resumes`` item into one JSONL output record."""
+    result = item["result"] or {}
+    profile = result.get("classification")
+    return {
+        "index": index,
+        "resume_id": item["resume_id"],
+        "source": source,
+        "passed_check": result.get("passed_check", False),
+        "reason": result.get("reason"),
+        "profile": profile.model_dump(mode="json") if profile is not None else None,
+        "evaluation": result.get("evaluation"),
+        "near_duplicate": result.get("near_duplicate"),
+        "error": item["error"],
+    }
+
+
+async def run_analyze(args: argparse.Namespace) -> Checkpoint:
+    """Analyze every resume in args.input not yet in the checkpoint.
+
+    Memory stays bounded by ``--concurrency``: input is streamed, results
+    are written as they complete and the checkpoint only tracks the
+    in-flight window.
+
+    Returns:
+        Checkpoint: The final checkpoint (counts of processed / failed).
+    """
+    input_format = detect_format(args.input) if args.format == "auto" else args.format
+    checkpoint_path = args.checkpoint or f"{args.output}.checkpoint"
+    source = {"input": os.path.abspath(args.input), "format": input_format}
+    if input_format == "dir":
+        if source["input"] in (os.path.dirname(os.path.abspath(path))
+                               for path in (args.output, checkpoint_path)):
+            raise ValueError("Write --output and --checkpoint outside the input directory.")
+        # Adding, removing or renaming a file changes the directory order
+        source["modified"] = str(os.stat(args.input).st_mtime_ns)
+    checkpoint = Checkpoint.load(checkpoint_path, source)
+    if not os.path.exists(checkpoint_path) and os.path.exists(args.output) and not args.force:
+        raise FileExistsError(f"{args.output} exists without a checkpoint; pass --force "
+                              "to overwrite it.")
+    if checkpoint.complete:
+        logger.info("Checkpoint %s is already complete; nothing to do.", checkpoint_path)
+        return checkpoint
+
+    # Batch position -> (input index, source, extraction error), in-flight window only
+    in_flight: Dict[int, Tuple[int, str, Optional[str]]] = {}
+
+    async def pending() -> AsyncIterator[Tuple[str, str]]:
+        position = 0
+        async for index, resume_id, resume_text, where, error in stream_resumes(
+                args, input_format, checkpoint):
+            in_flight[position] = (index, where, error)
+            position += 1
+            yield resume_id, resume_text
+
+    with open(args.output, "ab") as out:
+        out.truncate(checkpoint.output_offset)
+        since_save = 0
+        try:
+            async for item in analyze_resumes(pending(), concurrency=args.concurrency,
+                                              index_candidates=False):
+                index, where, extract_error = in_flight.pop(item["index"])
+                if extract_error is not None:
+                    item = {**item, "result": None, "error": extract_error}
+                out.write(json.dumps(to_record(index, where, item), default=str).encode("utf-8")
+                          + b"\n")
+                checkpoint.mark_done(index, out.tell(), failed=item["error"] is not None)
+                since_save += 1
+                if since_save >= args.checkpoint_every:
+                    _save(out, checkpoint)
+                    since_save = 0
+            checkpoint.complete = True
+        finally:
+            _save(out, checkpoint)
+    return checkpoint
+
+
+def _save(out, checkpoint: Checkpoint) -> None:
+    """Make the output durable up to the checkpoint's offset, then save it."""
+    out.flush()
+    os.fsync(out.fileno())
+    checkpoint.save()
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0].strip())
+    parser.add_argument("--log-level", default="WARNING")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    analyze = commands.add_parser("analyze", help="run analyze_resume over a corpus")
+    analyze.add_argument("input", help="directory of PDF/DOCX/HTML/text files, .jsonl or .csv")
+    analyze.add_argument("-o", "--output", required=True, help="JSONL file to append records to")
+    analyze.add_argument("--format", choices=INPUT_FORMATS, default="auto")
+    analyze.add_argument("--text-field", default="text",
+                         help="JSONL key / CSV column with the resume text")
+    analyze.add_argument("--id-field", default="id",
+                         help="JSONL key / CSV column with the resume ID")
+    analyze.add_argument("--concurrency", type=int, default=8)
+    analyze.add_argument("--workers", type=int, default=None,
+                         help="text extraction processes for directory input (default: cores)")
+    analyze.add_argument("--extract-timeout", type=float, default=DEFAULT_TIMEOUT,
+                         help="seconds allowed to extract one file")
+    analyze.add_argument("--checkpoint", help="checkpoint path (default: <output>.checkpoint)")
+    analyze.add_argument("--checkpoint-every", type=int, default=DEFAULT_CHECKPOINT_EVERY,
+                         help="records between checkpoint saves")
+    analyze.add_argument("--force", action="store_true",
+                         help="overwrite an existing output that has no checkpoint")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    logging.getLogger().setLevel(args.log_level.upper())
+    start = time.perf_counter()
+    try:
+        checkpoint = asyncio.run(run_analyze(args))
+    except KeyboardInterrupt:
+        print("Interrupted; re-run the same command to resume.", file=sys.stderr)
+        return 130
+    except (ValueError, FileExistsError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    print(f"{checkpoint.processed} resumes processed ({checkpoint.failed} failed) "
+          f"in {time.perf_counter() - start:.1f}s -> {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,302 @@
+""" Parallel Document-to-Text Extraction (PDF / DOCX / HTML / text) """
+import os
+import re
+import time
+import signal
+import asyncio
+import threading
+import logging
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from html.parser import HTMLParser
+from typing import AsyncIterator, Dict, Iterable, List, Optional
+from xml.etree import ElementTree
+from schema import ExtractedDocument
+
+logger = logging.getLogger(__name__)
+
+# File suffix -> extractor format
+SUPPORTED_FORMATS: Dict[str, str] = {
+    ".pdf": "pdf", ".docx": "docx", ".html": "html", ".htm": "html",
+    ".txt": "text", ".md": "text", ".text": "text",
+}
+DEFAULT_TIMEOUT = 30.0
+# Extra seconds the parent waits past the worker's own timeout before giving up
+_TIMEOUT_GRACE = 5.0
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+_TRAILING_SPACE_RE = re.compile(r"[ \t]+\n")
+
+
+def document_format(path: str) -> Optional[str]:
+    """Extractor format for path ("pdf", "docx", "html", "text"), None if unsupported."""
+    return SUPPORTED_FORMATS.get(os.path.splitext(path)[1].lower())
+
+
+def extract_text(path: str, timeout: Optional[float] = DEFAULT_TIMEOUT) -> ExtractedDocument:
+    """
+    Extract plain text from one file in the current process.
+
+    Headings and paragraphs stay on their own lines, separated by blank
+    lines, so ``resume_index.split_sections`` still finds the section
+    boundaries. Errors (unsupported format, corrupt file, timeout) are
+    reported on the result rather than raised.
+
+    Args:
+        path (str): PDF, DOCX, HTML or plain-text file.
+        timeout (Optional[float]): Seconds before extraction is abandoned
+            (enforced with SIGALRM where available, in the main thread).
+
+    Returns:
+        ExtractedDocument: The text, or an ``error`` message.
+    """
+    start = time.perf_counter()
+    doc_format = document_format(path) or "unknown"
+    try:
+        with _deadline(timeout):
+            text = _EXTRACTORS[doc_format](path) if doc_format in _EXTRACTORS else None
+        if text is None:
+            raise ValueError(f"unsupported file type: {os.path.splitext(path)[1] or path}")
+        return ExtractedDocument(path=path, format=doc_format, text=_tidy(text),
+                                 elapsed_ms=_elapsed_ms(start))
+    except Exception as e:  # pylint: disable=broad-except
+        logger.warning("Text extraction failed for %s: %s", path, e)
+        return ExtractedDocument(path=path, format=doc_format, error=f"{type(e).__name__}: {e}",
+                                 elapsed_ms=_elapsed_ms(start))
+
+
+async def aextract_documents(paths: Iterable[str],
+                             max_workers: Optional[int] = None,
+                             timeout: Optional[float] = DEFAULT_TIMEOUT
+                             ) -> AsyncIterator[ExtractedDocument]:
+    """
+    Extract many files in a process pool, yielding results as they finish.
+
+    Paths are consumed lazily and at most ``2 * max_workers`` files are
+    queued at once, so directories of any size stream through in bounded
+    memory; throughput scales with the number of workers (default: one per
+    core). Each file gets ``timeout`` seconds inside its worker; a worker
+    that does not answer within a further grace period is reported as
+    timed out, and the pool is replaced so the stuck process stops holding
+    a worker slot (see ``_ExtractionPool``).
+
+    Args:
+        paths (Iterable[str]): Files to extract.
+        max_workers (Optional[int]): Worker processes (``os.cpu_count()``).
+        timeout (Optional[float]): Per-file limit in seconds (None: no limit).
+
+    Yields:
+        ExtractedDocument: One per path, in completion order.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    pool = _ExtractionPool(max_workers)
+    try:
+        pending = set()
+        for path in paths:
+            pending.add(asyncio.ensure_future(pool.extract(path, timeout)))
+            if len(pending) >= 2 * max_workers:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        pool.shutdown()
+
+
+class _ExtractionPool:
+    """
+    Process pool that is replaced when a worker stops answering.
+
+    ``ProcessPoolExecutor`` cannot cancel a running task, so a worker stuck
+    past the backstop (e.g. in C code that ignores SIGALRM) would hold its
+    slot for the rest of the run. On a backstop timeout the pool's
+    processes are killed and a fresh pool takes over. Files that were
+    running in the other workers fail with ``BrokenProcessPool`` and are
+    resubmitted to the new pool. At most ``max_workers`` files are
+    submitted at once, so a file's backstop only counts time it spends
+    running, not waiting behind a stuck one.
+    """
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self.restarts = 0
+        self._pool = ProcessPoolExecutor(max_workers=max_workers)
+        self._slots = asyncio.Semaphore(max_workers)
+
+    async def extract(self, path: str, timeout: Optional[float]) -> ExtractedDocument:
+        """``extract_text(path, timeout)`` in a worker; errors are reported on the result."""
+        async with self._slots:
+            return await self._extract(path, timeout)
+
+    async def _extract(self, path: str, timeout: Optional[float]) -> ExtractedDocument:
+        loop = asyncio.get_running_loop()
+        while True:
+            pool = self._pool
+            future = loop.run_in_executor(pool, extract_text, path, timeout)
+            try:
+                return await asyncio.wait_for(
+                    future, None if timeout is None else timeout + _TIMEOUT_GRACE)
+            except asyncio.TimeoutError:
+                logger.warning("Text extraction worker did not answer for %s; "
+                               "restarting the pool.", path)
+                self._restart(pool)
+                return ExtractedDocument(path=path, format=document_format(path) or "unknown",
+                                         error=f"TimeoutError: no result within {timeout}s")
+            except BrokenProcessPool as e:
+                if pool is not self._pool:
+                    continue  # killed by a restart for another file
+                error = e
+            except Exception as e:  # pylint: disable=broad-except
+                error = e
+            return ExtractedDocument(path=path, format=document_format(path) or "unknown",
+                                     error=f"{type(error).__name__}: {error}")
+
+    def shutdown(self) -> None:
+        self._pool.shutdown()
+
+    def _restart(self, pool: ProcessPoolExecutor) -> None:
+        if pool is not self._pool:
+            return  # already replaced
+        self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        self.restarts += 1
+        # pylint: disable=protected-access
+        for process in list((pool._processes or {}).values()):
+            process.kill()
+        pool.shutdown(wait=False)
+
+
+class _deadline:  # pylint: disable=invalid-name
+    """Raise TimeoutError in the block after timeout seconds (SIGALRM, main thread only)."""
+    def __init__(self, timeout: Optional[float]):
+        self.timeout = timeout
+        self._armed = False
+        self._previous = None
+
+    def __enter__(self):
+        if (self.timeout and hasattr(signal, "setitimer")
+                and threading.current_thread() is threading.main_thread()):
+            self._previous = signal.signal(signal.SIGALRM, self._expired)
+            signal.setitimer(signal.ITIMER_REAL, self.timeout)
+            self._armed = True
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._armed:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, self._previous)
+        return False
+
+    def _expired(self, signum, frame):
+        raise TimeoutError(f"extraction exceeded {self.timeout}s")
+
+
+def _extract_plain(path: str) -> str:
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+def _extract_pdf(path: str) -> str:
+    """Page text via ``pypdf`` (optional dependency; ImportError without it)."""
+    # pylint: disable=import-outside-toplevel
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+    return "\n\n".join(page.extract_text() or "" for page in reader.pages)
+
+
+def _extract_docx(path: str) -> str:
+    """Paragraphs and table rows from word/document.xml (no extra dependency)."""
+    with zipfile.ZipFile(path) as archive:
+        root = ElementTree.fromstring(archive.read("word/document.xml"))
+    body = root.find(f"{_W}body")
+    blocks: List[str] = []
+    for element in body if body is not None else []:
+        if element.tag == f"{_W}p":
+            text = _docx_paragraph(element)
+            style = element.find(f"{_W}pPr/{_W}pStyle")
+            style_name = style.get(f"{_W}val", "") if style is not None else ""
+            if style_name.lower().startswith(("heading", "title")):
+                blocks.append("")
+            blocks.append(text)
+        elif element.tag == f"{_W}tbl":
+            for row in element.iter(f"{_W}tr"):
+                cells = [" ".join(_docx_paragraph(p) for p in cell.iter(f"{_W}p")).strip()
+                         for cell in row.iter(f"{_W}tc")]
+                blocks.append(" | ".join(cell for cell in cells if cell))
+    return "\n".join(blocks)
+
+
+def _docx_paragraph(paragraph: ElementTree.Element) -> str:
+    parts = []
+    for node in paragraph.iter():
+        if node.tag == f"{_W}t":
+            parts.append(node.text or "")
+        elif node.tag == f"{_W}tab":
+            parts.append("\t")
+        elif node.tag in (f"{_W}br", f"{_W}cr"):
+            parts.append("\n")
+    return "".join(parts)
+
+
+class _HTMLText(HTMLParser):
+    """Text of an HTML page with block elements on their own lines."""
+    BLOCKS = {"p", "div", "section", "article", "header", "footer", "li", "ul", "ol",
+              "tr", "table", "br", "hr", "dt", "dd", "blockquote", "pre"}
+    HEADINGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+    SKIP = {"script", "style", "head", "noscript", "template"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self._skip_depth += 1
+        elif tag in self.HEADINGS:
+            self.parts.append("\n\n")
+        elif tag in self.BLOCKS:
+            self.parts.append("\n")
+        if tag == "li":
+            self.parts.append("- ")
+        elif tag in ("td", "th"):
+            self.parts.append(" | ")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in self.HEADINGS or tag in self.BLOCKS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self.parts.append(re.sub(r"\s+", " ", data))
+
+
+def _extract_html(path: str) -> str:
+    parser = _HTMLText()
+    parser.feed(_extract_plain(path))
+    parser.close()
+    lines = (line.strip().strip("|").strip() for line in "".join(parser.parts).splitlines())
+    return "\n".join(lines)
+
+
+_EXTRACTORS = {
+    "pdf": _extract_pdf,
+    "docx": _extract_docx,
+    "html": _extract_html,
+    "text": _extract_plain,
+}
+
+
+def _tidy(text: str) -> str:
+    text = _TRAILING_SPACE_RE.sub("\n", text.replace("\r\n", "\n").replace("\r", "\n"))
+    return _BLANK_LINES_RE.sub("\n\n", text).strip()
+
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000.0, 3)
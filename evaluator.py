@@ -1,23 +1,70 @@
 """ Resume Evaluator """
 from typing import List, Dict, Any , Optional
+import os
 import logging
-from llama_index.core.evaluation import FaithfulnessEvaluator
+import threading
+from llama_index.core.evaluation import EvaluationResult, FaithfulnessEvaluator
 from llama_index.core.llms import LLM
-from dotenv import load_dotenv
+from grounding import check_grounding
+from schema import GroundingResult, Profile
+from text_utils import content_hash
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
-load_dotenv()
-
 class RAGEvaluators:
-    """ Resume Evaluator """
-    def __init__(self, llm: LLM):
+    """
+    Resume Evaluator
+
+    ``audit_profile`` is tiered: a deterministic grounding check runs first
+    and the LLM ``FaithfulnessEvaluator`` only runs when some claim could not
+    be verified, or when the resume falls into the ``audit_sample_rate``
+    share picked for spot checks (``GROUNDING_AUDIT_SAMPLE_RATE``, default
+    0.05; the pick is a hash of the text, so it is stable across runs).
+    """
+    def __init__(self, llm: LLM, audit_sample_rate: Optional[float] = None):
         self.faithfulness = FaithfulnessEvaluator(llm=llm)
+        self.audit_sample_rate = (audit_sample_rate if audit_sample_rate is not None
+                                  else float(os.getenv("GROUNDING_AUDIT_SAMPLE_RATE", "0.05")))
+        self._stats_lock = threading.Lock()
+        self._stats = {"grounded": 0, "escalated_ungrounded": 0, "escalated_sampled": 0}
+
+    def audit_profile(self, profile: Profile, resume_text: str) -> Dict[str, Any]:
+        """
+        Check a classified profile against its resume, escalating to the LLM
+        faithfulness evaluator only when needed.
+
+        Args:
+            profile: Classifier output.
+            resume_text: The resume it was produced from.
+
+        Returns:
+            Dict with faithfulness results (from the grounding check when not
+            escalated) plus ``audit`` ("grounding" or "llm"), ``audit_reason``,
+            ``grounding_score`` and ``ungrounded_fields``.
+        """
+        grounding = check_grounding(profile, resume_text)
+        reason = self._escalation_reason(grounding, resume_text)
+        if reason is None:
+            return self._grounded_result(grounding)
+        logger.info("Escalating to LLM faithfulness audit (%s).", reason)
+        result = self.evaluate_response(query=None, response=str(profile), contexts=[resume_text])
+        return self._audited_result(result, grounding, reason)
+
+    async def aaudit_profile(self, profile: Profile, resume_text: str) -> Dict[str, Any]:
+        """Async variant of ``audit_profile``."""
+        grounding = check_grounding(profile, resume_text)
+        reason = self._escalation_reason(grounding, resume_text)
+        if reason is None:
+            return self._grounded_result(grounding)
+        logger.info("Escalating to LLM faithfulness audit (%s).", reason)
+        result = await self.aevaluate_response(
+            query=None, response=str(profile), contexts=[resume_text])
+        return self._audited_result(result, grounding, reason)
+
+    def stats(self) -> Dict[str, int]:
+        """Profiles settled by the grounding check vs. escalated (and why)."""
+        with self._stats_lock:
+            return dict(self._stats)
 
     def evaluate_response(
         self,
@@ -45,7 +92,76 @@ class RAGEvaluators:
             response=response,
             contexts=contexts,
         )
+        return self._format_result(faithfulness_result)
+
+    async def aevaluate_response(
+        self,
+        query: Optional[str],
+        response: str,
+        contexts: List[str],
+    ) -> Dict[str, Any]:
+        """
+        Async variant of ``evaluate_response`` using ``FaithfulnessEvaluator.aevaluate``.
+
+        Args:
+            query: Original user question.
+            response: Generated answer from the model
+            contexts: Retrieved context chunks
+
+        Returns:
+            Dict with faithfulness results.
+        """
+        if not contexts:
+            raise ValueError("Contexts cannot be empty")
+        logger.info("Running async faithfulness evaluation...")
+        faithfulness_result = await self.faithfulness.aevaluate(
+            query=query or None,
+            response=response,
+            contexts=contexts,
+        )
+        return self._format_result(faithfulness_result)
+
+    def _escalation_reason(self, grounding: GroundingResult, resume_text: str) -> Optional[str]:
+        if grounding.ungrounded_fields:
+            reason, key = "ungrounded", "escalated_ungrounded"
+        elif self._sampled(resume_text):
+            reason, key = "sampled", "escalated_sampled"
+        else:
+            reason, key = None, "grounded"
+        with self._stats_lock:
+            self._stats[key] += 1
+        return reason
+
+    def _sampled(self, resume_text: str) -> bool:
+        if self.audit_sample_rate <= 0:
+            return False
+        return int(content_hash(resume_text, "audit")[:8], 16) / 0x100000000 < self.audit_sample_rate
+
+    @staticmethod
+    def _grounded_result(grounding: GroundingResult) -> Dict[str, Any]:
+        return {
+            "faithfulness_passing": True,
+            "faithfulness_score": grounding.score,
+            "faithfulness_feedback": f"All {grounding.claims} claims grounded in the resume text.",
+            "audit": "grounding",
+            "audit_reason": None,
+            "grounding_score": grounding.score,
+            "ungrounded_fields": [],
+        }
+
+    @staticmethod
+    def _audited_result(result: Dict[str, Any], grounding: GroundingResult,
+                        reason: str) -> Dict[str, Any]:
+        return {
+            **result,
+            "audit": "llm",
+            "audit_reason": reason,
+            "grounding_score": grounding.score,
+            "ungrounded_fields": grounding.ungrounded_fields,
+        }
 
+    @staticmethod
+    def _format_result(faithfulness_result: EvaluationResult) -> Dict[str, Any]:
         results: Dict[str, Any] = {
             "faithfulness_passing": faithfulness_result.passing,
             "faithfulness_score": faithfulness_result.score,
@@ -0,0 +1,435 @@
+""" Offline Fake LLM and Embedding Backends """
+import re
+import json
+import math
+import time
+import zlib
+import asyncio
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.base.llms.generic_utils import completion_response_to_chat_response
+from llama_index.core.llms import (
+    ChatMessage,
+    ChatResponse,
+    ChatResponseAsyncGen,
+    CustomLLM,
+    CompletionResponse,
+    CompletionResponseGen,
+    LLMMetadata,
+    MessageRole,
+)
+from llama_index.core.llms.function_calling import FunctionCallingLLM
+from llama_index.core.llms.llm import ToolSelection
+from llama_index.core.llms.callbacks import llm_chat_callback, llm_completion_callback
+from pydantic import PrivateAttr
+from limited_llm import RateLimitedEmbeddingMixin, RateLimitedLLMMixin
+from rate_limiter import estimate_tokens
+
+
+class FakeRateLimitError(Exception):
+    """Raised by FakeLLM when its simulated quota is exceeded (HTTP 429)."""
+    status_code = 429
+
+    def __init__(self, message: str = "Rate limit reached (simulated)"):
+        super().__init__(message)
+
+
+_BATCH_ID_RE = re.compile(r'<resume id="([^"]+)">')
+
+
+def default_responder(prompt: str) -> str:
+    """Produce a plausible structured answer for each pipeline prompt."""
+    if "YES or NO" in prompt:
+        return "YES"
+    if '"is_resume"' in prompt:
+        return json.dumps({"is_resume": True, "reason": "Fake router verdict."})
+    batch_ids = _BATCH_ID_RE.findall(prompt)
+    if batch_ids:
+        return json.dumps({"assessments": [{
+            "resume_id": resume_id,
+            "role_type": "TECH",
+            "confidence_score": 0.9,
+            "summary": "Fake summary sentence one. Fake summary sentence two.",
+        } for resume_id in batch_ids]})
+    if "role_type" in prompt:
+        return json.dumps({
+            "role_type": "TECH",
+            "confidence_score": 0.9,
+            "summary": "Fake summary sentence one. Fake summary sentence two.",
+        })
+    return "YES"
+
+
+class FakeLLM(CustomLLM):
+    """
+    Deterministic, network-free LLM for offline tests and benchmarks.
+
+    Simulates per-call latency, counts prompt/completion tokens and, when
+    ``rpm_limit`` is set, raises ``FakeRateLimitError`` once more than
+    ``rpm_limit`` calls land inside a sliding 60-second window.
+    """
+    latency: float = 0.0
+    rpm_limit: Optional[int] = None
+    model_name: str = "fake-llm"
+    context_window: int = 16385
+    num_output: int = 256
+
+    _responder: Optional[Callable[[str], str]] = PrivateAttr(default=None)
+    _clock: Optional[Callable[[], float]] = PrivateAttr(default=None)
+    _window: Deque[float] = PrivateAttr(default_factory=deque)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+    _counters: Dict[str, int] = PrivateAttr(default_factory=dict)
+
+    def __init__(self,
+                 responder: Optional[Callable[[str], str]] = None,
+                 clock: Optional[Callable[[], float]] = None,
+                 **kwargs: Any):
+        super().__init__(**kwargs)
+        self._responder = responder or default_responder
+        self._clock = clock or time.monotonic
+        self._counters = {"calls": 0, "rate_limited": 0,
+                          "prompt_tokens": 0, "completion_tokens": 0}
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "fake_llm"
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(
+            context_window=self.context_window,
+            num_output=self.num_output,
+            model_name=self.model_name,
+        )
+
+    @property
+    def counters(self) -> Dict[str, int]:
+        """Calls, simulated 429s and prompt/completion token totals."""
+        with self._lock:
+            return dict(self._counters)
+
+    @llm_completion_callback()
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        self._admit()
+        if self.latency:
+            time.sleep(self.latency)
+        return self._respond(prompt)
+
+    @llm_completion_callback()
+    async def acomplete(self, prompt: str, formatted: bool = False,
+                        **kwargs: Any) -> CompletionResponse:
+        self._admit()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._respond(prompt)
+
+    @llm_chat_callback()
+    async def achat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        prompt = self.messages_to_prompt(messages)
+        completion = await self.acomplete(prompt, formatted=True)
+        return completion_response_to_chat_response(completion)
+
+    @llm_completion_callback()
+    def stream_complete(self, prompt: str, formatted: bool = False,
+                        **kwargs: Any) -> CompletionResponseGen:
+        response = self.complete(prompt, formatted=formatted, **kwargs)
+
+        def gen() -> CompletionResponseGen:
+            text = ""
+            for word in response.text.split(" "):
+                delta = word if not text else " " + word
+                text += delta
+                yield CompletionResponse(text=text, delta=delta, raw=response.raw)
+
+        return gen()
+
+    def _admit(self) -> None:
+        with self._lock:
+            self._counters["calls"] += 1
+            if self.rpm_limit is None:
+                return
+            now = self._clock()
+            while self._window and now - self._window[0] >= 60.0:
+                self._window.popleft()
+            if len(self._window) >= self.rpm_limit:
+                self._counters["rate_limited"] += 1
+                raise FakeRateLimitError()
+            self._window.append(now)
+
+    def _respond(self, prompt: str) -> CompletionResponse:
+        text = self._responder(prompt)
+        prompt_tokens = estimate_tokens(prompt)
+        completion_tokens = estimate_tokens(text)
+        with self._lock:
+            self._counters["prompt_tokens"] += prompt_tokens
+            self._counters["completion_tokens"] += completion_tokens
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens}
+        return CompletionResponse(text=text, raw={"usage": usage})
+
+
+class RateLimitedFakeLLM(RateLimitedLLMMixin, FakeLLM):
+    """FakeLLM routed through the shared limiter, for offline limiter tests."""
+
+    # FakeLLM's chat/stream methods delegate to complete/acomplete, which are
+    # already limited; limiting both layers would take two slots per call.
+    chat = FakeLLM.chat
+    achat = FakeLLM.achat
+    stream_chat = FakeLLM.stream_chat
+    astream_chat = FakeLLM.astream_chat
+    stream_complete = FakeLLM.stream_complete
+    astream_complete = FakeLLM.astream_complete
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "rate_limited_fake_llm"
+
+
+_RESUME_ID_RE = re.compile(r"resume_id:\s*(\S+)")
+# Tools the resume agent itself exposes (anything else is a structured-output tool)
+_AGENT_TOOLS = {"analyze_resume", "query_resume_data", "search_candidates"}
+
+
+class FakeAgentLLM(FakeLLM, FunctionCallingLLM):
+    """
+    FakeLLM that drives ``FunctionAgent`` through one tool round trip.
+
+    The first turn calls ``query_resume_data`` when the user message holds a
+    ``Query:`` line and ``analyze_resume`` otherwise, using the ``resume_id``
+    from the message; once a tool result is in the history it answers. A
+    lone unknown tool is treated as a structured-output program and called
+    with the responder's JSON as arguments.
+    """
+    model_name: str = "fake-agent-llm"
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "fake_agent_llm"
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(
+            context_window=self.context_window,
+            num_output=self.num_output,
+            model_name=self.model_name,
+            is_chat_model=True,
+            is_function_calling_model=True,
+        )
+
+    def _prepare_chat_with_tools(self, tools: Sequence[Any],
+                                 user_msg: Optional[Any] = None,
+                                 chat_history: Optional[List[ChatMessage]] = None,
+                                 verbose: bool = False,
+                                 allow_parallel_tool_calls: bool = False,
+                                 **kwargs: Any) -> Dict[str, Any]:
+        messages = list(chat_history or [])
+        if user_msg is not None:
+            messages.append(ChatMessage(role=MessageRole.USER, content=str(user_msg))
+                            if isinstance(user_msg, str) else user_msg)
+        return {"messages": messages, "tools": tools, **kwargs}
+
+    def get_tool_calls_from_response(self, response: ChatResponse,
+                                     error_on_no_tool_call: bool = True,
+                                     **kwargs: Any) -> List[ToolSelection]:
+        tool_calls = response.message.additional_kwargs.get("tool_calls", [])
+        if not tool_calls and error_on_no_tool_call:
+            raise ValueError("Expected at least one tool call.")
+        return tool_calls
+
+    @llm_chat_callback()
+    def chat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        self._admit()
+        if self.latency:
+            time.sleep(self.latency)
+        return self._agent_turn(messages, kwargs.get("tools"))
+
+    @llm_chat_callback()
+    async def achat(self, messages: Sequence[ChatMessage], **kwargs: Any) -> ChatResponse:
+        self._admit()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._agent_turn(messages, kwargs.get("tools"))
+
+    @llm_chat_callback()
+    async def astream_chat(self, messages: Sequence[ChatMessage],
+                           **kwargs: Any) -> ChatResponseAsyncGen:
+        response = await self.achat(messages, **kwargs)
+
+        async def gen() -> ChatResponseAsyncGen:
+            content = response.message.content or ""
+            if not content:
+                yield response
+                return
+            text = ""
+            for word in content.split(" "):
+                delta = word if not text else " " + word
+                text += delta
+                yield ChatResponse(
+                    message=ChatMessage(role=MessageRole.ASSISTANT, content=text,
+                                        additional_kwargs=response.message.additional_kwargs),
+                    delta=delta,
+                    raw=response.raw,
+                )
+
+        return gen()
+
+    def _agent_turn(self, messages: Sequence[ChatMessage],
+                    tools: Optional[Sequence[Any]]) -> ChatResponse:
+        prompt = "\n".join(str(m.content or "") for m in messages)
+        last = messages[-1] if messages else None
+        tool_names = {t.metadata.name for t in tools or []}
+        if not tool_names:
+            completion = self._respond(prompt)
+            return ChatResponse(message=ChatMessage(role=MessageRole.ASSISTANT,
+                                                    content=completion.text),
+                                raw=completion.raw)
+        if last is not None and last.role == MessageRole.TOOL:
+            completion = self._respond(prompt)
+            return ChatResponse(
+                message=ChatMessage(role=MessageRole.ASSISTANT,
+                                    content=f"Fake answer from tool output: {last.content}"),
+                raw=completion.raw,
+            )
+
+        if len(tools) == 1 and tools[0].metadata.name not in _AGENT_TOOLS:
+            # Structured-output program: the responder's JSON becomes the arguments
+            schema = json.dumps(tools[0].metadata.get_parameters_dict())
+            completion = self._respond(f"{prompt}\n{schema}")
+            selection = ToolSelection(tool_id="call_0", tool_name=tools[0].metadata.name,
+                                      tool_kwargs=json.loads(completion.text))
+            return ChatResponse(
+                message=ChatMessage(role=MessageRole.ASSISTANT, content="",
+                                    additional_kwargs={"tool_calls": [selection]}),
+                raw=completion.raw,
+            )
+
+        user_text = str(last.content or "")
+        match = _RESUME_ID_RE.search(user_text)
+        resume_id = match.group(1) if match else ""
+        if "Query:" in user_text and "query_resume_data" in tool_names:
+            selection = ToolSelection(
+                tool_id="call_0", tool_name="query_resume_data",
+                tool_kwargs={"resume_id": resume_id,
+                             "query": user_text.split("Query:", 1)[1].strip()},
+            )
+        else:
+            selection = ToolSelection(
+                tool_id="call_0", tool_name="analyze_resume", tool_kwargs={"resume_id": resume_id},
+            )
+        completion = self._respond(prompt)
+        return ChatResponse(
+            message=ChatMessage(role=MessageRole.ASSISTANT, content="",
+                                additional_kwargs={"tool_calls": [selection]}),
+            raw=completion.raw,
+        )
+
+
+class FakeEmbedding(BaseEmbedding):
+    """
+    Deterministic hashed bag-of-words embeddings with simulated latency.
+
+    Texts sharing words get similar vectors, so retrieval behaves plausibly
+    without a network call.
+    """
+    dim: int = 256
+    latency: float = 0.0
+
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+    _counters: Dict[str, int] = PrivateAttr(default_factory=dict)
+
+    def __init__(self, **kwargs: Any):
+        kwargs.setdefault("model_name", "fake-embedding")
+        super().__init__(**kwargs)
+        self._counters = {"calls": 0, "texts": 0, "tokens": 0}
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "fake_embedding"
+
+    @property
+    def counters(self) -> Dict[str, int]:
+        """Calls, embedded texts and token totals."""
+        with self._lock:
+            return dict(self._counters)
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._embed([query])[0]
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._vectors([query])[0]
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._embed([text])[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(texts)
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._vectors(texts)
+
+    def _vectors(self, texts: List[str]) -> List[List[float]]:
+        vectors = []
+        for text in texts:
+            vector = [0.0] * self.dim
+            for word in re.findall(r"\w+", text.lower()):
+                h = zlib.crc32(word.encode("utf-8"))
+                vector[h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+            norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+            vectors.append([v / norm for v in vector])
+        with self._lock:
+            self._counters["calls"] += 1
+            self._counters["texts"] += len(texts)
+            self._counters["tokens"] += sum(estimate_tokens(t) for t in texts)
+        return vectors
+
+
+class RateLimitedFakeEmbedding(RateLimitedEmbeddingMixin, FakeEmbedding):
+    """FakeEmbedding routed through the shared limiter, for offline limiter tests."""
+
+    # The default async text methods delegate to the (limited) sync ones
+    _aget_text_embedding = BaseEmbedding._aget_text_embedding
+    _aget_text_embeddings = BaseEmbedding._aget_text_embeddings
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "rate_limited_fake_embedding"
+
+
+def use_fake_backends(llm_latency: float = 0.0, embed_latency: float = 0.0) -> Dict[str, Any]:
+    """
+    Point the shared LLM, router, agent and embedding models at fakes.
+
+    For local runs and load tests without network access or API keys.
+    Vector indexes default to the in-memory backend.
+
+    Args:
+        llm_latency (float): Simulated seconds per LLM call.
+        embed_latency (float): Simulated seconds per embedding call.
+
+    Returns:
+        Dict[str, Any]: The installed ``llm``, ``agent_llm`` and ``embed_model``.
+    """
+    # pylint: disable=import-outside-toplevel
+    import os
+    from llama_index.core import Settings
+    import llm_registry
+
+    os.environ.setdefault("OPENAI_API_KEY", "sk-offline-fake")
+    os.environ.setdefault("RESUME_INDEX_BACKEND", "simple")
+    llm = FakeLLM(latency=llm_latency)
+    agent_llm = FakeAgentLLM(latency=llm_latency)
+    embed_model = FakeEmbedding(latency=embed_latency)
+    Settings.llm = llm
+    Settings.embed_model = embed_model
+    llm_registry.reset()
+    llm_registry.override("llm", llm)
+    llm_registry.override("router_llm", llm)
+    llm_registry.override("agent_llm", agent_llm)
+    llm_registry.override("embed_model", embed_model)
+    return {"llm": llm, "agent_llm": agent_llm, "embed_model": embed_model}
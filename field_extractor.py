@@ -0,0 +1,235 @@
+""" Deterministic Profile Field Extraction """
+import re
+from collections import deque
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+from schema import ExtractedFields
+
+# Bump when extraction rules or the gazetteer change (part of the cache key)
+EXTRACTOR_VERSION = "2"
+
+# Canonical skill name -> extra aliases (the lower-cased name always matches)
+SKILL_GAZETTEER: Dict[str, List[str]] = {
+    # Languages
+    "Python": [], "Java": [], "JavaScript": ["js"], "TypeScript": [], "Golang": [],
+    "Rust": [], "C++": ["cpp"], "C#": ["csharp"], "Ruby": [], "PHP": [],
+    "Kotlin": [], "Swift": [], "Scala": [], "SQL": [], "Bash": ["shell scripting"],
+    "HTML": [], "CSS": [],
+    # Frameworks & libraries
+    "Django": [], "Flask": [], "FastAPI": [], "React": ["react.js", "reactjs"],
+    "Angular": [], "Vue": ["vue.js", "vuejs"], "Node.js": ["nodejs"],
+    "Spring": ["spring boot"], "Rails": ["ruby on rails"], ".NET": ["dotnet"],
+    "Pandas": [], "NumPy": [], "scikit-learn": ["sklearn"], "PyTorch": [],
+    "TensorFlow": [], "Keras": [], "Transformers": ["huggingface transformers"],
+    "HuggingFace": ["hugging face"], "LlamaIndex": ["llama index", "llama-index"],
+    "LangChain": [], "DeepEval": [], "Spark": ["pyspark", "apache spark"],
+    "Airflow": ["apache airflow"], "Celery": [],
+    # AI / ML topics
+    "Machine Learning": ["ml"], "Deep Learning": [], "NLP": ["natural language processing"],
+    "Computer Vision": [], "LLM": ["llms", "large language models"],
+    "RAG": ["retrieval-augmented generation", "retrieval augmented generation"],
+    "Prompt Engineering": [], "MLOps": ["ml ops"],
+    # Data stores
+    "PostgreSQL": ["postgres"], "MySQL": [], "MongoDB": ["mongo"], "Redis": [],
+    "Elasticsearch": [], "Cassandra": [], "DynamoDB": [], "SQLite": [], "Snowflake": [],
+    "BigQuery": [], "Milvus": [], "Pinecone": [], "Kafka": ["apache kafka"], "RabbitMQ": [],
+    # Cloud & DevOps
+    "AWS": ["amazon web services"], "AWS EC2": ["ec2"], "AWS EKS": ["eks"],
+    "AWS Lambda": [], "AWS Sagemaker": ["sagemaker"], "GCP": ["google cloud"],
+    "GCP Cloud Run": ["cloud run"], "Azure": [], "Docker": [], "Kubernetes": ["k8s"],
+    "Terraform": [], "Ansible": [], "Jenkins": [], "GitHub Actions": [], "CI/CD": [],
+    "Git": [], "Linux": [], "Microservices": ["microservice"], "REST APIs": ["rest api", "restful"],
+    "GraphQL": [], "gRPC": [],
+}
+
+# Aliases this short need strict boundaries; these characters join tokens
+_SHORT_ALIAS_LEN = 3
+_JOINERS = "._@"
+
+# Labeled numbers ("Phone: ...") are tried before bare digit groups
+_PHONE_LABEL_RE = re.compile(
+    r"(?:phone|mobile|tel|cell)\s*[:.]?\s*(\+?\d[\d\s().-]{6,}\d)", re.IGNORECASE
+)
+_PHONE_RE = re.compile(r"(?<![\w/])(\+?\(?\d{1,4}\)?(?:[\s.-]\(?\d{2,5}\)?){2,4})(?![\w/])")
+_EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*\.[A-Za-z]{2,}")
+_YEARS_RE = re.compile(
+    r"(\d{1,2}(?:\.\d+)?)\s*\+?\s*(?:years?|yrs?)\b(?:\s+of)?", re.IGNORECASE
+)
+
+_MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+_DATE = r"(?:(?P<{p}m>[A-Za-z]{{3,9}})\.?\s+|(?P<{p}n>\d{{1,2}})/)?(?P<{p}y>(?:19|20)\d{{2}})"
+_RANGE_RE = re.compile(
+    _DATE.format(p="s") + r"\s*(?:-|–|—|to|until)\s*(?:"
+    + _DATE.format(p="e") + r"|(?P<present>present|current|now|today))",
+    re.IGNORECASE,
+)
+
+
+class SkillMatcher:
+    """
+    Aho-Corasick automaton over the skill gazetteer.
+
+    Scans the text once regardless of gazetteer size and reports canonical
+    skill names whose alias occurs on word boundaries. Short aliases ("js",
+    "ml", "k8s") must also not be glued to a neighbouring token by ".", "_"
+    or "@", so "node.js" or "model.ml" do not add JavaScript or ML.
+    """
+    def __init__(self, gazetteer: Optional[Dict[str, List[str]]] = None):
+        gazetteer = gazetteer or SKILL_GAZETTEER
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, str]]] = [[]]
+        for canonical, aliases in gazetteer.items():
+            for alias in {canonical.lower(), *(a.lower() for a in aliases)}:
+                self._add(alias, canonical)
+        self._build_failure_links()
+
+    def find(self, text: str) -> List[str]:
+        """Return canonical skills found in text, in order of first occurrence."""
+        text_low = text.lower()
+        found: Dict[str, int] = {}
+        state = 0
+        for end, char in enumerate(text_low):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for length, canonical in self._out[state]:
+                start = end - length + 1
+                if canonical not in found and _on_word_boundary(
+                        text_low, start, end + 1, strict=length <= _SHORT_ALIAS_LEN):
+                    found[canonical] = start
+        return sorted(found, key=found.get)
+
+    def _add(self, alias: str, canonical: str) -> None:
+        state = 0
+        for char in alias:
+            nxt = self._goto[state].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append((len(alias), canonical))
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(char, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+
+def _on_word_boundary(text: str, start: int, end: int, strict: bool = False) -> bool:
+    before = text[start - 1] if start > 0 else " "
+    after = text[end] if end < len(text) else " "
+    if before.isalnum() or before in "+#" or after.isalnum() or after in "+#":
+        return False
+    if not strict:
+        return True
+    # A trailing "." still ends a sentence ("... and JS.")
+    after_next = text[end + 1] if end + 1 < len(text) else " "
+    return before not in _JOINERS and not (after in _JOINERS and after_next.isalnum())
+
+
+_skill_matcher: Optional[SkillMatcher] = None
+
+
+def get_skill_matcher() -> SkillMatcher:
+    """Return the shared gazetteer automaton, building it on first use."""
+    global _skill_matcher  # pylint: disable=global-statement
+    if _skill_matcher is None:
+        _skill_matcher = SkillMatcher()
+    return _skill_matcher
+
+
+def extract_email(text: str) -> Optional[str]:
+    """Return the first email address in text."""
+    match = _EMAIL_RE.search(text)
+    return match.group(0) if match else None
+
+
+def extract_phone(text: str) -> Optional[str]:
+    """Return the first phone number in text, preferring labeled ones."""
+    for pattern in (_PHONE_LABEL_RE, _PHONE_RE):
+        for match in pattern.finditer(text):
+            candidate = match.group(1).strip()
+            digits = sum(c.isdigit() for c in candidate)
+            if 9 <= digits <= 15 and not _looks_like_year_range(candidate):
+                return candidate
+    return None
+
+
+def _looks_like_year_range(candidate: str) -> bool:
+    return re.fullmatch(r"(?:19|20)\d{2}\s*[-–]\s*(?:19|20)\d{2}", candidate) is not None
+
+
+def estimate_years_of_experience(text: str, today: Optional[date] = None) -> Optional[float]:
+    """Estimate total years of experience.
+
+    Explicit statements ("4+ years of experience") win; otherwise the
+    employment date ranges are merged (overlaps counted once) and summed.
+    """
+    stated = [float(m.group(1)) for m in _YEARS_RE.finditer(text)]
+    if stated:
+        return max(stated)
+
+    months = _merged_months(_date_ranges(text, today or date.today()))
+    return round(months / 12.0, 1) if months else None
+
+
+def _date_ranges(text: str, today: date) -> Iterable[Tuple[int, int]]:
+    for match in _RANGE_RE.finditer(text):
+        start = _month_index(match.group("sm"), match.group("sn"), match.group("sy"), first=True)
+        if match.group("present"):
+            end = today.year * 12 + today.month - 1
+        else:
+            end = _month_index(match.group("em"), match.group("en"), match.group("ey"), first=False)
+        if start is not None and end is not None and end >= start:
+            yield start, end
+
+
+def _month_index(month_name: Optional[str], month_num: Optional[str],
+                 year: str, first: bool) -> Optional[int]:
+    month = _MONTHS.get(month_name[:3].lower()) if month_name else None
+    if month is None and month_num:
+        month = int(month_num)
+        if not 1 <= month <= 12:
+            return None
+    if month is None:
+        month = 1 if first else 12
+    return int(year) * 12 + month - 1
+
+
+def _merged_months(ranges: Iterable[Tuple[int, int]]) -> int:
+    total = 0
+    current: Optional[Tuple[int, int]] = None
+    for start, end in sorted(ranges):
+        if current and start <= current[1] + 1:
+            current = (current[0], max(current[1], end))
+            continue
+        if current:
+            total += current[1] - current[0] + 1
+        current = (start, end)
+    if current:
+        total += current[1] - current[0] + 1
+    return total
+
+
+def extract_fields(text: str) -> ExtractedFields:
+    """Run every deterministic extractor over the resume text."""
+    return ExtractedFields(
+        email=extract_email(text),
+        phone=extract_phone(text),
+        technical_skills=get_skill_matcher().find(text),
+        years_of_experience=estimate_years_of_experience(text),
+    )
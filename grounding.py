@@ -0,0 +1,121 @@
+""" Deterministic Claim-Level Grounding Check """
+import re
+import difflib
+from typing import List, Optional, Set, Tuple
+from field_extractor import estimate_years_of_experience, get_skill_matcher
+from schema import GroundingResult, Profile, RoleType
+
+# Bump when the checks change (part of the analysis cache key)
+GROUNDING_VERSION = "1"
+
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+_WORD_RE = re.compile(r"[a-z0-9+#.]+")
+_YEARS_STATED_RE = re.compile(r"(\d{1,2}(?:\.\d+)?)\s*\+?\s*(?:years?|yrs?)\b", re.IGNORECASE)
+
+# Minimum difflib ratio for a skill to match a resume token ("kubernets" → "kubernetes")
+FUZZY_SKILL_RATIO = 0.85
+# Allowed gap between years_of_experience and what the text states / implies
+YEARS_TOLERANCE = 1.0
+
+
+def check_grounding(profile: Profile, resume_text: str) -> GroundingResult:
+    """
+    Verify a Profile's claims against the resume text without an LLM.
+
+    Checked claims:
+      - ``contact_info.email`` occurs in the text (case-insensitive)
+      - ``contact_info.phone`` digits occur in the text's digits
+      - each ``technical_skills`` entry occurs, via gazetteer alias, word
+        match or fuzzy token match
+      - ``years_of_experience`` is within ``YEARS_TOLERANCE`` of a stated
+        "N years" or the employment date ranges
+      - ``summary`` names only skills and numbers found in the text
+      - a TECH ``role_type`` is backed by at least one technical skill
+
+    MISSING_FIELD placeholders and absent fields are not claims.
+
+    Args:
+        profile (Profile): Classifier output.
+        resume_text (str): The text it was produced from.
+
+    Returns:
+        GroundingResult: Score (grounded / checked claims, 1.0 when nothing
+        was checkable) and the ungrounded field names.
+    """
+    text_lower = resume_text.lower()
+    text_skills = {skill.lower() for skill in get_skill_matcher().find(resume_text)}
+    tokens: Optional[List[str]] = None
+    claims: List[Tuple[str, bool]] = []
+
+    contact = profile.contact_info
+    if _claimed(contact.email):
+        claims.append(("contact_info.email", contact.email.strip().lower() in text_lower))
+    if _claimed(contact.phone):
+        digits = _digits(contact.phone)
+        claims.append(("contact_info.phone", len(digits) >= 7 and digits in _digits(resume_text)))
+
+    for skill in profile.technical_skills or []:
+        if not _claimed(skill):
+            continue
+        grounded = _skill_in_text(skill, text_lower, text_skills)
+        if not grounded:
+            if tokens is None:
+                tokens = sorted(set(_WORD_RE.findall(text_lower)))
+            grounded = bool(difflib.get_close_matches(skill.lower(), tokens, n=1,
+                                                      cutoff=FUZZY_SKILL_RATIO))
+        claims.append((f"technical_skills[{skill}]", grounded))
+
+    years = profile.years_of_experience
+    if isinstance(years, (int, float)) and not isinstance(years, bool):
+        claims.append(("years_of_experience", _years_supported(float(years), resume_text)))
+
+    if _claimed(profile.summary):
+        claims.append(("summary", _summary_supported(profile.summary, text_lower, text_skills,
+                                                     resume_text)))
+
+    if profile.role_type == RoleType.TECH:
+        claims.append(("role_type", bool(text_skills)))
+
+    ungrounded = [name for name, grounded in claims if not grounded]
+    score = (len(claims) - len(ungrounded)) / len(claims) if claims else 1.0
+    return GroundingResult(score=round(score, 4), claims=len(claims),
+                           ungrounded_fields=ungrounded)
+
+
+def _claimed(value: Optional[str]) -> bool:
+    return isinstance(value, str) and bool(value.strip()) and not value.startswith("MISSING_FIELD")
+
+
+def _digits(text: str) -> str:
+    return "".join(c for c in text if c.isdigit())
+
+
+def _skill_in_text(skill: str, text_lower: str, text_skills: Set[str]) -> bool:
+    found = get_skill_matcher().find(skill)
+    if found and found[0].lower() in text_skills:
+        return True
+    return re.search(rf"(?<!\w){re.escape(skill.strip().lower())}(?!\w)", text_lower) is not None
+
+
+def _years_supported(years: float, resume_text: str) -> bool:
+    candidates = [float(m.group(1)) for m in _YEARS_STATED_RE.finditer(resume_text)]
+    estimated = estimate_years_of_experience(resume_text)
+    if estimated is not None:
+        candidates.append(estimated)
+    return any(abs(years - value) <= YEARS_TOLERANCE for value in candidates)
+
+
+def _summary_supported(summary: str, text_lower: str, text_skills: Set[str],
+                       resume_text: str) -> bool:
+    """Every skill and number the summary names must be backed by the text."""
+    for skill in get_skill_matcher().find(summary):
+        if skill.lower() not in text_skills:
+            return False
+    text_numbers = set(_NUMBER_RE.findall(text_lower))
+    for number in _NUMBER_RE.findall(summary):
+        if number in text_numbers:
+            continue
+        # "over 6 years" may be derived from date ranges rather than stated
+        if not _years_supported(float(number), resume_text):
+            return False
+    return True
@@ -0,0 +1,200 @@
+""" Rate-Limited LLM Clients """
+from typing import Any, List, Optional, Sequence, Tuple
+from llama_index.core.base.llms.types import ChatMessage
+from llama_index.embeddings.openai import OpenAIEmbedding
+from llama_index.llms.openai import OpenAI
+from rate_limiter import estimate_tokens, get_rate_limiter
+from tracing import is_tracing, record_llm_usage
+
+# Completion tokens reserved against the TPM budget when max_tokens is unset
+DEFAULT_COMPLETION_RESERVE = 256
+
+
+class RateLimitedLLMMixin:
+    """
+    Routes every chat/complete call (sync, async, streaming) through the
+    shared ``AdaptiveRateLimiter``.
+
+    Mix in before a concrete LLM class, e.g. ``class X(RateLimitedLLMMixin, OpenAI)``.
+    Tool-calling helpers (``achat_with_tools`` etc.) delegate to these methods,
+    so agents are limited too. Token usage of non-streaming calls is also
+    attributed to the active tracing span.
+    """
+
+    def chat(self, messages: Sequence[ChatMessage], **kwargs: Any):
+        """Rate-limited ``chat``."""
+        tokens = self._estimate_messages(messages)
+        return get_rate_limiter().call(
+            lambda: super(RateLimitedLLMMixin, self).chat(messages, **kwargs),
+            tokens, usage=lambda r: self._record_usage(r, tokens),
+        )
+
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any):
+        """Rate-limited ``complete``."""
+        tokens = self._estimate_prompt(prompt)
+        return get_rate_limiter().call(
+            lambda: super(RateLimitedLLMMixin, self).complete(prompt, formatted=formatted, **kwargs),
+            tokens, usage=lambda r: self._record_usage(r, tokens),
+        )
+
+    def stream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any):
+        """Rate-limited ``stream_chat``; the slot is held until the stream ends."""
+        return get_rate_limiter().stream(
+            lambda: super(RateLimitedLLMMixin, self).stream_chat(messages, **kwargs),
+            self._estimate_messages(messages),
+        )
+
+    def stream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any):
+        """Rate-limited ``stream_complete``; the slot is held until the stream ends."""
+        return get_rate_limiter().stream(
+            lambda: super(RateLimitedLLMMixin, self).stream_complete(
+                prompt, formatted=formatted, **kwargs),
+            self._estimate_prompt(prompt),
+        )
+
+    async def achat(self, messages: Sequence[ChatMessage], **kwargs: Any):
+        """Rate-limited ``achat``."""
+        tokens = self._estimate_messages(messages)
+        return await get_rate_limiter().acall(
+            lambda: super(RateLimitedLLMMixin, self).achat(messages, **kwargs),
+            tokens, usage=lambda r: self._record_usage(r, tokens),
+        )
+
+    async def acomplete(self, prompt: str, formatted: bool = False, **kwargs: Any):
+        """Rate-limited ``acomplete``."""
+        tokens = self._estimate_prompt(prompt)
+        return await get_rate_limiter().acall(
+            lambda: super(RateLimitedLLMMixin, self).acomplete(prompt, formatted=formatted, **kwargs),
+            tokens, usage=lambda r: self._record_usage(r, tokens),
+        )
+
+    async def astream_chat(self, messages: Sequence[ChatMessage], **kwargs: Any):
+        """Rate-limited ``astream_chat``; the slot is held until the stream ends."""
+        return get_rate_limiter().astream(
+            lambda: super(RateLimitedLLMMixin, self).astream_chat(messages, **kwargs),
+            self._estimate_messages(messages),
+        )
+
+    async def astream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any):
+        """Rate-limited ``astream_complete``; the slot is held until the stream ends."""
+        return get_rate_limiter().astream(
+            lambda: super(RateLimitedLLMMixin, self).astream_complete(
+                prompt, formatted=formatted, **kwargs),
+            self._estimate_prompt(prompt),
+        )
+
+    def _record_usage(self, response: Any, estimated: int) -> Optional[int]:
+        """Trace the call's tokens; return the API-reported total, if any."""
+        reported = _usage_tokens(response)
+        if not is_tracing():
+            return None if reported is None else sum(reported)
+        if reported is None:
+            reserve = getattr(self, "max_tokens", None) or DEFAULT_COMPLETION_RESERVE
+            prompt_tokens = max(estimated - reserve, 0)
+            completion_tokens = estimate_tokens(str(getattr(response, "text", None) or response))
+        else:
+            prompt_tokens, completion_tokens = reported
+        record_llm_usage(self.metadata.model_name, prompt_tokens, completion_tokens)
+        return None if reported is None else prompt_tokens + completion_tokens
+
+    def _estimate_messages(self, messages: Sequence[ChatMessage]) -> int:
+        return self._estimate_prompt("\n".join(str(m.content or "") for m in messages))
+
+    def _estimate_prompt(self, prompt: str) -> int:
+        reserve = getattr(self, "max_tokens", None) or DEFAULT_COMPLETION_RESERVE
+        return estimate_tokens(prompt) + reserve
+
+
+class RateLimitedOpenAI(RateLimitedLLMMixin, OpenAI):
+    """
+    ``OpenAI`` LLM whose requests share the process-wide RPM/TPM budget.
+
+    The OpenAI SDK's own retries are disabled by default so 429s reach the
+    limiter, which backs off and retries for every stage at once.
+    """
+    def __init__(self, **kwargs: Any):
+        kwargs.setdefault("max_retries", 0)
+        super().__init__(**kwargs)
+
+    @classmethod
+    def class_name(cls) -> str:
+        """Name used when serializing the component."""
+        return "rate_limited_openai_llm"
+
+
+class RateLimitedEmbeddingMixin:
+    """
+    Routes every embedding request (query, single text and batch; sync and
+    async) through the shared ``AdaptiveRateLimiter``.
+
+    Mix in before a concrete embedding class. Requests take a slot and count
+    their estimated input tokens against the same budgets as LLM calls, so
+    index ingest and query embeddings are throttled, backed off on 429 and
+    ordered by the priority scheduler like every other stage.
+    """
+
+    def _get_query_embedding(self, query: str):
+        return get_rate_limiter().call(
+            lambda: super(RateLimitedEmbeddingMixin, self)._get_query_embedding(query),
+            estimate_tokens(query),
+        )
+
+    async def _aget_query_embedding(self, query: str):
+        return await get_rate_limiter().acall(
+            lambda: super(RateLimitedEmbeddingMixin, self)._aget_query_embedding(query),
+            estimate_tokens(query),
+        )
+
+    def _get_text_embedding(self, text: str):
+        return get_rate_limiter().call(
+            lambda: super(RateLimitedEmbeddingMixin, self)._get_text_embedding(text),
+            estimate_tokens(text),
+        )
+
+    async def _aget_text_embedding(self, text: str):
+        return await get_rate_limiter().acall(
+            lambda: super(RateLimitedEmbeddingMixin, self)._aget_text_embedding(text),
+            estimate_tokens(text),
+        )
+
+    def _get_text_embeddings(self, texts: List[str]):
+        return get_rate_limiter().call(
+            lambda: super(RateLimitedEmbeddingMixin, self)._get_text_embeddings(texts),
+            sum(estimate_tokens(text) for text in texts),
+        )
+
+    async def _aget_text_embeddings(self, texts: List[str]):
+        return await get_rate_limiter().acall(
+            lambda: super(RateLimitedEmbeddingMixin, self)._aget_text_embeddings(texts),
+            sum(estimate_tokens(text) for text in texts),
+        )
+
+
+class RateLimitedOpenAIEmbedding(RateLimitedEmbeddingMixin, OpenAIEmbedding):
+    """
+    ``OpenAIEmbedding`` whose requests share the process-wide RPM/TPM budget.
+
+    SDK retries are disabled by default, as for ``RateLimitedOpenAI``.
+    """
+    def __init__(self, **kwargs: Any):
+        kwargs.setdefault("max_retries", 0)
+        super().__init__(**kwargs)
+
+    @classmethod
+    def class_name(cls) -> str:
+        """Name used when serializing the component."""
+        return "rate_limited_openai_embedding"
+
+
+def _usage_tokens(response: Any) -> Optional[Tuple[int, int]]:
+    """(prompt, completion) tokens reported by the API for a response, if available."""
+    raw = getattr(response, "raw", None)
+    usage = raw.get("usage") if isinstance(raw, dict) else getattr(raw, "usage", None)
+    if usage is None:
+        return None
+    if not isinstance(usage, dict):
+        usage = {key: getattr(usage, key, None) for key in ("prompt_tokens", "completion_tokens")}
+    prompt_tokens, completion_tokens = usage.get("prompt_tokens"), usage.get("completion_tokens")
+    if prompt_tokens is None or completion_tokens is None:
+        return None
+    return int(prompt_tokens), int(completion_tokens)
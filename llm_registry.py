@@ -0,0 +1,146 @@
+""" Lazy LLM / Embedding / Program Registry """
+import os
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LLM_MODEL = "gpt-3.5-turbo"
+DEFAULT_EMBED_MODEL = "text-embedding-ada-002"
+
+_lock = threading.RLock()
+_env_loaded = False
+_factories: Dict[str, Callable[[], Any]] = {}
+_instances: Dict[str, Any] = {}
+
+
+def load_env() -> None:
+    """Load ``.env`` once per process, on first use rather than at import."""
+    global _env_loaded  # pylint: disable=global-statement
+    if _env_loaded:
+        return
+    with _lock:
+        if not _env_loaded:
+            from dotenv import load_dotenv  # pylint: disable=import-outside-toplevel
+            load_dotenv()
+            _env_loaded = True
+
+
+def register(name: str, factory: Callable[[], Any]) -> None:
+    """Set the factory for name; an already built instance is dropped."""
+    with _lock:
+        _factories[name] = factory
+        _instances.pop(name, None)
+
+
+def override(name: str, instance: Any) -> None:
+    """Use instance for name from now on (tests, benchmarks, fake backends)."""
+    with _lock:
+        _instances[name] = instance
+
+
+def reset(name: Optional[str] = None) -> None:
+    """Forget built instances (all of them, or just name); factories stay."""
+    with _lock:
+        if name is None:
+            _instances.clear()
+        else:
+            _instances.pop(name, None)
+
+
+def get(name: str) -> Any:
+    """Return the shared object for name, building it on first use.
+
+    Raises:
+        KeyError: If no factory is registered for name.
+    """
+    instance = _instances.get(name)
+    if instance is not None:
+        return instance
+    with _lock:
+        if name not in _instances:
+            if name not in _factories:
+                raise KeyError(f"No factory registered for {name!r}")
+            load_env()
+            logger.debug("Building shared %s...", name)
+            _instances[name] = _factories[name]()
+        return _instances[name]
+
+
+def http_client():
+    """Shared ``httpx.Client`` (one connection pool for every sync client)."""
+    return get("http_client")
+
+
+def async_http_client():
+    """Shared ``httpx.AsyncClient`` (one connection pool for every async client)."""
+    return get("async_http_client")
+
+
+def get_llm():
+    """LLM used by the classifier, evaluator and query engine."""
+    return get("llm")
+
+
+def get_router_llm():
+    """Deterministic (temperature 0) LLM for the router's last tier."""
+    return get("router_llm")
+
+
+def get_agent_llm():
+    """LLM driving the resume agent."""
+    return get("agent_llm")
+
+
+def get_embed_model():
+    """Embedding model for the resume index."""
+    return get("embed_model")
+
+
+def _limits():
+    import httpx  # pylint: disable=import-outside-toplevel
+    return {
+        "limits": httpx.Limits(
+            max_connections=int(os.getenv("OPENAI_MAX_CONNECTIONS", "100")),
+            max_keepalive_connections=int(os.getenv("OPENAI_MAX_KEEPALIVE", "20")),
+        ),
+        "timeout": httpx.Timeout(float(os.getenv("OPENAI_TIMEOUT", "60")), connect=5.0),
+    }
+
+
+def _build_http_client():
+    import httpx  # pylint: disable=import-outside-toplevel
+    return httpx.Client(**_limits())
+
+
+def _build_async_http_client():
+    import httpx  # pylint: disable=import-outside-toplevel
+    return httpx.AsyncClient(**_limits())
+
+
+def _build_openai_llm(**kwargs: Any):
+    from limited_llm import RateLimitedOpenAI  # pylint: disable=import-outside-toplevel
+    return RateLimitedOpenAI(
+        model=os.getenv("OPENAI_MODEL", DEFAULT_LLM_MODEL),
+        http_client=http_client(),
+        async_http_client=async_http_client(),
+        **kwargs,
+    )
+
+
+def _build_embed_model():
+    from limited_llm import RateLimitedOpenAIEmbedding  # pylint: disable=import-outside-toplevel
+    return RateLimitedOpenAIEmbedding(
+        model=os.getenv("OPENAI_EMBED_MODEL", DEFAULT_EMBED_MODEL),
+        http_client=http_client(),
+        async_http_client=async_http_client(),
+    )
+
+
+register("http_client", _build_http_client)
+register("async_http_client", _build_async_http_client)
+register("llm", _build_openai_llm)
+register("router_llm", lambda: _build_openai_llm(temperature=0.0))
+register("agent_llm", _build_openai_llm)
+register("embed_model", _build_embed_model)
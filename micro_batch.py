@@ -0,0 +1,106 @@
+""" Async Micro-Batching """
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOW = 0.02
+DEFAULT_MAX_BATCH = 8
+
+
+class _Window:
+    """Items collected on one event loop, waiting for the next flush."""
+    __slots__ = ("items", "futures", "timer")
+
+    def __init__(self):
+        self.items: List[Any] = []
+        self.futures: List["asyncio.Future[Any]"] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class MicroBatcher:
+    """
+    Groups items submitted by concurrent callers within ``window`` seconds
+    (or until ``max_batch`` are waiting) and passes them to ``handler`` as
+    one list, so independent requests can share a single batched LLM call.
+
+    ``handler`` takes the list of items and returns one result per item, in
+    order; an exception it raises is delivered to every caller in the batch.
+    A lone request waits at most ``window`` seconds longer than it would
+    unbatched.
+    """
+    def __init__(self,
+                 name: str,
+                 handler: Callable[[List[Any]], Awaitable[List[Any]]],
+                 window: float = DEFAULT_WINDOW,
+                 max_batch: int = DEFAULT_MAX_BATCH):
+        if max_batch < 1:
+            raise ValueError("max_batch must be at least 1.")
+        self.name = name
+        self.handler = handler
+        self.window = window
+        self.max_batch = max_batch
+        self._lock = threading.Lock()
+        self._windows: Dict[int, _Window] = {}
+        self._stats = {"batches": 0, "items": 0, "largest_batch": 0, "failed_batches": 0}
+
+    async def submit(self, item: Any) -> Any:
+        """Queue item for the next batch and wait for its result.
+
+        Raises:
+            Exception: Whatever the handler raised for this item's batch.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            window = self._windows.get(id(loop))
+            if window is None:
+                window = self._windows[id(loop)] = _Window()
+                window.timer = loop.call_later(self.window, self._flush, loop)
+            window.items.append(item)
+            window.futures.append(future)
+            full = len(window.items) >= self.max_batch
+        if full:
+            self._flush(loop)
+        return await future
+
+    def stats(self) -> Dict[str, Any]:
+        """Batch / item counts, the largest batch and the mean batch size."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["mean_batch_size"] = (round(stats["items"] / stats["batches"], 2)
+                                    if stats["batches"] else None)
+        return stats
+
+    def _flush(self, loop: asyncio.AbstractEventLoop) -> None:
+        with self._lock:
+            window = self._windows.pop(id(loop), None)
+        if window is None:
+            return
+        if window.timer is not None:
+            window.timer.cancel()
+        loop.create_task(self._run(window))
+
+    async def _run(self, window: _Window) -> None:
+        with self._lock:
+            self._stats["batches"] += 1
+            self._stats["items"] += len(window.items)
+            self._stats["largest_batch"] = max(self._stats["largest_batch"], len(window.items))
+        try:
+            results = await self.handler(window.items)
+            if len(results) != len(window.items):
+                raise RuntimeError(f"{self.name}: handler returned {len(results)} results "
+                                   f"for {len(window.items)} items")
+        except Exception as e:  # pylint: disable=broad-except
+            logger.warning("%s: batch of %d failed: %s", self.name, len(window.items), e)
+            with self._lock:
+                self._stats["failed_batches"] += 1
+            for future in window.futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for future, result in zip(window.futures, results):
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,248 @@
+""" Near-Duplicate Resume Detection (MinHash + LSH) """
+import os
+import re
+import logging
+import threading
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import llm_registry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THRESHOLD = 0.9
+DEFAULT_MAX_ENTRIES = 1_000_000
+
+_WORD_RE = re.compile(r"[a-z0-9+#]+")
+_DIGITS_RE = re.compile(r"\d+")
+# Largest prime below 2**32: (a * x + b) with a, b, x < 2**32 fits in uint64
+_PRIME = np.uint64(4294967291)
+_ROW_MULT = np.uint64(0x9E3779B97F4A7C15)
+_EMPTY = 0
+# Every live table key has the top bit set, so it never equals _EMPTY
+_KEY_BIT = np.uint64(1 << 63)
+
+
+class NearDupIndex:
+    """
+    MinHash signatures of shingled, normalized resume text with an LSH
+    band table, for finding lightly edited copies (whitespace, reordered
+    skills, a new phone number) that exact content hashing misses.
+
+    - Text is normalized (``shingle_text``: lower-cased, digit runs masked,
+      comma-separated lists sorted) and reduced to word tokens;
+      ``shingle_size``-word shingles are hashed and min-hashed with
+      ``num_perm`` permutations.
+    - The signature is split into ``bands`` bands; two resumes become
+      candidates when any band matches, and a candidate counts as a
+      duplicate when its estimated Jaccard similarity (share of equal
+      signature positions) is at least ``threshold``.
+    - Storage is fixed-size numpy arrays sized for ``max_entries``
+      signatures: a ring buffer (the oldest entry is evicted first) and an
+      open-addressing band table (linear probing, at most half full).
+      Evicted keys are removed by shifting later cells of their probe run
+      back, so the table never accumulates tombstones or needs a rebuild.
+      Pages are only touched as entries are added; a full index takes about
+      1 KB per resume plus its reference.
+
+    Each entry carries an opaque ``ref`` string (``resume_skill`` stores the
+    analysis cache key of the resume it was built from).
+    """
+    def __init__(self,
+                 threshold: float = DEFAULT_THRESHOLD,
+                 num_perm: int = 128,
+                 bands: int = 16,
+                 shingle_size: int = 3,
+                 max_entries: int = DEFAULT_MAX_ENTRIES,
+                 seed: int = 1):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.max_entries = max_entries
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, int(_PRIME), size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, int(_PRIME), size=num_perm, dtype=np.uint64)
+        self._band_salt = rng.integers(0, 2**63, size=bands, dtype=np.uint64)
+        self._row_powers = _ROW_MULT ** np.arange(1, self.rows + 1, dtype=np.uint64)
+
+        self._lock = threading.Lock()
+        self._signatures = np.zeros((max_entries, num_perm), dtype=np.uint32)
+        self._band_keys = np.zeros((max_entries, bands), dtype=np.uint64)
+        self._refs: List[Optional[str]] = [None] * max_entries
+        self._next_slot = 0
+        self._size = 0
+        table_size = 1 << max(4, (2 * max_entries * bands - 1).bit_length())
+        self._mask = table_size - 1
+        self._table_keys = np.zeros(table_size, dtype=np.uint64)
+        self._table_slots = np.zeros(table_size, dtype=np.int32)
+        self._stats = {"lookups": 0, "duplicates": 0, "adds": 0, "evictions": 0}
+
+    def signature(self, text: str) -> np.ndarray:
+        """MinHash signature (``num_perm`` uint32 values) of the text's shingles."""
+        words = _WORD_RE.findall(shingle_text(text))
+        if not words:
+            return np.full(self.num_perm, 0xFFFFFFFF, dtype=np.uint32)
+        hashes = np.fromiter((zlib.crc32(word.encode("utf-8")) for word in words),
+                             dtype=np.uint64, count=len(words))
+        k = min(self.shingle_size, len(hashes))
+        shingles = hashes[:len(hashes) - k + 1].copy()
+        for offset in range(1, k):
+            shingles = shingles * _ROW_MULT + hashes[offset:len(hashes) - k + 1 + offset]
+        shingles = np.unique(shingles & np.uint64(0xFFFFFFFF))
+        permuted = (self._a[:, None] * shingles[None, :] + self._b[:, None]) % _PRIME
+        return permuted.min(axis=1).astype(np.uint32)
+
+    def query(self, text: Optional[str] = None,
+              signature: Optional[np.ndarray] = None) -> Optional[Tuple[str, float]]:
+        """Find the most similar stored resume at or above the threshold.
+
+        Args:
+            text (Optional[str]): Resume text (ignored when signature is given).
+            signature (Optional[np.ndarray]): Precomputed ``signature(text)``.
+
+        Returns:
+            Optional[Tuple[str, float]]: The stored ``ref`` and the estimated
+            Jaccard similarity, or None when nothing is close enough.
+        """
+        signature = self.signature(text) if signature is None else signature
+        keys = self._keys(signature)
+        with self._lock:
+            self._stats["lookups"] += 1
+            candidates = {slot for slot in (self._find(int(key)) for key in keys)
+                          if slot is not None}
+            best: Optional[Tuple[str, float]] = None
+            for slot in candidates:
+                similarity = float(np.count_nonzero(self._signatures[slot] == signature)
+                                   ) / self.num_perm
+                if similarity >= self.threshold and (best is None or similarity > best[1]):
+                    best = (self._refs[slot], round(similarity, 4))
+            if best is not None:
+                self._stats["duplicates"] += 1
+            return best
+
+    def add(self, ref: str, text: Optional[str] = None,
+            signature: Optional[np.ndarray] = None) -> None:
+        """Store a resume's signature under ref, evicting the oldest when full."""
+        signature = self.signature(text) if signature is None else signature
+        keys = self._keys(signature)
+        with self._lock:
+            slot = self._next_slot
+            if self._refs[slot] is not None:
+                self._remove_slot(slot)
+                self._stats["evictions"] += 1
+            else:
+                self._size += 1
+            self._signatures[slot] = signature
+            self._band_keys[slot] = keys
+            self._refs[slot] = ref
+            for key in keys:
+                self._insert(int(key), slot)
+            self._next_slot = (slot + 1) % self.max_entries
+            self._stats["adds"] += 1
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._size
+
+    def stats(self) -> Dict[str, Any]:
+        """Lookup / duplicate / add / eviction counters and current size."""
+        with self._lock:
+            return {**self._stats, "entries": self._size}
+
+    def _keys(self, signature: np.ndarray) -> np.ndarray:
+        rows = signature.reshape(self.bands, self.rows).astype(np.uint64)
+        return ((rows * self._row_powers).sum(axis=1) ^ self._band_salt) | _KEY_BIT
+
+    def _find(self, key: int) -> Optional[int]:
+        i = (key >> 7) & self._mask
+        while True:
+            cell = int(self._table_keys[i])
+            if cell == _EMPTY:
+                return None
+            if cell == key:
+                return int(self._table_slots[i])
+            i = (i + 1) & self._mask
+
+    def _insert(self, key: int, slot: int) -> None:
+        """Point key at slot (the newest resume wins a shared band)."""
+        i = (key >> 7) & self._mask
+        while True:
+            cell = int(self._table_keys[i])
+            if cell == key or cell == _EMPTY:
+                break
+            i = (i + 1) & self._mask
+        self._table_keys[i] = key
+        self._table_slots[i] = slot
+
+    def _remove_slot(self, slot: int) -> None:
+        for key in self._band_keys[slot]:
+            key = int(key)
+            i = (key >> 7) & self._mask
+            while True:
+                cell = int(self._table_keys[i])
+                if cell == _EMPTY:
+                    break
+                if cell == key:
+                    if int(self._table_slots[i]) == slot:
+                        self._delete_cell(i)
+                    break
+                i = (i + 1) & self._mask
+        self._refs[slot] = None
+
+    def _delete_cell(self, i: int) -> None:
+        """Empty cell i, shifting later cells of its probe run back into the gap."""
+        j = i
+        while True:
+            j = (j + 1) & self._mask
+            cell = int(self._table_keys[j])
+            if cell == _EMPTY:
+                break
+            home = (cell >> 7) & self._mask
+            # The cell may fill the gap unless its home lies in (i, j]
+            if (j - home) & self._mask >= (j - i) & self._mask:
+                self._table_keys[i] = cell
+                self._table_slots[i] = self._table_slots[j]
+                i = j
+        self._table_keys[i] = _EMPTY
+
+
+def shingle_text(text: str) -> str:
+    """Normalize resume text so cosmetic edits do not change its shingles.
+
+    Lower-cases, masks digit runs (phone numbers, dates and IDs are
+    re-extracted per resume anyway) and sorts the items of comma-separated
+    lists so reordered skills shingle identically.
+    """
+    lines = []
+    for line in _DIGITS_RE.sub("0", (text or "").lower()).splitlines():
+        if line.count(",") >= 2:
+            line = ", ".join(sorted(item.strip() for item in line.split(",")))
+        lines.append(line)
+    return "\n".join(lines)
+
+
+_near_dup_index: Optional[NearDupIndex] = None
+_near_dup_index_loaded = False
+
+
+def get_near_dup_index() -> Optional[NearDupIndex]:
+    """Return the process-wide near-duplicate index, or None when disabled.
+
+    Configured by ``NEAR_DUP`` (set to 0 to disable), ``NEAR_DUP_THRESHOLD``
+    and ``NEAR_DUP_MAX_ENTRIES``.
+    """
+    global _near_dup_index, _near_dup_index_loaded  # pylint: disable=global-statement
+    if not _near_dup_index_loaded:
+        llm_registry.load_env()
+        if os.getenv("NEAR_DUP", "1").lower() not in ("0", "false", "no"):
+            _near_dup_index = NearDupIndex(
+                threshold=float(os.getenv("NEAR_DUP_THRESHOLD", str(DEFAULT_THRESHOLD))),
+                max_entries=int(os.getenv("NEAR_DUP_MAX_ENTRIES", str(DEFAULT_MAX_ENTRIES))),
+            )
+        _near_dup_index_loaded = True
+    return _near_dup_index
@@ -24,12 +24,13 @@ Rules:
 - Do NOT assume technical skills unless explicitly stated.
 - Do NOT hallucinate any missing information.
 
+Contact details, technical skills and years of experience are extracted
+separately; do NOT return them.
+
 Return ONLY:
 1. role_type (TECH / NON_TECH / UNKNOWN)
 2. confidence_score (0.0-1.0)
-3. reasoning (1-2 sentences)
-4. technical_keywords (explicitly mentioned technical terms)
-5. non_technical_keywords (explicitly mentioned non-technical terms)
+3. summary (2 sentences, TECH only; omit otherwise)
 
 """
 )
@@ -54,6 +55,39 @@ CLASSIFIER_PROMPT = ChatPromptTemplate(
     ]
 )
 
+# Batched variant: the system prompt is paid once for several resumes
+CLASSIFIER_BATCH_PROMPT = ChatPromptTemplate(
+    message_templates=[
+        ChatMessage(
+            role="system",
+            content=SYSTEM_PROMPT + (
+                "You will receive several resumes, each wrapped in a <resume> tag "
+                "with an id attribute. Classify every resume independently and "
+                "return one assessment per resume with its id copied exactly.\n"
+            )
+        ),
+        ChatMessage(
+            role="user",
+            content=(
+                "Extract the required fields from each of these resumes:\n"
+                "{resumes}"
+            ),
+        ),
+    ]
+)
+
+# Direct context mode: short resumes go into the prompt whole, no retrieval
+RESUME_DIRECT_QUERY_PROMPT = PromptTemplate(
+    "Below is a candidate's full resume.\n"
+    "------\n"
+    "{resume_text}\n"
+    "------\n"
+    "Answer the question using only the resume. If the resume does not "
+    "contain the answer, say so.\n"
+    "Question: {query_str}\n"
+    "Answer: "
+)
+
 RESUME_ROUTER_PROMPT = PromptTemplate("""
     You are an expert resume validator. Respond ONLY with valid JSON.
     Is the following text a candidate's resume/CV?
@@ -67,6 +101,18 @@ RESUME_ROUTER_PROMPT = PromptTemplate("""
     """
 )
 
+# Function-calling variant: the schema travels as the tool definition
+RESUME_ROUTER_FUNCTION_PROMPT = PromptTemplate("""
+    You are an expert resume validator.
+    Is the following text a candidate's resume/CV?
+    Rules:
+    - Real resumes contain: work experience, skills, education, contact info (email/phone), job titles
+    - NOT resumes: job ads, invoices, recipes, articles, emails, code, legal docs
+    Text:
+    {query_str}
+    """
+)
+
 '''
 AGENT_SYSTEM_PROMPT = """
 You are a Resume Analyzer Assistant.
@@ -89,14 +135,22 @@ include extract tool output the evaluation result from the tool output.
 AGENT_SYSTEM_PROMPT = """
 You are a Resume Analyzer Assistant. Your task is to analyze resumes and answer user questions based on them. You have access to the following tools:
 
-1. resume_classifier
+1. analyze_resume
    - Description: Analyzes the content of a resume.
-   - Use this tool when the user provides resume text and wants a structured evaluation or classification of the resume.
+   - Use this tool when the user wants a structured evaluation or classification of the resume.
 
-2. query_resume
+2. query_resume_data
    - Description: Answers specific questions based on a given resume.
    - Use this tool when the user asks a question about a resume.
 
+3. search_candidates
+   - Description: Ranks candidates across every analyzed resume.
+   - Use this tool when the user asks for candidates matching skills or experience.
+
+Resumes are referenced by a short resume_id followed by a one-line synopsis.
+The full text is NOT in the conversation: always pass the resume_id to the tools
+and never answer from the synopsis alone.
+
 RULES:
 - Always use the tool outputs exactly as provided; do not alter or interpret them.
 - Do not hallucinate or assume missing details.
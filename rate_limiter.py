@@ -0,0 +1,411 @@
+""" Shared OpenAI Rate Limiter """
+import os
+import time
+import asyncio
+import logging
+import threading
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, Optional
+import llm_registry
+from scheduler import PriorityScheduler, Ticket, get_scheduler
+
+logger = logging.getLogger(__name__)
+
+# Rough characters-per-token ratio for English prose when tiktoken is missing
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of text before it is sent to the API."""
+    if not text:
+        return 0
+    encoding = _encoding()
+    if encoding is None:
+        return max(1, len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text))
+
+
+_ENCODING = None
+_ENCODING_LOADED = False
+
+
+def _encoding():
+    """tiktoken's cl100k_base, or None when it cannot be loaded.
+
+    Loading may download the encoding; a failure (no tiktoken, offline) is
+    remembered so later estimates do not block on it again.
+    """
+    global _ENCODING, _ENCODING_LOADED  # pylint: disable=global-statement
+    if not _ENCODING_LOADED:
+        try:
+            # pylint: disable=import-outside-toplevel
+            import tiktoken
+            _ENCODING = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:  # pylint: disable=broad-except
+            logger.info("tiktoken unavailable (%s); estimating tokens from length.", e)
+        _ENCODING_LOADED = True
+    return _ENCODING
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """Return True for HTTP 429 / ``RateLimitError`` style exceptions."""
+    if getattr(error, "status_code", None) == 429 or getattr(error, "status", None) == 429:
+        return True
+    return type(error).__name__ == "RateLimitError"
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("retry-after") if hasattr(headers, "get") else None
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """
+    Classic token bucket refilled continuously at ``capacity`` per ``period``.
+
+    ``try_acquire`` never blocks: it either takes the tokens and returns 0.0,
+    or leaves the bucket untouched and returns how long to wait.
+    """
+    def __init__(self, capacity: float, period: float = 60.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.capacity = float(capacity)
+        self.rate = self.capacity / period
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def try_acquire(self, amount: float = 1.0) -> float:
+        """Take amount tokens if available; otherwise return seconds to wait."""
+        amount = min(float(amount), self.capacity)
+        with self._lock:
+            self._refill()
+            if self._tokens >= amount:
+                self._tokens -= amount
+                return 0.0
+            return (amount - self._tokens) / self.rate
+
+    def adjust(self, delta: float) -> None:
+        """Correct the bucket once the real cost of a request is known."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens - delta)
+
+    def drain(self) -> None:
+        """Empty the bucket, e.g. after the server reported a 429."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, 0.0)
+
+    @property
+    def available(self) -> float:
+        """Tokens currently available."""
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+class AdaptiveRateLimiter:
+    """
+    Process-wide limiter shared by every LLM-bound pipeline stage.
+
+    Three gates must pass before a request is sent:
+      1. Requests-per-minute token bucket
+      2. Tokens-per-minute token bucket (prompt size estimated up front)
+      3. Adaptive concurrency limit (AIMD: +1 after a full window of
+         successes, multiplied by ``backoff_factor`` on every 429)
+
+    Rate-limited calls are retried with exponential backoff (honouring
+    ``Retry-After`` when the error carries it) up to ``max_retries`` times.
+
+    With a ``scheduler``, waiting requests are not served in polling order:
+    the ``PriorityScheduler`` picks which one may take the next slot
+    (priority classes, weighted fair queuing, per-class caps, deadlines).
+    """
+    def __init__(self,
+                 rpm: float = 3500,
+                 tpm: float = 90_000,
+                 initial_concurrency: int = 8,
+                 max_concurrency: int = 64,
+                 min_concurrency: int = 1,
+                 backoff_factor: float = 0.5,
+                 max_retries: int = 5,
+                 base_delay: float = 1.0,
+                 max_delay: float = 30.0,
+                 poll_interval: float = 0.01,
+                 clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep,
+                 scheduler: Optional[PriorityScheduler] = None):
+        self.request_bucket = TokenBucket(rpm, clock=clock)
+        self.token_bucket = TokenBucket(tpm, clock=clock)
+        self.concurrency_limit = max(min_concurrency, min(initial_concurrency, max_concurrency))
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.backoff_factor = backoff_factor
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self._clock = clock
+        self._sleep = sleep
+        self.scheduler = scheduler
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._successes = 0
+        self._cooldown_until = 0.0
+        self._stats = {"requests": 0, "rate_limited": 0, "retries": 0, "failures": 0,
+                       "estimated_tokens": 0, "wait_seconds": 0.0}
+
+    # ----- gates -----
+
+    def try_acquire(self, tokens: int) -> float:
+        """Reserve a request slot; return 0.0 on success or seconds to wait."""
+        with self._lock:
+            now = self._clock()
+            if now < self._cooldown_until:
+                return self._cooldown_until - now
+            if self._in_flight >= self.concurrency_limit:
+                return self.poll_interval
+            wait = self.request_bucket.try_acquire(1)
+            if wait:
+                return wait
+            wait = self.token_bucket.try_acquire(tokens)
+            if wait:
+                self.request_bucket.adjust(-1)
+                return wait
+            self._in_flight += 1
+            self._stats["requests"] += 1
+            self._stats["estimated_tokens"] += tokens
+            return 0.0
+
+    def acquire(self, tokens: int) -> Optional[Ticket]:
+        """Block the calling thread until a request slot is reserved.
+
+        Returns:
+            Optional[Ticket]: The scheduler ticket to pass to ``release``.
+
+        Raises:
+            DeadlineExceeded: If the scheduler dropped the request.
+        """
+        ticket = self.scheduler.enqueue(tokens) if self.scheduler is not None else None
+        try:
+            while True:
+                wait = self._try_dispatch(ticket, tokens)
+                if not wait:
+                    return ticket
+                self._note_wait(wait)
+                self._sleep(wait)
+        except BaseException:
+            self._cancel(ticket)
+            raise
+
+    async def aacquire(self, tokens: int) -> Optional[Ticket]:
+        """Wait on the event loop until a request slot is reserved (see ``acquire``)."""
+        ticket = self.scheduler.enqueue(tokens) if self.scheduler is not None else None
+        try:
+            while True:
+                wait = self._try_dispatch(ticket, tokens)
+                if not wait:
+                    return ticket
+                self._note_wait(wait)
+                await asyncio.sleep(wait)
+        except BaseException:
+            # Includes CancelledError: the request leaves the queue
+            self._cancel(ticket)
+            raise
+
+    def release(self, error: Optional[BaseException] = None,
+                actual_tokens: Optional[int] = None,
+                estimated_tokens: int = 0,
+                ticket: Optional[Ticket] = None) -> None:
+        """Free a request slot and feed the outcome into the AIMD controller."""
+        if ticket is not None:
+            self.scheduler.done(ticket)
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+            if actual_tokens is not None:
+                self.token_bucket.adjust(actual_tokens - estimated_tokens)
+            if error is None:
+                self._successes += 1
+                if self._successes >= self.concurrency_limit:
+                    self._successes = 0
+                    self.concurrency_limit = min(self.max_concurrency, self.concurrency_limit + 1)
+            elif is_rate_limit_error(error):
+                self._on_rate_limited(error)
+            else:
+                self._stats["failures"] += 1
+
+    # ----- call helpers -----
+
+    def call(self, fn: Callable[[], Any], tokens: int,
+             usage: Callable[[Any], Optional[int]] = lambda _: None) -> Any:
+        """Run ``fn()`` through the limiter, retrying on rate limits."""
+        attempt = 0
+        while True:
+            ticket = self.acquire(tokens)
+            try:
+                result = fn()
+            except Exception as e:
+                self.release(error=e, ticket=ticket)
+                if not self._should_retry(e, attempt):
+                    raise
+                attempt += 1
+                self._sleep(self._backoff(e, attempt))
+                continue
+            self.release(actual_tokens=usage(result), estimated_tokens=tokens, ticket=ticket)
+            return result
+
+    async def acall(self, fn: Callable[[], Awaitable[Any]], tokens: int,
+                    usage: Callable[[Any], Optional[int]] = lambda _: None) -> Any:
+        """Await ``fn()`` through the limiter, retrying on rate limits."""
+        attempt = 0
+        while True:
+            ticket = await self.aacquire(tokens)
+            try:
+                result = await fn()
+            except Exception as e:
+                self.release(error=e, ticket=ticket)
+                if not self._should_retry(e, attempt):
+                    raise
+                attempt += 1
+                await asyncio.sleep(self._backoff(e, attempt))
+                continue
+            self.release(actual_tokens=usage(result), estimated_tokens=tokens, ticket=ticket)
+            return result
+
+    def stream(self, fn: Callable[[], Iterator[Any]], tokens: int) -> Iterator[Any]:
+        """Iterate ``fn()`` holding one slot; retry only before the first item."""
+        attempt = 0
+        while True:
+            ticket = self.acquire(tokens)
+            started = False
+            failed: Optional[BaseException] = None
+            try:
+                for item in fn():
+                    started = True
+                    yield item
+            except Exception as e:  # pylint: disable=broad-except
+                failed = e
+                self.release(error=e, ticket=ticket)
+                if started or not self._should_retry(e, attempt):
+                    raise
+            finally:
+                # Also runs when the consumer closes the stream early
+                if failed is None:
+                    self.release(ticket=ticket)
+            if failed is None:
+                return
+            attempt += 1
+            self._sleep(self._backoff(failed, attempt))
+
+    async def astream(self, fn: Callable[[], Awaitable[AsyncIterator[Any]]],
+                      tokens: int) -> AsyncIterator[Any]:
+        """Async counterpart of ``stream`` for ``astream_*`` LLM methods."""
+        attempt = 0
+        while True:
+            ticket = await self.aacquire(tokens)
+            started = False
+            failed: Optional[BaseException] = None
+            try:
+                async for item in await fn():
+                    started = True
+                    yield item
+            except Exception as e:  # pylint: disable=broad-except
+                failed = e
+                self.release(error=e, ticket=ticket)
+                if started or not self._should_retry(e, attempt):
+                    raise
+            finally:
+                # Also runs when the consumer closes the stream early
+                if failed is None:
+                    self.release(ticket=ticket)
+            if failed is None:
+                return
+            attempt += 1
+            await asyncio.sleep(self._backoff(failed, attempt))
+
+    def stats(self) -> Dict[str, Any]:
+        """Return counters plus the current concurrency limit and bucket levels."""
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+            stats["in_flight"] = self._in_flight
+            stats["concurrency_limit"] = self.concurrency_limit
+        stats["requests_available"] = self.request_bucket.available
+        stats["tokens_available"] = self.token_bucket.available
+        if self.scheduler is not None:
+            stats["priorities"] = self.scheduler.stats()
+        return stats
+
+    # ----- internals -----
+
+    def _try_dispatch(self, ticket: Optional[Ticket], tokens: int) -> float:
+        if ticket is None:
+            return self.try_acquire(tokens)
+        return self.scheduler.try_dispatch(ticket, lambda: self.try_acquire(tokens),
+                                           self.concurrency_limit)
+
+    def _cancel(self, ticket: Optional[Ticket]) -> None:
+        if ticket is not None:
+            self.scheduler.cancel(ticket)
+
+    def _on_rate_limited(self, error: BaseException) -> None:
+        self._stats["rate_limited"] += 1
+        self._successes = 0
+        self.concurrency_limit = max(
+            self.min_concurrency, int(self.concurrency_limit * self.backoff_factor)
+        )
+        self.request_bucket.drain()
+        delay = _retry_after(error) or self.base_delay
+        self._cooldown_until = max(self._cooldown_until, self._clock() + delay)
+        logger.warning("Rate limited; concurrency limit now %s.", self.concurrency_limit)
+
+    def _should_retry(self, error: BaseException, attempt: int) -> bool:
+        if not is_rate_limit_error(error) or attempt >= self.max_retries:
+            return False
+        with self._lock:
+            self._stats["retries"] += 1
+        return True
+
+    def _backoff(self, error: BaseException, attempt: int) -> float:
+        return _retry_after(error) or min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+
+    def _note_wait(self, wait: float) -> None:
+        with self._lock:
+            self._stats["wait_seconds"] += wait
+
+
+_rate_limiter: Optional[AdaptiveRateLimiter] = None
+
+
+def get_rate_limiter() -> AdaptiveRateLimiter:
+    """Return the process-wide limiter, creating it on first use.
+
+    Budgets come from ``OPENAI_RPM``, ``OPENAI_TPM`` and
+    ``OPENAI_MAX_CONCURRENCY``; requests are ordered by the shared
+    ``scheduler.get_scheduler()`` unless it is disabled.
+    """
+    global _rate_limiter  # pylint: disable=global-statement
+    if _rate_limiter is None:
+        llm_registry.load_env()
+        _rate_limiter = AdaptiveRateLimiter(
+            rpm=float(os.getenv("OPENAI_RPM", "3500")),
+            tpm=float(os.getenv("OPENAI_TPM", "90000")),
+            max_concurrency=int(os.getenv("OPENAI_MAX_CONCURRENCY", "64")),
+            scheduler=get_scheduler(),
+        )
+    return _rate_limiter
+
+
+def set_rate_limiter(limiter: AdaptiveRateLimiter) -> None:
+    """Replace the process-wide limiter (e.g. with a fake clock in tests)."""
+    global _rate_limiter  # pylint: disable=global-statement
+    _rate_limiter = limiter
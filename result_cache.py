@@ -0,0 +1,166 @@
+""" Content-Addressed Result Cache """
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import llm_registry
+
+logger = logging.getLogger(__name__)
+
+
+class ResultCache:
+    """
+    Two-tier cache for LLM pipeline results, keyed by ``text_utils.content_hash``.
+
+    Tiers:
+      1. In-memory LRU (bounded by ``max_entries``)
+      2. Optional SQLite file (bounded by ``max_disk_entries``), shared
+         across processes and restarts
+
+    Entries older than ``ttl`` seconds are treated as misses in both tiers.
+    Values must be JSON-serializable so they survive the disk tier.
+    """
+    def __init__(self,
+                 path: Optional[str] = None,
+                 max_entries: int = 1024,
+                 max_disk_entries: int = 100_000,
+                 ttl: Optional[float] = None):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._stats = {"hits": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0, "sets": 0}
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            self._db = self._open_db(path)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for key, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[0], now):
+                    self._memory.move_to_end(key)
+                    self._stats["hits"] += 1
+                    self._stats["memory_hits"] += 1
+                    return entry[1]
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT created_at, value FROM results WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    if not self._expired(row[0], now):
+                        value = json.loads(row[1])
+                        self._db.execute(
+                            "UPDATE results SET accessed_at = ? WHERE key = ?", (now, key)
+                        )
+                        self._db.commit()
+                        self._remember(key, row[0], value)
+                        self._stats["hits"] += 1
+                        self._stats["disk_hits"] += 1
+                        return value
+                    self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+                    self._db.commit()
+
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a JSON-serializable value under key in every tier."""
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, value)
+            self._stats["sets"] += 1
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO results (key, value, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), now, now),
+                )
+                self._evict_disk(now)
+                self._db.commit()
+
+    def clear(self) -> None:
+        """Drop every entry from both tiers (stats are kept)."""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM results")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters plus the current hit rate and sizes."""
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+            lookups = stats["hits"] + stats["misses"]
+            stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+            stats["memory_entries"] = len(self._memory)
+            if self._db is not None:
+                stats["disk_entries"] = self._db.execute(
+                    "SELECT COUNT(*) FROM results"
+                ).fetchone()[0]
+            return stats
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl is not None and now - created_at > self.ttl
+
+    def _remember(self, key: str, created_at: float, value: Any) -> None:
+        self._memory[key] = (created_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self, now: float) -> None:
+        if self.ttl is not None:
+            self._db.execute("DELETE FROM results WHERE created_at < ?", (now - self.ttl,))
+        count = self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        if count > self.max_disk_entries:
+            self._db.execute(
+                "DELETE FROM results WHERE key IN "
+                "(SELECT key FROM results ORDER BY accessed_at ASC LIMIT ?)",
+                (count - self.max_disk_entries,),
+            )
+
+    @staticmethod
+    def _open_db(path: str) -> sqlite3.Connection:
+        db = sqlite3.connect(path, check_same_thread=False)
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed_at)")
+        db.commit()
+        return db
+
+
+_result_cache: Optional[ResultCache] = None
+
+
+def get_result_cache() -> ResultCache:
+    """Return the process-wide result cache, creating it on first use.
+
+    Configured through ``RESULT_CACHE_PATH`` (enables the SQLite tier),
+    ``RESULT_CACHE_SIZE``, ``RESULT_CACHE_DISK_SIZE`` and ``RESULT_CACHE_TTL``
+    (seconds).
+    """
+    global _result_cache  # pylint: disable=global-statement
+    if _result_cache is None:
+        llm_registry.load_env()
+        ttl = os.getenv("RESULT_CACHE_TTL")
+        _result_cache = ResultCache(
+            path=os.getenv("RESULT_CACHE_PATH") or None,
+            max_entries=int(os.getenv("RESULT_CACHE_SIZE", "1024")),
+            max_disk_entries=int(os.getenv("RESULT_CACHE_DISK_SIZE", "100000")),
+            ttl=float(ttl) if ttl else None,
+        )
+    return _result_cache
@@ -0,0 +1,379 @@
+""" Persistent Resume Vector Index """
+import os
+import re
+import logging
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+import llm_registry
+from llama_index.core import StorageContext, VectorStoreIndex
+from llama_index.core.node_parser import SentenceSplitter
+from llama_index.core.schema import TextNode
+from llama_index.core.vector_stores import FilterOperator, MetadataFilter, MetadataFilters
+from rate_limiter import estimate_tokens
+from resume_store import UnknownResumeError
+from text_utils import content_hash, make_resume_id
+from tracing import get_tracer, is_tracing, record_llm_usage
+
+logger = logging.getLogger(__name__)
+
+# Default OpenAI embedding size (text-embedding-ada-002)
+DEFAULT_EMBED_DIM = 1536
+# Tokens per chunk; chunks never span sections, so edits stay local
+DEFAULT_CHUNK_SIZE = 512
+
+# Canonical section name -> heading lines that open it (lower-case, no colon)
+SECTION_HEADINGS: Dict[str, Tuple[str, ...]] = {
+    "experience": ("experience", "work experience", "professional experience", "employment",
+                   "employment history", "work history", "career history"),
+    "skills": ("skills", "technical skills", "core skills", "core competencies",
+               "technologies", "tech stack"),
+    "education": ("education", "academic background", "qualifications"),
+    "contact": ("contact", "contact info", "contact information", "contact details",
+                "personal details"),
+    "summary": ("summary", "profile", "professional summary", "objective", "about me"),
+    "projects": ("projects", "key projects", "personal projects"),
+    "certifications": ("certifications", "certificates", "licenses"),
+}
+_HEADING_SECTIONS = {alias: name for name, aliases in SECTION_HEADINGS.items()
+                     for alias in aliases}
+_HEADING_RE = re.compile(r"^\s*[#*\-=]*\s*([A-Za-z][A-Za-z &/]{1,40}?)\s*:?\s*[#*\-=]*\s*$")
+_SECTION_BREAK_RE = re.compile(r"\n\s*\n")
+
+
+def split_sections(resume_text: str) -> List[Tuple[str, str]]:
+    """Split a resume at section headings (Experience, Skills, Education, ...).
+
+    Text before the first heading is the ``header`` section (usually name and
+    contact details); a resume without recognized headings is one ``body``
+    section.
+
+    Returns:
+        List[Tuple[str, str]]: ``(section name, section text)`` in order,
+        each text starting with its heading line.
+    """
+    sections: List[Tuple[str, List[str]]] = [("header", [])]
+    for line in resume_text.splitlines():
+        match = _HEADING_RE.match(line)
+        name = _HEADING_SECTIONS.get(match.group(1).lower()) if match else None
+        if name is not None:
+            sections.append((name, [line]))
+        else:
+            sections[-1][1].append(line)
+    if len(sections) == 1:
+        sections = [("body", sections[0][1])]
+    return [(name, "\n".join(lines).strip()) for name, lines in sections
+            if "\n".join(lines).strip()]
+
+
+class ResumeIndexStore:
+    """
+    Shared vector index for every ingested resume, keyed by resume ID.
+
+    Resumes are split at section headings (``split_sections``), then at
+    blank lines, then into chunks; every chunk is stored under
+    ``<resume_id>:<chunk hash>`` with ``resume_id`` / ``chunk_hash`` /
+    ``section`` metadata, so queries can be filtered to one candidate and
+    ``upsert`` re-embeds only chunks whose text changed.
+
+    Replaced or deleted chunks are tombstoned: queries stop seeing them at
+    once, and ``compact`` (run periodically in the background, see
+    ``start_compaction``) deletes them from the vector store. A tombstoned
+    chunk that comes back before compaction (an A → B → A edit, or a delete
+    followed by re-adding the resume) is revived without re-embedding.
+
+    Backends:
+      1. Milvus (Milvus Lite when ``uri`` is a local ``.db`` file)
+      2. In-process SimpleVectorStore fallback (no extra services)
+    """
+    def __init__(self,
+                 backend: Optional[str] = None,
+                 uri: Optional[str] = None,
+                 collection_name: str = "resumes",
+                 dim: int = DEFAULT_EMBED_DIM,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE):
+        llm_registry.load_env()
+        self.backend = (backend or os.getenv("RESUME_INDEX_BACKEND", "auto")).lower()
+        self.uri = uri or os.getenv("RESUME_INDEX_URI", "./resume_index.db")
+        self.collection_name = collection_name
+        self.dim = dim
+        self._splitter = SentenceSplitter(chunk_size=chunk_size, chunk_overlap=0)
+        self._lock = threading.RLock()
+        # resume_id -> live chunk hashes / content hash of the indexed text
+        self._live: Dict[str, Set[str]] = {}
+        self._content: Dict[str, str] = {}
+        # resume_id -> node IDs awaiting physical deletion
+        self._tombstones: Dict[str, Set[str]] = {}
+        self._compactor: Optional[threading.Thread] = None
+        self._stop_compactor = threading.Event()
+        self._stats = {"chunks_embedded": 0, "chunks_kept": 0, "chunks_tombstoned": 0,
+                       "compactions": 0, "chunks_compacted": 0}
+        self._vector_store = None
+        self._index = self._build_index()
+
+    def ingest(self, resume_text: str, resume_id: Optional[str] = None) -> str:
+        """Embed a resume once; later calls with the same ID and text are no-ops.
+
+        Args:
+            resume_text (str): Raw resume text.
+            resume_id (Optional[str]): Candidate/resume ID. Derived from the
+                content when omitted.
+
+        Returns:
+            str: The resume ID the vectors are stored under.
+
+        Raises:
+            ValueError: If resume_text is empty.
+        """
+        if not resume_text or not resume_text.strip():
+            raise ValueError("resume_text cannot be empty.")
+
+        resume_id = resume_id or make_resume_id(resume_text)
+        with self._lock, get_tracer().span("index.ingest", cache_hit=False) as span:
+            known = self._content.get(resume_id)
+            if self.has(resume_id) and known in (None, content_hash(resume_text)):
+                logger.debug("Resume %s already indexed, skipping ingest.", resume_id)
+                span.set(cache_hit=True)
+                return resume_id
+            self._upsert(resume_id, resume_text)
+        return resume_id
+
+    def upsert(self, resume_id: str, resume_text: str) -> Dict[str, int]:
+        """Index a new or changed resume, re-embedding only changed chunks.
+
+        Returns:
+            Dict[str, int]: ``embedded``, ``kept`` and ``tombstoned`` chunk counts.
+
+        Raises:
+            ValueError: If resume_text is empty.
+        """
+        if not resume_text or not resume_text.strip():
+            raise ValueError("resume_text cannot be empty.")
+        with self._lock, get_tracer().span("index.upsert"):
+            return self._upsert(resume_id, resume_text)
+
+    def delete(self, resume_id: str) -> int:
+        """Tombstone every chunk of resume_id; returns how many were tombstoned."""
+        with self._lock:
+            hashes = self._live_chunks(resume_id)
+            self._tombstone(resume_id, hashes)
+            self._live.pop(resume_id, None)
+            self._content.pop(resume_id, None)
+            return len(hashes)
+
+    def compact(self) -> int:
+        """Physically delete tombstoned chunks; returns how many were removed."""
+        with self._lock:
+            node_ids = [node_id for ids in self._tombstones.values() for node_id in ids]
+            if not node_ids:
+                return 0
+            self._index.delete_nodes(node_ids, delete_from_docstore=True)
+            if self.backend == "milvus":
+                try:
+                    self._vector_store.client.compact(collection_name=self.collection_name)
+                except Exception as e:  # pylint: disable=broad-except
+                    logger.debug("Milvus compaction request failed: %s", e)
+            self._tombstones.clear()
+            self._stats["compactions"] += 1
+            self._stats["chunks_compacted"] += len(node_ids)
+        logger.info("Compacted %d tombstoned chunks.", len(node_ids))
+        return len(node_ids)
+
+    def start_compaction(self, interval: float) -> None:
+        """Run ``compact`` every interval seconds on a daemon thread."""
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._stop_compactor.clear()
+
+        def loop() -> None:
+            while not self._stop_compactor.wait(interval):
+                try:
+                    self.compact()
+                except Exception as e:  # pylint: disable=broad-except
+                    logger.warning("Background compaction failed: %s", e)
+
+        self._compactor = threading.Thread(target=loop, name="resume-index-compactor", daemon=True)
+        self._compactor.start()
+
+    def stop_compaction(self) -> None:
+        """Stop the background compaction thread (pending tombstones stay)."""
+        self._stop_compactor.set()
+        if self._compactor is not None:
+            self._compactor.join()
+            self._compactor = None
+
+    def stats(self) -> Dict[str, int]:
+        """Chunk counters plus live resumes and pending tombstones."""
+        with self._lock:
+            return {**self._stats, "resumes": len(self._live),
+                    "pending_tombstones": sum(len(ids) for ids in self._tombstones.values())}
+
+    def embed_query(self, query: str) -> List[float]:
+        """Embed a query with the index's embedding model."""
+        embedding = self._index._embed_model.get_query_embedding(query)  # pylint: disable=protected-access
+        if is_tracing():
+            record_llm_usage(self._embed_model_name(), estimate_tokens(query), 0)
+        return embedding
+
+    def content_version(self, resume_id: str) -> Optional[str]:
+        """Content hash of the text indexed for resume_id (None when unknown)."""
+        return self._content.get(resume_id)
+
+    def has(self, resume_id: str) -> bool:
+        """Return True if vectors for resume_id are already stored."""
+        return bool(self._live_chunks(resume_id))
+
+    def as_query_engine(self, resume_id: str, **kwargs):
+        """Build a query engine restricted to one resume's live vectors.
+
+        Raises:
+            UnknownResumeError: If resume_id has not been ingested.
+        """
+        if not self.has(resume_id):
+            raise UnknownResumeError(f"Unknown resume_id: {resume_id}")
+        filters = [MetadataFilter(key="resume_id", value=resume_id)]
+        if self._tombstones.get(resume_id):
+            # Tombstoned chunks are still in the store until the next compaction
+            filters.append(MetadataFilter(key="chunk_hash", operator=FilterOperator.IN,
+                                          value=sorted(self._live[resume_id])))
+        return self._index.as_query_engine(filters=MetadataFilters(filters=filters), **kwargs)
+
+    def chunk(self, resume_text: str) -> Dict[str, Tuple[str, str]]:
+        """Split a resume into section-aware chunks.
+
+        Returns:
+            Dict[str, Tuple[str, str]]: chunk hash → ``(section, text)``.
+        """
+        chunks: Dict[str, Tuple[str, str]] = {}
+        for section, section_text in split_sections(resume_text):
+            for block in _SECTION_BREAK_RE.split(section_text):
+                if not block.strip():
+                    continue
+                for text in self._splitter.split_text(block):
+                    chunks.setdefault(content_hash(text, section), (section, text))
+        return chunks
+
+    def _upsert(self, resume_id: str, resume_text: str) -> Dict[str, int]:
+        chunks = self.chunk(resume_text)
+        existing = self._live_chunks(resume_id)
+        removed = existing - chunks.keys()
+        # Chunks tombstoned earlier but not compacted yet are still stored
+        pending = self._tombstones.get(resume_id, set())
+        revived = {h for h in chunks if h not in existing and _node_id(resume_id, h) in pending}
+        added = [h for h in chunks if h not in existing and h not in revived]
+
+        if added:
+            logger.info("Indexing %d new chunks for resume %s...", len(added), resume_id)
+            self._index.insert_nodes([self._node(resume_id, h, *chunks[h]) for h in added])
+            if is_tracing():
+                record_llm_usage(self._embed_model_name(),
+                                 sum(estimate_tokens(chunks[h][1]) for h in added), 0)
+        pending.difference_update(_node_id(resume_id, h) for h in revived)
+        if not pending:
+            self._tombstones.pop(resume_id, None)
+        self._tombstone(resume_id, removed)
+        self._live[resume_id] = set(chunks)
+        self._content[resume_id] = content_hash(resume_text)
+
+        counts = {"embedded": len(added), "kept": len(chunks) - len(added),
+                  "tombstoned": len(removed)}
+        self._stats["chunks_embedded"] += counts["embedded"]
+        self._stats["chunks_kept"] += counts["kept"]
+        return counts
+
+    def _tombstone(self, resume_id: str, hashes: Set[str]) -> None:
+        if not hashes:
+            return
+        node_ids = [h[len("legacy:"):] if h.startswith("legacy:") else _node_id(resume_id, h)
+                    for h in hashes]
+        if self.backend == "milvus":
+            # Milvus deletes are tombstones already; its compaction reclaims space
+            self._vector_store.delete_nodes(node_ids)
+        else:
+            self._tombstones.setdefault(resume_id, set()).update(node_ids)
+        self._stats["chunks_tombstoned"] += len(node_ids)
+
+    def _live_chunks(self, resume_id: str) -> Set[str]:
+        live = self._live.get(resume_id)
+        if live is None and self.backend == "milvus":
+            live = self._milvus_chunks(resume_id)
+            if live:
+                self._live[resume_id] = live
+        return live or set()
+
+    @staticmethod
+    def _node(resume_id: str, chunk_hash: str, section: str, text: str) -> TextNode:
+        # section stays visible to the embedding and the LLM ("section: skills")
+        keys = ["resume_id", "chunk_hash"]
+        return TextNode(
+            id_=_node_id(resume_id, chunk_hash),
+            text=text,
+            metadata={"resume_id": resume_id, "chunk_hash": chunk_hash, "section": section},
+            excluded_embed_metadata_keys=keys,
+            excluded_llm_metadata_keys=keys,
+        )
+
+    def _embed_model_name(self) -> str:
+        return getattr(self._index._embed_model, "model_name", "unknown")  # pylint: disable=protected-access
+
+    def _build_index(self) -> VectorStoreIndex:
+        if self.backend in ("auto", "milvus"):
+            try:
+                return self._build_milvus_index()
+            except Exception as e:  # pylint: disable=broad-except
+                if self.backend == "milvus":
+                    raise
+                logger.warning("Milvus unavailable (%s); using in-process index.", e)
+        self.backend = "simple"
+        return VectorStoreIndex(nodes=[], embed_model=llm_registry.get_embed_model())
+
+    def _build_milvus_index(self) -> VectorStoreIndex:
+        # pylint: disable=import-outside-toplevel
+        from llama_index.vector_stores.milvus import MilvusVectorStore
+
+        self._vector_store = MilvusVectorStore(
+            uri=self.uri,
+            collection_name=self.collection_name,
+            dim=self.dim,
+            overwrite=False,
+        )
+        self.backend = "milvus"
+        storage_context = StorageContext.from_defaults(vector_store=self._vector_store)
+        return VectorStoreIndex(nodes=[], storage_context=storage_context,
+                                embed_model=llm_registry.get_embed_model())
+
+    def _milvus_chunks(self, resume_id: str) -> Set[str]:
+        escaped = resume_id.replace("\\", "\\\\").replace('"', '\\"')
+        try:
+            rows = self._vector_store.client.query(
+                collection_name=self.collection_name,
+                filter=f'resume_id == "{escaped}"',
+                output_fields=["chunk_hash"],
+            )
+        except Exception as e:  # pylint: disable=broad-except
+            logger.debug("Milvus chunk lookup failed for %s: %s", resume_id, e)
+            return set()
+        # Rows indexed before chunk hashing have no hash; they can never match
+        # a new chunk, so an upsert replaces them
+        return {row.get("chunk_hash") or f"legacy:{row.get('id')}" for row in rows}
+
+
+def _node_id(resume_id: str, chunk_hash: str) -> str:
+    return f"{resume_id}:{chunk_hash}"
+
+
+_index_store: Optional[ResumeIndexStore] = None
+
+
+def get_index_store() -> ResumeIndexStore:
+    """Return the process-wide resume index, creating it on first use.
+
+    Tombstones are compacted every ``RESUME_INDEX_COMPACT_INTERVAL`` seconds
+    (default 300; 0 disables the background thread).
+    """
+    global _index_store  # pylint: disable=global-statement
+    if _index_store is None:
+        _index_store = ResumeIndexStore()
+        interval = float(os.getenv("RESUME_INDEX_COMPACT_INTERVAL", "300"))
+        if interval > 0:
+            _index_store.start_compaction(interval)
+    return _index_store
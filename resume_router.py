@@ -1,62 +1,171 @@
 """ Resume Router """
-from typing import Optional
-from llama_index.core.program import LLMTextCompletionProgram
-from llama_index.llms.openai import OpenAI
+import os
+import re
+import time
+import threading
+from typing import Dict, Optional, Tuple
 from llama_index.core.llms import LLM
-from dotenv import load_dotenv
-from schema import ResumeValidationResult
-from prompts import RESUME_ROUTER_PROMPT
+import llm_registry
+from schema import ResumeValidationResult, RouteDecision
+from prompts import RESUME_ROUTER_PROMPT, RESUME_ROUTER_FUNCTION_PROMPT
+from structured_output import StructuredProgram
+from router_model import HashedNGramClassifier, load_default_model
 
-load_dotenv()
+RESUME_SIGNALS = [
+    "experience", "skills", "education", "contact", "email:", "phone:",
+    "years of experience", "software engineer", "developer", "cv", "resume"
+]
+NON_RESUME_SIGNALS = [
+    "invoice", "receipt", "recipe", "ingredients", "bake at", "serves",
+    "job description", "we are hiring", "salary", "benefits"
+]
+
+
+def _compile_signals(signals) -> re.Pattern:
+    return re.compile("|".join(f"(?P<s{i}>{re.escape(sig)})" for i, sig in enumerate(signals)))
+
+
+_RESUME_RE = _compile_signals(RESUME_SIGNALS)
+_NON_RESUME_RE = _compile_signals(NON_RESUME_SIGNALS)
+
+TIERS = ("heuristic", "model", "llm")
 
 
 class ResumeRouter:
     """
     Single source of truth for resume detection.
-    Two approaches:
-      1. LLM-based (accurate, slower, costs money)
-      2. Heuristic-based (fast, cheap, good enough for 90% cases)
+    Three tiers, cheapest first (see ``route``):
+      1. Heuristic-based (compiled keyword matching, microseconds)
+      2. Local hashed n-gram logistic regression (calibrated probability)
+      3. LLM-based (accurate, slower, costs money) — only for uncertain cases
     """
-    def __init__(self, llm: Optional[LLM] = None):
-        self.llm = llm or OpenAI(model="gpt-3.5-turbo", temperature=0.0)
-        self._llm_program = self._build_llm_program()
+    def __init__(self, llm: Optional[LLM] = None,
+                 model: Optional[HashedNGramClassifier] = None,
+                 uncertainty_band: Optional[Tuple[float, float]] = None):
+        llm_registry.load_env()
+        self.llm = llm
+        self._llm_program: Optional[StructuredProgram] = None
+        self.model = model or load_default_model(os.getenv("ROUTER_MODEL_PATH"))
+        self.uncertainty_band = uncertainty_band or (
+            float(os.getenv("ROUTER_UNCERTAIN_LOW", "0.3")),
+            float(os.getenv("ROUTER_UNCERTAIN_HIGH", "0.7")),
+        )
+        self._stats_lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {
+            tier: {"decided": 0, "seconds": 0.0} for tier in TIERS
+        }
+
+    def route(self, text: str) -> RouteDecision:
+        """
+        Cascade through the tiers and return the first confident decision.
+
+        Tier 1 decides clear-cut cases, tier 2 decides whenever its
+        probability falls outside ``uncertainty_band``, and only the
+        remaining documents reach ``classify_with_llm``.
+        """
+        start = time.perf_counter()
+        verdict = self.classify_with_heuristics(text)
+        if verdict is not None:
+            return self._decide(RouteDecision(
+                is_resume=verdict, tier="heuristic", reason="Keyword signals"), start)
+
+        start = time.perf_counter()
+        probability = self.model.predict_proba(text)
+        decision = self._model_decision(probability)
+        if decision is not None:
+            return self._decide(decision, start)
+
+        start = time.perf_counter()
+        result = self.classify_with_llm(text)
+        return self._decide(self._llm_decision(result, probability), start)
+
+    async def aroute(self, text: str) -> RouteDecision:
+        """Async variant of ``route``; only the LLM tier actually awaits."""
+        start = time.perf_counter()
+        verdict = self.classify_with_heuristics(text)
+        if verdict is not None:
+            return self._decide(RouteDecision(
+                is_resume=verdict, tier="heuristic", reason="Keyword signals"), start)
+
+        start = time.perf_counter()
+        probability = self.model.predict_proba(text)
+        decision = self._model_decision(probability)
+        if decision is not None:
+            return self._decide(decision, start)
+
+        start = time.perf_counter()
+        result = await self.llm_program.acall(query_str=text)
+        return self._decide(self._llm_decision(result, probability), start)
 
     def classify_with_llm(self, text: str):
         """
         Uses LLM + structured output to determine if text is a resume.
         Best accuracy, especially for edge cases.
         """
-        result = self._llm_program(query_str=text)
+        result = self.llm_program(query_str=text)
         return result
 
     def classify_with_heuristics(self, text: str):
         """
         Fast keyword + anti-keyword matching.
         Great for filtering obvious non-resumes early.
+
+        Returns True/False only when the signals agree; mixed or weak
+        evidence returns None so a later tier can decide.
         """
         text_low = text.lower()
-        resume_signals = [
-            "experience", "skills", "education", "contact", "email:", "phone:",
-            "years of experience", "software engineer", "developer", "cv", "resume"
-        ]
-        non_resume_signals = [
-            "invoice", "receipt", "recipe", "ingredients", "bake at", "serves",
-            "job description", "we are hiring", "salary", "benefits"
-        ]
-
-        if any(sig in text_low for sig in non_resume_signals):
+        resume_hits = {m.lastgroup for m in _RESUME_RE.finditer(text_low)}
+        non_resume_hit = _NON_RESUME_RE.search(text_low) is not None
+
+        if non_resume_hit and len(resume_hits) < 2:
             return False
 
-        if sum(sig in text_low for sig in resume_signals) >= 2:
+        if len(resume_hits) >= 2 and not non_resume_hit:
             return True
 
         return None
 
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-tier count of decided documents and total time spent deciding them."""
+        with self._stats_lock:
+            return {tier: dict(values) for tier, values in self._stats.items()}
+
+    def _model_decision(self, probability: float) -> Optional[RouteDecision]:
+        low, high = self.uncertainty_band
+        if low <= probability <= high:
+            return None
+        return RouteDecision(is_resume=probability > high, tier="model",
+                             probability=probability, reason="Local model")
+
     @staticmethod
-    def _build_llm_program() -> LLMTextCompletionProgram:
-        prompt = RESUME_ROUTER_PROMPT
-        return LLMTextCompletionProgram.from_defaults(
-            output_cls=ResumeValidationResult,
-            prompt=prompt,
-            llm=OpenAI(model="gpt-3.5-turbo", temperature=0.0),
-        )
+    def _llm_decision(result: ResumeValidationResult, probability: float) -> RouteDecision:
+        return RouteDecision(is_resume=result.is_resume, tier="llm",
+                             probability=probability, reason=result.reason)
+
+    def _decide(self, decision: RouteDecision, start: float) -> RouteDecision:
+        elapsed = time.perf_counter() - start
+        with self._stats_lock:
+            self._stats[decision.tier]["decided"] += 1
+            self._stats[decision.tier]["seconds"] += elapsed
+        return decision
+
+    @property
+    def llm_program(self) -> StructuredProgram:
+        """Tier-3 program, built on first use (the shared one unless ``llm`` was given)."""
+        if self._llm_program is None:
+            self._llm_program = (_build_llm_program(self.llm) if self.llm is not None
+                                 else llm_registry.get("router_program"))
+        return self._llm_program
+
+
+def _build_llm_program(llm: Optional[LLM] = None) -> StructuredProgram:
+    return StructuredProgram(
+        "router",
+        output_cls=ResumeValidationResult,
+        llm=llm or llm_registry.get_router_llm(),
+        prompt=RESUME_ROUTER_PROMPT,
+        function_prompt=RESUME_ROUTER_FUNCTION_PROMPT,
+    )
+
+
+llm_registry.register("router_program", _build_llm_program)
@@ -1,80 +1,255 @@
 """ Skill / Tool for our Agent """
-from typing import Dict, Any , Optional
+from typing import Dict, Any , Optional, Tuple
+import os
+import time
 import logging
-from llama_index.llms.openai import OpenAI
-from llama_index.core import Document
+import threading
+from collections import deque
+from llama_index.core import Document, QueryBundle
 from llama_index.core import VectorStoreIndex
-from dotenv import load_dotenv
+import llm_registry
 from resume_router import ResumeRouter
-from classifier import classify_resume
-from evaluator import RAGEvaluators
-# Load environment variables
-load_dotenv()
-llm = OpenAI(model="gpt-3.5-turbo")
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
+from classifier import (
+    classify_resume, aclassify_resume, refresh_profile, CLASSIFIER_PROMPT_VERSION,
+    classifier_model_name
 )
+from evaluator import RAGEvaluators
+from resume_index import get_index_store
+from resume_store import UnknownResumeError, get_resume_store
+from candidate_search import get_candidate_index
+from field_extractor import EXTRACTOR_VERSION
+from grounding import GROUNDING_VERSION
+from near_dup import get_near_dup_index
+from prompts import RESUME_DIRECT_QUERY_PROMPT
+from rate_limiter import estimate_tokens
+from result_cache import get_result_cache
+from scheduler import priority
+from schema import Profile, RouteDecision, profile_from_dict
+from semantic_cache import get_semantic_cache
+from singleflight import get_flight_group
+from text_utils import content_hash, make_resume_id
+from tracing import Trace, get_tracer
+
 logger = logging.getLogger(__name__)
 
-# Initialize once at import time (safe in most agent frameworks)
-_resume_router = ResumeRouter()
-_resume_evaluators = RAGEvaluators(llm=llm)
+QUERY_MODES = ("auto", "direct", "retrieval")
+# Resumes up to this many tokens are answered in direct context mode
+DEFAULT_DIRECT_CONTEXT_MAX_TOKENS = 3000
+
+# Recent retrieval-mode overheads (ingest + embedding + retrieval, seconds);
+# their mean is the time a direct-mode query reports as saved
+_retrieval_overhead: deque = deque(maxlen=200)
+_retrieval_overhead_lock = threading.Lock()
+
+# Built on first use (see get_resume_router / get_resume_evaluators)
+_resume_router: Optional[ResumeRouter] = None
+_resume_evaluators: Optional[RAGEvaluators] = None
+
+
+def get_resume_router() -> ResumeRouter:
+    """Return the shared cascaded router, creating it on first use."""
+    global _resume_router  # pylint: disable=global-statement
+    if _resume_router is None:
+        _resume_router = ResumeRouter()
+    return _resume_router
 
-def analyze_resume(resume_text: str) -> Dict[str, Any]:
+
+def get_resume_evaluators() -> RAGEvaluators:
+    """Return the shared faithfulness evaluator, creating it on first use."""
+    global _resume_evaluators  # pylint: disable=global-statement
+    if _resume_evaluators is None:
+        _resume_evaluators = RAGEvaluators(llm=llm_registry.get_llm())
+    return _resume_evaluators
+
+def analyze_resume(resume_text: str, resume_id: Optional[str] = None,
+                   index_candidate: bool = True) -> Dict[str, Any]:
     """
     Analyze Resume Tool: Full resume analysis pipeline.
     
-    1. Fast heuristic check → is this even a resume?
+    0. Near-duplicate of an analyzed resume (``near_dup``)? → reuse its
+       Profile, re-extract the deterministic fields and skip to step 3
+    1. Cascaded router (heuristics → local model → LLM) → is this even a resume?
     2. If yes → run full structured classification (skills, experience, etc.)
     3. If yes → evaluate the structured output for hallucinations (faithfulness)
     
-    Returns consistent dict — perfect for tool calling in agents.
+    Returns consistent dict — perfect for tool calling in agents. With
+    tracing enabled it also carries a ``trace`` entry (per-stage timings,
+    tokens, estimated cost and cache hits).
+
+    A passed profile is added to the candidate search index under
+    ``resume_id`` (content-derived when omitted) unless ``index_candidate``
+    is False (bulk runs that only export results). A result built from a
+    near-duplicate carries ``near_duplicate`` with the estimated Jaccard
+    similarity.
     """
+    with get_tracer().trace("analyze_resume") as trace:
+        result = _analyze_resume(resume_text)
+        if index_candidate:
+            _index_candidate(resume_id or make_resume_id(resume_text), result)
+    return _with_trace(result, trace)
+
+
+def _analyze_resume(resume_text: str) -> Dict[str, Any]:
     if not resume_text or not resume_text.strip():
-        return {
-            "passed_check": False,
-            "reason": "Empty or invalid input",
-            "classification": None,
-            "evaluation": None,
-        }
+        return _rejected("Empty or invalid input")
+
+    tracer = get_tracer()
+    cache = get_result_cache()
+    cache_key = _analysis_cache_key(resume_text)
+    cached = _cache_lookup(cache, cache_key)
+    if cached is not None:
+        logger.info("Resume analysis cache hit.")
+        return _analysis_from_cache(cached)
 
+    # Identical concurrent calls share one router → classifier → evaluator run
+    with tracer.span("singleflight") as span:
+        result, shared = get_flight_group("analyze_resume").do(
+            cache_key, lambda: _run_pipeline(resume_text, cache_key))
+        span.set(coalesced=shared)
+    if shared:
+        logger.info("Joined an in-flight analysis of the same resume.")
+    return dict(result)
+
+
+def _run_pipeline(resume_text: str, cache_key: str) -> Dict[str, Any]:
+    tracer = get_tracer()
     logger.info("Starting resume analysis pipeline...")
 
-    # Step 1: Fast guardrail — is this even a resume?
-    router_result = _resume_router.classify_with_heuristics(resume_text)
+    # Step 0: A lightly edited copy of an analyzed resume reuses its Profile
+    signature, prior = _near_duplicate(resume_text)
+    if prior is not None:
+        profile = refresh_profile(prior["classification"], resume_text)
+        with tracer.span("evaluator") as span:
+            evaluation_result = get_resume_evaluators().audit_profile(profile, resume_text)
+            span.set(audit=evaluation_result["audit"])
+        return _store_analysis(_reused(prior, profile, evaluation_result), cache_key, signature)
 
-    if not router_result:
-        return {
-            "passed_check": False,
-            "reason": "Rejected by router: Non a resume",
-            "classification": None,
-            "evaluation": None,
-        }
+    # Step 1: Cascaded guardrail — is this even a resume?
+    with tracer.span("router") as span:
+        route = get_resume_router().route(resume_text)
+        span.set(tier=route.tier)
+
+    if not route.is_resume:
+        return _rejected(f"Rejected by router ({route.tier}): Non a resume", route)
 
     # Step 2: Full structured classification
     try:
         classification_result = classify_resume(resume_text=resume_text)
     except RuntimeError as e:
         logger.error("Classification failed: %s",e)
-        return {
-            "passed_check": False,
-            "reason": "Classification step failed",
-            "classification": None,
-            "evaluation": None,
-        }
+        return _rejected("Classification step failed")
+
+    # Step 3: Grounding check, escalated to LLM faithfulness only when needed
+    with tracer.span("evaluator") as span:
+        evaluation_result = get_resume_evaluators().audit_profile(
+            classification_result, resume_text)
+        span.set(audit=evaluation_result["audit"])
+
+    return _store_analysis(_passed(classification_result, evaluation_result, route),
+                           cache_key, signature)
+
+
+async def aanalyze_resume(resume_text: str, resume_id: Optional[str] = None,
+                          index_candidate: bool = True) -> Dict[str, Any]:
+    """
+    Async variant of ``analyze_resume`` (router → classifier → evaluator).
+
+    Uses the LLM async APIs so many resumes can be analyzed concurrently
+    on one event loop. Returns the same dict shape as ``analyze_resume``.
+    """
+    with get_tracer().trace("analyze_resume") as trace:
+        result = await _aanalyze_resume(resume_text)
+        if index_candidate:
+            _index_candidate(resume_id or make_resume_id(resume_text), result)
+    return _with_trace(result, trace)
 
-    # Step 3: Faithfulness evaluation (no query → relevancy skipped)
-    evaluation_result=_resume_evaluators.evaluate_response(
-        query=None,
-        response=str(classification_result),
-        contexts=[resume_text],
-    )
 
+async def _aanalyze_resume(resume_text: str) -> Dict[str, Any]:
+    if not resume_text or not resume_text.strip():
+        return _rejected("Empty or invalid input")
+
+    tracer = get_tracer()
+    cache = get_result_cache()
+    cache_key = _analysis_cache_key(resume_text)
+    cached = _cache_lookup(cache, cache_key)
+    if cached is not None:
+        logger.info("Resume analysis cache hit.")
+        return _analysis_from_cache(cached)
+
+    with tracer.span("singleflight") as span:
+        result, shared = await get_flight_group("analyze_resume").ado(
+            cache_key, lambda: _arun_pipeline(resume_text, cache_key))
+        span.set(coalesced=shared)
+    if shared:
+        logger.info("Joined an in-flight analysis of the same resume.")
+    return dict(result)
+
+
+async def _arun_pipeline(resume_text: str, cache_key: str) -> Dict[str, Any]:
+    tracer = get_tracer()
+    logger.info("Starting async resume analysis pipeline...")
+
+    signature, prior = _near_duplicate(resume_text)
+    if prior is not None:
+        profile = refresh_profile(prior["classification"], resume_text)
+        with tracer.span("evaluator") as span:
+            evaluation_result = await get_resume_evaluators().aaudit_profile(profile, resume_text)
+            span.set(audit=evaluation_result["audit"])
+        return _store_analysis(_reused(prior, profile, evaluation_result), cache_key, signature)
+
+    with tracer.span("router") as span:
+        route = await get_resume_router().aroute(resume_text)
+        span.set(tier=route.tier)
+    if not route.is_resume:
+        return _rejected(f"Rejected by router ({route.tier}): Non a resume", route)
+
+    try:
+        classification_result = await aclassify_resume(resume_text=resume_text)
+    except RuntimeError as e:
+        logger.error("Classification failed: %s",e)
+        return _rejected("Classification step failed")
+
+    with tracer.span("evaluator") as span:
+        evaluation_result = await get_resume_evaluators().aaudit_profile(
+            classification_result, resume_text)
+        span.set(audit=evaluation_result["audit"])
+
+    return _store_analysis(_passed(classification_result, evaluation_result, route),
+                           cache_key, signature)
+
+
+def router_stats() -> Dict[str, Dict[str, float]]:
+    """Per-tier decision counts and time spent by the shared resume router."""
+    return get_resume_router().stats()
+
+
+def audit_stats() -> Dict[str, int]:
+    """Profiles settled by the grounding check vs. escalated to the LLM auditor."""
+    return get_resume_evaluators().stats()
+
+
+def analysis_coalescing_stats() -> Dict[str, int]:
+    """How many ``analyze_resume`` calls ran the pipeline vs. joined one in flight."""
+    return get_flight_group("analyze_resume").stats()
+
+
+def _rejected(reason: str, route: Optional[RouteDecision] = None) -> Dict[str, Any]:
+    result = {
+        "passed_check": False,
+        "reason": reason,
+        "classification": None,
+        "evaluation": None,
+    }
+    if route is not None:
+        result["route"] = route.model_dump()
+    return result
+
+
+def _passed(classification_result: Profile, evaluation_result: Dict[str, Any],
+            route: RouteDecision) -> Dict[str, Any]:
     return {
         "passed_check": True,
+        "route": route.model_dump(),
         "classification": classification_result,
         "evaluation": evaluation_result,
         "summary": {
@@ -85,8 +260,79 @@ def analyze_resume(resume_text: str) -> Dict[str, Any]:
     }
 
 
+def _near_duplicate(resume_text: str) -> Tuple[Optional[Any], Optional[Dict[str, Any]]]:
+    """MinHash signature of the text (None when near-dup detection is off) and
+    the cached analysis of a near-duplicate resume, if one is indexed."""
+    index = get_near_dup_index()
+    if index is None:
+        return None, None
+    with get_tracer().span("near_dup") as span:
+        signature = index.signature(resume_text)
+        match = index.query(signature=signature)
+        prior = None
+        if match is not None:
+            cached = get_result_cache().get(match[0])
+            if cached is not None and cached.get("passed_check"):
+                prior = {**_analysis_from_cache(cached), "similarity": match[1]}
+        span.set(duplicate=prior is not None)
+    if prior is not None:
+        logger.info("Near-duplicate of an analyzed resume (similarity %s).", prior["similarity"])
+    return signature, prior
+
+
+def _reused(prior: Dict[str, Any], profile: Profile,
+            evaluation_result: Dict[str, Any]) -> Dict[str, Any]:
+    result = _passed(profile, evaluation_result, RouteDecision.model_validate(prior["route"]))
+    result["near_duplicate"] = {"similarity": prior["similarity"]}
+    return result
+
+
+def _store_analysis(result: Dict[str, Any], cache_key: str,
+                    signature: Optional[Any]) -> Dict[str, Any]:
+    """Cache a passed analysis and make it findable as a near-duplicate."""
+    get_result_cache().set(
+        cache_key, {**result, "classification": result["classification"].model_dump(mode="json")})
+    if signature is not None:
+        get_near_dup_index().add(cache_key, signature=signature)
+    return result
+
+
+def _analysis_cache_key(resume_text: str) -> str:
+    return content_hash(
+        resume_text, "analyze_resume", CLASSIFIER_PROMPT_VERSION, EXTRACTOR_VERSION,
+        GROUNDING_VERSION, classifier_model_name()
+    )
+
+
+def _cache_lookup(cache, cache_key: str) -> Optional[Dict[str, Any]]:
+    with get_tracer().span("result_cache") as span:
+        cached = cache.get(cache_key)
+        span.set(cache_hit=cached is not None)
+    return cached
+
+
+def _with_trace(result: Dict[str, Any], trace: Optional[Trace]) -> Dict[str, Any]:
+    """Attach the finished trace (timings, tokens, cost, cache hits) to a result."""
+    if trace is not None:
+        result["trace"] = trace.to_dict()
+    return result
+
+
+def _index_candidate(resume_id: str, result: Dict[str, Any]) -> Dict[str, Any]:
+    """Make a passed analysis searchable with ``candidate_search``."""
+    if result.get("passed_check"):
+        get_candidate_index().add(resume_id, result["classification"])
+    return result
+
+
+def _analysis_from_cache(cached: Dict[str, Any]) -> Dict[str, Any]:
+    return {**cached, "classification": profile_from_dict(cached["classification"])}
+
+
 def build_resume_index(resume_text: str) -> VectorStoreIndex:
-    """Build a vector index for the resume text.
+    """Build a throwaway vector index for the resume text.
+
+    Prefer ``ingest_resume`` / ``query_resume``, which reuse stored vectors.
 
     Args:
         resume_text (str): Raw resume text provided by the user.
@@ -102,47 +348,232 @@ def build_resume_index(resume_text: str) -> VectorStoreIndex:
 
     logger.info("Building VectorStoreIndex for resume...")
     documents = [Document(text=resume_text)]
-    index = VectorStoreIndex.from_documents(documents)
+    index = VectorStoreIndex.from_documents(
+        documents, embed_model=llm_registry.get_embed_model())
     return index
 
 
-def query_resume(resume_text: Optional[str] = None, 
-                 query: Optional[str] = None) -> str:
+def ingest_resume(resume_text: str, resume_id: Optional[str] = None) -> str:
+    """Embed a resume into the shared index once and return its ID.
+
+    Args:
+        resume_text (str): Raw resume text provided by the user.
+        resume_id (Optional[str]): Candidate/resume ID. Derived from the
+            content when omitted.
+
+    Returns:
+        str: The resume ID to pass to ``query_resume``.
+    """
+    return get_index_store().ingest(resume_text, resume_id=resume_id)
+
+
+def upsert_resume(resume_id: str, resume_text: str, analyze: bool = True) -> Dict[str, Any]:
+    """Apply a new or changed resume for a candidate (ATS delta sync).
+
+    Only chunks whose text changed are re-embedded; replaced chunks are
+    tombstoned until the next compaction. The resume handle is updated and,
+    with ``analyze``, the candidate's Profile is recomputed (a cache hit when
+    the text is unchanged) and replaced in the candidate search index.
+
+    Returns:
+        Dict[str, Any]: ``resume_id``, the index ``chunks`` counts and, when
+        analyzed, the ``analysis`` dict.
+
+    Raises:
+        ValueError: If resume_text is empty.
+    """
+    chunks = get_index_store().upsert(resume_id, resume_text)
+    get_resume_store().put(resume_text, resume_id=resume_id)
+    _invalidate_answers(resume_id)
+    result: Dict[str, Any] = {"resume_id": resume_id, "chunks": chunks}
+    if analyze:
+        result["analysis"] = analyze_resume(resume_text, resume_id=resume_id)
+        if not result["analysis"].get("passed_check"):
+            get_candidate_index().remove(resume_id)
+    return result
+
+
+def delete_resume(resume_id: str) -> None:
+    """Remove a candidate: tombstone its vectors, drop its Profile, handle and cached answers."""
+    get_index_store().delete(resume_id)
+    get_candidate_index().remove(resume_id)
+    get_resume_store().delete(resume_id)
+    _invalidate_answers(resume_id)
+
+
+def _invalidate_answers(resume_id: str) -> None:
+    answer_cache = get_semantic_cache()
+    if answer_cache is not None:
+        answer_cache.invalidate(resume_id)
+
+
+def query_resume(resume_text: Optional[str] = None,
+                 query: Optional[str] = None,
+                 resume_id: Optional[str] = None,
+                 mode: Optional[str] = None) -> str:
     """Query information from a resume using semantic search and LLM reasoning.
 
     Args:
         resume_text (Optional[str]): The raw resume text to analyze.
         query (Optional[str]): User query about the resume (skills, experience, etc.).
+        resume_id (Optional[str]): ID of an already ingested resume. When given
+            together with resume_text, the text is stored under this ID (in
+            the ``ResumeStore``, and in the index once a query retrieves);
+            text passed alone is stored under the returned content-derived ID.
+        mode (Optional[str]): "auto", "direct" or "retrieval" (see
+            ``query_resume_with_metadata``).
 
     Returns:
         str: The result from the semantic resume query.
 
     Raises:
-        ValueError: If resume_text or query is missing.
+        ValueError: If both resume_text and resume_id, or query, are missing.
+        UnknownResumeError: If resume_id is unknown and no resume_text is given.
         Exception: For any unexpected errors during query execution.
-    
+    """
+    return query_resume_with_metadata(resume_text, query, resume_id, mode)["response"]
+
+
+def query_resume_with_metadata(resume_text: Optional[str] = None,
+                               query: Optional[str] = None,
+                               resume_id: Optional[str] = None,
+                               mode: Optional[str] = None) -> Dict[str, Any]:
+    """``query_resume`` returning a dict with the answer and its metadata.
+
+    Modes (``mode`` argument, else ``QUERY_MODE`` env var, default "auto"):
+      - "direct": the whole resume goes into the answer prompt; nothing is
+        embedded or retrieved, so the semantic answer cache is skipped too
+      - "retrieval": section-aware chunks are retrieved from the shared index
+      - "auto": "direct" when the resume text is available and at most
+        ``DIRECT_CONTEXT_MAX_TOKENS`` (default 3000) tokens, else "retrieval"
+
+    LLM calls are scheduled as "interactive" unless the caller set a
+    priority (``scheduler.priority``).
+
+    Returns:
+        Dict[str, Any]: ``response``, ``resume_id``, ``query_mode`` ("cache"
+        when answered from the semantic answer cache), ``resume_tokens`` (None when the text was not available),
+        ``elapsed_ms``, ``retrieval_ms`` (time spent ingesting, embedding and
+        retrieving), ``time_saved_ms`` (direct mode: mean retrieval overhead
+        of recent retrieval-mode queries, None until one has run),
+        ``semantic_cache_hit`` with the matched ``cached_query`` and its
+        ``similarity``, and, with tracing enabled, ``trace``.
+
     Steps:
-        Step 1: Build vector index
-        Step 2: Create query engine
-        Step 3: Execute query
+        Step 1: Pick the mode and (retrieval) embed the query
+        Step 2 (retrieval): Return a cached answer to a near-identical
+            question, if any (``semantic_cache``)
+        Step 3 (retrieval): Ingest the resume (once) and retrieve its chunks
+        Step 4: Synthesize the answer (retrieval: and cache it)
     """
     logger.info("Executing resume query...")
 
-    if not resume_text:
-        raise ValueError("resume_text is required.")
+    if not resume_text and not resume_id:
+        raise ValueError("resume_text or resume_id is required.")
 
     if not query:
         raise ValueError("query is required.")
 
-    try:
-        index = build_resume_index(resume_text)
-        logger.debug("Creating query engine...")
-        query_engine = index.as_query_engine(llm=llm)
-        logger.debug("Running semantic query...")
-        response = query_engine.query(query)
-        return str(response)
+    tracer = get_tracer()
+    start = time.perf_counter()
+    cached = None
+    keep_text = bool(resume_text)
+    with tracer.trace("query_resume") as trace, priority("interactive", override=False):
+        try:
+            context, mode, tokens = _query_mode(resume_text, resume_id, mode)
+            index_store = get_index_store()
+            if context:
+                resume_id = resume_id or make_resume_id(context)
+            # A direct answer is one LLM call; a cache lookup would add an
+            # embedding round trip to every question to save it on repeats
+            answer_cache = get_semantic_cache() if mode == "retrieval" else None
+            query_embedding = None
+            if mode == "retrieval":
+                with tracer.span("embedding"):
+                    query_embedding = index_store.embed_query(query)
+            version = content_hash(context) if context else index_store.content_version(resume_id)
+            if answer_cache is not None:
+                with tracer.span("semantic_cache") as span:
+                    cached = answer_cache.lookup(resume_id, query_embedding, version, query)
+                    span.set(cache_hit=cached is not None)
+
+            retrieval_seconds = 0.0
+            if cached is not None:
+                logger.info("Semantic answer cache hit (similarity %s).", cached["similarity"])
+                response, mode = cached["response"], "cache"
+            elif mode == "direct":
+                if keep_text:
+                    # Nothing is indexed; later queries by the returned ID find it here
+                    get_resume_store().put(context, resume_id=resume_id)
+                with tracer.span("direct_context", resume_tokens=tokens):
+                    response = llm_registry.get_llm().predict(
+                        RESUME_DIRECT_QUERY_PROMPT, resume_text=context, query_str=query)
+            else:
+                if context:
+                    resume_id = index_store.ingest(context, resume_id=resume_id)
+                elif not index_store.has(resume_id) and resume_id in get_resume_store():
+                    # Stored by an earlier direct-mode query; index it now
+                    resume_id = index_store.ingest(get_resume_store().get(resume_id),
+                                                   resume_id=resume_id)
+                logger.debug("Creating query engine...")
+                query_engine = index_store.as_query_engine(resume_id, llm=llm_registry.get_llm())
+                logger.debug("Running semantic query...")
+                query_bundle = QueryBundle(query, embedding=query_embedding)
+                with tracer.span("retrieval") as span:
+                    nodes = query_engine.retrieve(query_bundle)
+                    span.set(nodes=len(nodes))
+                retrieval_seconds = time.perf_counter() - start
+                with tracer.span("synthesis"):
+                    response = query_engine.synthesize(query_bundle, nodes)
+                with _retrieval_overhead_lock:
+                    _retrieval_overhead.append(retrieval_seconds)
+
+            if answer_cache is not None and cached is None:
+                answer_cache.store(resume_id, query, str(response), query_embedding, version)
+
+        except Exception as e:
+            logger.error("Error occurred during resume query: %s",e)
+            raise
+
+    return _with_trace({
+        "response": str(response),
+        "resume_id": resume_id,
+        "query_mode": mode,
+        "resume_tokens": tokens,
+        "elapsed_ms": round((time.perf_counter() - start) * 1000.0, 3),
+        "retrieval_ms": round(retrieval_seconds * 1000.0, 3),
+        "time_saved_ms": _time_saved_ms() if mode == "direct" else 0.0,
+        "semantic_cache_hit": cached is not None,
+        "cached_query": cached["query"] if cached else None,
+        "similarity": cached["similarity"] if cached else None,
+    }, trace)
+
+
+def _query_mode(resume_text: Optional[str], resume_id: Optional[str],
+                mode: Optional[str]) -> Tuple[Optional[str], str, Optional[int]]:
+    """Return (full text or None, "direct" / "retrieval", token count or None)."""
+    mode = (mode or os.getenv("QUERY_MODE", "auto")).lower()
+    if mode not in QUERY_MODES:
+        raise ValueError(f"mode must be one of {QUERY_MODES}, got {mode!r}")
+
+    text = resume_text
+    if not text and mode != "retrieval":
+        store = get_resume_store()
+        text = store.get(resume_id) if resume_id in store else None
+    if text is None:
+        if mode == "direct":
+            raise UnknownResumeError(f"Unknown resume_id: {resume_id}")
+        return None, "retrieval", None
+
+    tokens = estimate_tokens(text)
+    if mode == "auto":
+        limit = int(os.getenv("DIRECT_CONTEXT_MAX_TOKENS", str(DEFAULT_DIRECT_CONTEXT_MAX_TOKENS)))
+        mode = "direct" if tokens <= limit else "retrieval"
+    return text, mode, tokens
 
-    except Exception as e:
-        logger.error("Error occurred during resume query: %s",e)
-        raise
 
+def _time_saved_ms() -> Optional[float]:
+    with _retrieval_overhead_lock:
+        if not _retrieval_overhead:
+            return None
+        return round(sum(_retrieval_overhead) / len(_retrieval_overhead) * 1000.0, 3)
@@ -0,0 +1,158 @@
+""" Resume Handle Store """
+import os
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+import llm_registry
+from field_extractor import extract_fields
+from text_utils import make_resume_id, normalize_text
+
+logger = logging.getLogger(__name__)
+
+SYNOPSIS_MAX_CHARS = 240
+# Resumes kept in memory in front of the SQLite file
+DEFAULT_CACHE_SIZE = 1024
+
+
+class UnknownResumeError(KeyError):
+    """No resume is stored or indexed under the requested resume_id."""
+
+
+class ResumeStore:
+    """
+    Maps short resume IDs to full resume text.
+
+    Lets the agent pass a ``resume_id`` through tool calls instead of echoing
+    the whole resume through the LLM. Backed by a dict, plus an optional
+    SQLite file so IDs survive restarts and are shared across workers. With
+    the file, the dict is only an LRU cache of ``cache_size`` resumes in
+    front of it; without it, the dict is the store and is not bounded.
+    """
+    def __init__(self, path: Optional[str] = None, cache_size: int = DEFAULT_CACHE_SIZE):
+        self.path = path
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[str, str]]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS resumes ("
+                "resume_id TEXT PRIMARY KEY, text TEXT NOT NULL, synopsis TEXT NOT NULL)"
+            )
+            self._db.commit()
+
+    def put(self, resume_text: str, resume_id: Optional[str] = None) -> str:
+        """Store a resume and return its ID.
+
+        Args:
+            resume_text (str): Raw resume text.
+            resume_id (Optional[str]): Candidate/resume ID. Derived from the
+                content when omitted.
+
+        Returns:
+            str: The resume ID.
+
+        Raises:
+            ValueError: If resume_text is empty.
+        """
+        if not resume_text or not resume_text.strip():
+            raise ValueError("resume_text cannot be empty.")
+
+        resume_id = resume_id or make_resume_id(resume_text)
+        synopsis = build_synopsis(resume_text)
+        with self._lock:
+            self._remember(resume_id, (resume_text, synopsis))
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO resumes (resume_id, text, synopsis) VALUES (?, ?, ?)",
+                    (resume_id, resume_text, synopsis),
+                )
+                self._db.commit()
+        return resume_id
+
+    def get(self, resume_id: str) -> str:
+        """Return the full text for resume_id.
+
+        Raises:
+            UnknownResumeError: If resume_id is unknown.
+        """
+        return self._load(resume_id)[0]
+
+    def synopsis(self, resume_id: str) -> str:
+        """Return the short synopsis stored with resume_id.
+
+        Raises:
+            UnknownResumeError: If resume_id is unknown.
+        """
+        return self._load(resume_id)[1]
+
+    def delete(self, resume_id: str) -> None:
+        """Forget resume_id (no-op when unknown)."""
+        with self._lock:
+            self._entries.pop(resume_id, None)
+            if self._db is not None:
+                self._db.execute("DELETE FROM resumes WHERE resume_id = ?", (resume_id,))
+                self._db.commit()
+
+    def __contains__(self, resume_id: str) -> bool:
+        try:
+            self._load(resume_id)
+            return True
+        except KeyError:
+            return False
+
+    def _load(self, resume_id: str) -> Tuple[str, str]:
+        with self._lock:
+            entry = self._entries.get(resume_id)
+            if entry is not None:
+                self._entries.move_to_end(resume_id)
+                return entry
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT text, synopsis FROM resumes WHERE resume_id = ?", (resume_id,)
+                ).fetchone()
+                if row is not None:
+                    self._remember(resume_id, (row[0], row[1]))
+                    return row[0], row[1]
+        raise UnknownResumeError(f"Unknown resume_id: {resume_id}")
+
+    def _remember(self, resume_id: str, entry: Tuple[str, str]) -> None:
+        self._entries[resume_id] = entry
+        self._entries.move_to_end(resume_id)
+        if self._db is not None:
+            while len(self._entries) > self.cache_size:
+                self._entries.popitem(last=False)
+
+
+def build_synopsis(resume_text: str) -> str:
+    """One-line synopsis: headline plus locally extracted skills/experience."""
+    headline = next((line.strip() for line in resume_text.splitlines() if line.strip()), "")
+    parts = [normalize_text(headline)[:120]]
+    fields = extract_fields(resume_text)
+    if fields.years_of_experience is not None:
+        parts.append(f"{fields.years_of_experience:g} years experience")
+    if fields.technical_skills:
+        parts.append("skills: " + ", ".join(fields.technical_skills[:8]))
+    return " | ".join(p for p in parts if p)[:SYNOPSIS_MAX_CHARS]
+
+
+_resume_store: Optional[ResumeStore] = None
+
+
+def get_resume_store() -> ResumeStore:
+    """Return the process-wide resume store, creating it on first use.
+
+    Set ``RESUME_STORE_PATH`` to persist it in a SQLite file, and
+    ``RESUME_STORE_CACHE_SIZE`` to size the in-memory cache in front of it.
+    """
+    global _resume_store  # pylint: disable=global-statement
+    if _resume_store is None:
+        llm_registry.load_env()
+        _resume_store = ResumeStore(
+            path=os.getenv("RESUME_STORE_PATH") or None,
+            cache_size=int(os.getenv("RESUME_STORE_CACHE_SIZE", str(DEFAULT_CACHE_SIZE))),
+        )
+    return _resume_store
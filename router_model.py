@@ -0,0 +1,294 @@
+""" Lightweight Local Resume Detector (Router Tier 2) """
+import re
+import json
+import math
+import random
+import zlib
+import logging
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[a-z0-9@+#.]+")
+
+# Small labeled seed set so the model works out of the box; retrain with
+# real ATS data through ``HashedNGramClassifier.fit`` / ``load``.
+SEED_EXAMPLES: List[Tuple[str, bool]] = [
+    ("Senior Backend Engineer. Experience: 7 years building distributed systems in Python. "
+     "Skills: Python, Kafka, Docker. Contact: Email: jane@example.com Phone: +1-312-555-0101", True),
+    ("Machine Learning Engineer with 4 years in applied ML. Skills: PyTorch, Transformers. "
+     "Education: M.S. Computer Science. Email: ml@example.com", True),
+    ("HR Coordinator. Experience: 5 years in HR operations and onboarding. Skills: HRIS, "
+     "Recruitment Coordination. Contact: Email: hr@example.com Phone: +1-555-201-9876", True),
+    ("Financial Analyst. 6 years analyzing financial models. Skills: Excel, Power BI, "
+     "Budgeting. Email: fin@example.com", True),
+    ("Marketing Coordinator. 4 years in digital marketing and brand campaigns. Skills: SEO, "
+     "Google Analytics, Copywriting. Phone: +1-333-101-4650", True),
+    ("Motivated Software Engineer with over 1.8 years of experience at an AI startup, "
+     "building RAG systems and LLM-powered agents with Python, Django and LlamaIndex.", True),
+    ("Full-stack developer, 4+ years of experience. Specialized in Python and React. "
+     "Deployed systems on AWS. Contact: hello@example.com", True),
+    ("Curriculum Vitae. Education: B.A. Economics, 2015. Work history: Sales Associate "
+     "2016-2020, Account Manager 2020-present. References available on request.", True),
+    ("Registered Nurse. Professional experience: ICU nurse 2018 - Present. Certifications: "
+     "BLS, ACLS. Education: BSN. Phone: 555-010-2222", True),
+    ("Project Manager | PMP. Led cross-functional teams of 12. Managed budgets of $2M. "
+     "Employment history and achievements listed below. LinkedIn profile available.", True),
+    ("Recipe: Grandma's pancakes. Ingredients: flour, two eggs, butter. Instructions: mix, "
+     "flip, eat. Serves 4.", False),
+    ("INVOICE #1043. Bill to: Acme Corp. Item: consulting hours. Subtotal, tax, total due "
+     "within 30 days. Thank you for your business.", False),
+    ("We are hiring! Job description: Senior Python Engineer. Responsibilities and "
+     "requirements listed below. Competitive salary and benefits. Apply now.", False),
+    ("A Comprehensive Guide to Caring for Your Pet Iguana. Chapters: Understanding Iguana "
+     "Moods, Proper Sunlamp Etiquette.", False),
+    ("Galactic Federation Report. Subject: Alien mineral activity in Sector X-92. Findings: "
+     "the rocks are shiny, the researchers are confused.", False),
+    ("Dear team, please find attached the minutes from yesterday's meeting. Action items "
+     "are due Friday. Regards, Tom", False),
+    ("def main():\n    print('hello world')\n\nif __name__ == '__main__':\n    main()", False),
+    ("This Agreement is entered into by and between the parties hereto. Whereas the "
+     "Licensor grants the Licensee a non-exclusive license, subject to the terms herein.", False),
+    ("Breaking news: local council approves new park budget. Residents gathered at city hall "
+     "to discuss the proposal on Tuesday evening.", False),
+    ("Receipt. Store #221. 2x Coffee 4.50, 1x Muffin 2.25. Total 11.25. Paid by card. "
+     "Thank you for shopping with us.", False),
+    ("Office Manager. 8 years running front-office operations for a dental practice. "
+     "Scheduling, billing, vendor management. Phone: 555-410-7788", True),
+    ("Cloud architect. Designed multi-region AWS and GCP platforms for retail clients. "
+     "Certifications: AWS Solutions Architect Professional. 2013 - present.", True),
+    ("Barista and shift supervisor, Starbucks 2019-2023. Trained new staff, handled cash, "
+     "opened and closed the store.", True),
+    ("Data scientist. M.S. Statistics. Built churn and pricing models in Python and R at "
+     "two e-commerce companies.", True),
+    ("Civil engineer, PE. Highway and bridge design at AECOM 2010-2018 and Jacobs "
+     "2018-present. Education: BSc Civil Engineering.", True),
+    ("Warehouse associate. Picking, packing and inventory counts. Reliable, punctual, "
+     "available for night shifts.", True),
+    ("Physician, internal medicine. Residency at Johns Hopkins. Board certified 2017. "
+     "Languages: English, Hindi.", True),
+    ("Copywriter with 6 years in agencies. Clients included Nike and Unilever. Portfolio "
+     "and references available.", True),
+    ("QA engineer. Selenium, Cypress, Jest. Wrote test plans for mobile and web releases "
+     "at a SaaS startup 2020-2024.", True),
+    ("Social worker, LCSW. Case management for families at county services 2014-2022. "
+     "Master of Social Work.", True),
+    ("Retail store manager. Led a team of 25, hit sales targets 11 quarters in a row. "
+     "Previously assistant manager at Target.", True),
+    ("Security analyst. SOC monitoring, incident response, SIEM tuning. CISSP, Security+. "
+     "Previous employers: IBM, Accenture.", True),
+    ("Dental hygienist, licensed 2015. Private practice experience. CPR certified.", True),
+    ("Professional summary: bilingual call-center agent with strong de-escalation skills. "
+     "Work experience at Teleperformance 2018-2022.", True),
+    ("Android developer. Kotlin, Jetpack Compose. Shipped 4 apps with 1M+ installs. "
+     "Education: B.Tech Computer Science, 2016.", True),
+    ("Logistics coordinator. Managed freight bookings and customs paperwork for an "
+     "importer, 2017 to present. Fluent in SAP.", True),
+    ("Event planner. Organized 150+ weddings and corporate events. Vendor negotiation, "
+     "budgeting, on-site coordination.", True),
+    ("HVAC technician. EPA 608 certified. 7 years installing and servicing commercial "
+     "systems.", True),
+    ("Translator (German-English). Freelance since 2012. Legal and medical documents. MA "
+     "in Translation Studies.", True),
+    ("Product manager. Launched a payments feature used by 2M users. Previously business "
+     "analyst at Capital One. MBA, Wharton.", True),
+    ("Abstract. This paper studies the effect of interest rates on housing prices using "
+     "panel data from 40 cities.", False),
+    ("Dear customer, your subscription renews on June 1. To cancel, visit your account "
+     "settings. Thank you for being a member.", False),
+    ("Chapter 3. The storm rolled in over the harbor as Maria closed the shutters and lit "
+     "the old lamp.", False),
+    ("Safety data sheet. Product: industrial cleaner. Hazards: causes skin irritation. "
+     "First aid: rinse with water.", False),
+    ("Sprint retrospective: what went well, what did not, action items for next sprint. "
+     "Deploy pipeline was flaky again.", False),
+    ("Purchase order 5521. Quantity 200 units of part A-14 at 3.20 each. Delivery by end "
+     "of month.", False),
+    ("Wedding invitation. Together with their families, Emma and Liam request the pleasure"
+     " of your company on Saturday, June 14.", False),
+    ("Patient discharge summary. Admitted for pneumonia, treated with antibiotics, "
+     "discharged in stable condition. Follow up in two weeks.", False),
+    ("Course catalog: CS 101 Introduction to Programming, 4 credits. Prerequisites: none.", False),
+    ("Recipe for lentil soup: saute onions, add lentils and stock, simmer 30 minutes.", False),
+    ("Real estate listing: 3 bed, 2 bath house with a large garden. Close to schools. Open"
+     " house Sunday.", False),
+    ("Error log: connection refused at 10:42:13. Retrying in 5 seconds. Max retries "
+     "exceeded.", False),
+    ("Football match report: the home side won 2-1 after a late penalty. The coach praised"
+     " the defence.", False),
+    ("Performance review template. Rate the employee on communication, teamwork and "
+     "delivery. Manager comments.", False),
+    ("Grant proposal. Aims: reduce childhood asthma in urban areas. Budget justification "
+     "and timeline attached.", False),
+    ("Tutorial: how to set up a Python virtual environment and install packages with pip.", False),
+    ("Museum guide. Gallery 4 features impressionist paintings from the late 19th century.", False),
+    ("Insurance claim form. Policy number, date of incident, description of damage, "
+     "signature.", False),
+    ("Company handbook: vacation policy. Employees accrue 1.5 days per month. Requests "
+     "must be approved by a manager.", False),
+    ("Horoscope for Leo: a surprising message brings good news this week.", False),
+]
+
+# Held out from training; only used to fit the default model's Platt scaling
+HOLDOUT_EXAMPLES: List[Tuple[str, bool]] = [
+    ("Data Engineer. 5 years building ETL pipelines with Spark and Airflow. Skills: SQL, "
+     "Python, Snowflake. Email: data@example.com", True),
+    ("Graphic Designer. Portfolio available online. Work experience: Freelance designer "
+     "2017-2021, Senior Designer at Studio Nine 2021-present. Tools: Figma, Illustrator.", True),
+    ("Teacher, Grade 5. Taught mathematics and science for 8 years. Education: B.Ed. "
+     "Certifications: State Teaching License. Phone: 555-303-1188", True),
+    ("Summary: Customer support specialist with 3 years handling enterprise accounts. "
+     "Employment: Zendesk Inc. 2021-2024. Languages: English, Spanish.", True),
+    ("Mechanical engineer, CAD/CAM specialist. Professional history: Bosch 2014-2019, "
+     "Siemens 2019-present. Degree: MSc Mechanical Engineering.", True),
+    ("Jane Doe\nAccountant | CPA\nWork history\nDeloitte, Senior Associate, 2016 - 2022\n"
+     "Education\nB.Com, University of Toronto", True),
+    ("DevOps engineer. Kubernetes, Terraform, AWS. Previously SRE at two fintech startups."
+     " GitHub: github.com/jdoe. Open to relocation.", True),
+    ("Chef de cuisine with 10 years in fine dining. Previous positions: sous chef at Le "
+     "Jardin, line cook at Bistro 21. Culinary Institute graduate.", True),
+    ("Research scientist. PhD in Physics, 2019. Publications: 12 peer-reviewed papers. "
+     "Postdoctoral fellow at CERN 2019-2022.", True),
+    ("Sales manager. Grew regional revenue 40% in two years. Managed a team of 8 account "
+     "executives. References on request.", True),
+    ("Junior web developer. Bootcamp graduate 2023. Projects: portfolio site, todo app in "
+     "React. Looking for my first role.", True),
+    ("Operations lead, logistics. 6 years at DHL coordinating warehouse staff and shipping"
+     " schedules. Forklift certified.", True),
+    ("Quarterly earnings call transcript. Revenue grew 12% year over year. The CFO "
+     "discussed margins and guidance for the next fiscal year.", False),
+    ("Lease agreement. The tenant shall pay rent on the first day of each month. The "
+     "landlord is responsible for structural repairs.", False),
+    ("Product review: this blender is loud but powerful. Five stars for smoothies, two "
+     "stars for cleanup. Would buy again.", False),
+    ("Meeting agenda: 1. Budget review 2. Hiring plan for Q3 3. Office move. Please bring "
+     "your laptops.", False),
+    ("Shipping notification: your order #88812 has shipped and will arrive Thursday. Track"
+     " your package online.", False),
+    ("Travel itinerary. Flight BA117 departs London 10:25, arrives New York 13:05. Hotel "
+     "check-in after 3pm.", False),
+    ("Abstract: We propose a novel transformer architecture for protein folding. "
+     "Experiments on benchmark datasets show improvements.", False),
+    ("Weather forecast: sunny with a high of 24C. Light winds from the southwest. Rain "
+     "expected over the weekend.", False),
+    ("Press release: Acme Corp announces the acquisition of Beta Labs. The deal is "
+     "expected to close in the fourth quarter.", False),
+    ("User manual. Step 1: unpack the device. Step 2: charge the battery for 4 hours. Step"
+     " 3: press and hold the power button.", False),
+    ("Hi Sam, thanks for the great dinner last night! Let's do it again soon. Say hi to "
+     "the kids. Love, Anna", False),
+    ("Syllabus: Introduction to Psychology. Week 1: history of the field. Week 2: research"
+     " methods. Grading: midterm 40%, final 60%.", False),
+]
+
+
+def _features(text: str, dim: int) -> Dict[int, float]:
+    """Hash word unigrams and bigrams into a signed sparse vector."""
+    tokens = _TOKEN_RE.findall(text.lower())
+    grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    features: Dict[int, float] = {}
+    for gram in grams:
+        h = zlib.crc32(gram.encode("utf-8"))
+        index = h % dim
+        features[index] = features.get(index, 0.0) + (1.0 if h & 0x80000000 else -1.0)
+    norm = math.sqrt(sum(v * v for v in features.values())) or 1.0
+    return {k: v / norm for k, v in features.items()}
+
+
+def _sigmoid(z: float) -> float:
+    if z >= 0:
+        return 1.0 / (1.0 + math.exp(-z))
+    e = math.exp(z)
+    return e / (1.0 + e)
+
+
+class HashedNGramClassifier:
+    """
+    Logistic regression over hashed word n-grams — no external dependencies.
+
+    Trained with log-loss SGD, so outputs are probabilities; ``calibrate``
+    additionally fits Platt scaling on held-out examples.
+    """
+    def __init__(self, dim: int = 2 ** 18, l2: float = 1e-4):
+        self.dim = dim
+        self.l2 = l2
+        self.weights: Dict[int, float] = {}
+        self.bias = 0.0
+        self.platt: Tuple[float, float] = (1.0, 0.0)
+
+    def fit(self, examples: Iterable[Tuple[str, bool]],
+            epochs: int = 30, learning_rate: float = 0.5, seed: int = 13) -> "HashedNGramClassifier":
+        """Train on ``(text, is_resume)`` pairs."""
+        data = [(_features(text, self.dim), 1.0 if label else 0.0) for text, label in examples]
+        rng = random.Random(seed)
+        for _ in range(epochs):
+            rng.shuffle(data)
+            for features, label in data:
+                error = self._raw_probability(features) - label
+                for index, value in features.items():
+                    weight = self.weights.get(index, 0.0)
+                    self.weights[index] = weight - learning_rate * (error * value + self.l2 * weight)
+                self.bias -= learning_rate * error
+        return self
+
+    def calibrate(self, examples: Sequence[Tuple[str, bool]],
+                  epochs: int = 500, learning_rate: float = 0.5) -> "HashedNGramClassifier":
+        """Fit Platt scaling ``sigmoid(a * logit + b)`` on held-out examples.
+
+        Uses Platt's smoothed targets ((N+ + 1) / (N+ + 2) and 1 / (N- + 2)),
+        so a small, separable holdout does not yield overconfident scores.
+        """
+        positives = sum(1 for _, label in examples if label)
+        negatives = len(examples) - positives
+        high, low = (positives + 1) / (positives + 2), 1 / (negatives + 2)
+        logits = [(self._logit(_features(text, self.dim)), high if label else low)
+                  for text, label in examples]
+        a, b = 1.0, 0.0
+        for _ in range(epochs):
+            grad_a = grad_b = 0.0
+            for logit, label in logits:
+                error = _sigmoid(a * logit + b) - label
+                grad_a += error * logit
+                grad_b += error
+            a -= learning_rate * grad_a / max(1, len(logits))
+            b -= learning_rate * grad_b / max(1, len(logits))
+        self.platt = (a, b)
+        return self
+
+    def predict_proba(self, text: str) -> float:
+        """Calibrated probability that text is a resume."""
+        a, b = self.platt
+        return _sigmoid(a * self._logit(_features(text, self.dim)) + b)
+
+    def save(self, path: str) -> None:
+        """Write the model as JSON."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"dim": self.dim, "l2": self.l2, "bias": self.bias,
+                       "platt": list(self.platt),
+                       "weights": {str(k): v for k, v in self.weights.items()}}, f)
+
+    @classmethod
+    def load(cls, path: str) -> "HashedNGramClassifier":
+        """Read a model written by ``save``."""
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        model = cls(dim=data["dim"], l2=data["l2"])
+        model.bias = data["bias"]
+        model.platt = tuple(data["platt"])
+        model.weights = {int(k): v for k, v in data["weights"].items()}
+        return model
+
+    def _logit(self, features: Dict[int, float]) -> float:
+        return self.bias + sum(self.weights.get(i, 0.0) * v for i, v in features.items())
+
+    def _raw_probability(self, features: Dict[int, float]) -> float:
+        return _sigmoid(self._logit(features))
+
+
+def load_default_model(path: Optional[str] = None) -> HashedNGramClassifier:
+    """Load a saved model from path, or train one on ``SEED_EXAMPLES`` and
+    calibrate it on ``HOLDOUT_EXAMPLES``."""
+    if path:
+        logger.info("Loading router model from %s", path)
+        return HashedNGramClassifier.load(path)
+    return HashedNGramClassifier().fit(SEED_EXAMPLES).calibrate(HOLDOUT_EXAMPLES)
@@ -0,0 +1,283 @@
+""" Priority Scheduling for LLM-Bound Work """
+import os
+import time
+import logging
+import threading
+import contextlib
+import contextvars
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, Optional
+import llm_registry
+from tracing import latency_percentiles
+
+logger = logging.getLogger(__name__)
+
+# Most urgent first
+PRIORITIES = ("interactive", "normal", "bulk")
+DEFAULT_PRIORITY = "normal"
+DEFAULT_WEIGHTS = {"interactive": 16.0, "normal": 4.0, "bulk": 1.0}
+# Share of the limiter's concurrency limit each class may hold at once
+DEFAULT_CAPS = {"interactive": 1.0, "normal": 1.0, "bulk": 0.75}
+# Seconds a queued request may wait before it is dropped (None: no limit)
+DEFAULT_MAX_WAIT: Dict[str, Optional[float]] = {"interactive": None, "normal": None,
+                                                "bulk": 300.0}
+# Queue-wait samples kept per class for the stats percentiles
+_WAIT_WINDOW = 1024
+
+
+class DeadlineExceeded(TimeoutError):
+    """Queued LLM work dropped because its deadline passed before it could start."""
+
+
+class _Priority:
+    __slots__ = ("name", "deadline")
+
+    def __init__(self, name: str, deadline: Optional[float]):
+        self.name = name
+        self.deadline = deadline
+
+
+_current: contextvars.ContextVar[Optional[_Priority]] = contextvars.ContextVar(
+    "llm_priority", default=None)
+
+
+@contextlib.contextmanager
+def priority(name: str, timeout: Optional[float] = None,
+             override: bool = True) -> Iterator[None]:
+    """
+    Run the block's LLM calls in priority class name.
+
+    The class follows the context into awaited coroutines, tasks created in
+    the block and ``asyncio.to_thread`` calls.
+
+    Args:
+        name (str): "interactive", "normal" or "bulk".
+        timeout (Optional[float]): Seconds from now after which LLM calls
+            from the block that are still queued are dropped with
+            ``DeadlineExceeded``.
+        override (bool): When False, an enclosing ``priority`` block wins;
+            used by library entry points to set a default.
+
+    Raises:
+        ValueError: If name is not a known priority class.
+    """
+    if name not in PRIORITIES:
+        raise ValueError(f"Unknown priority {name!r}; expected one of {PRIORITIES}")
+    if not override and _current.get() is not None:
+        yield
+        return
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    token = _current.set(_Priority(name, deadline))
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def current_priority() -> str:
+    """Priority class of the current context (``DEFAULT_PRIORITY`` when unset)."""
+    current = _current.get()
+    return current.name if current is not None else DEFAULT_PRIORITY
+
+
+def most_urgent(names: Iterable[str]) -> str:
+    """The most urgent of the given priority classes."""
+    return min(names, key=PRIORITIES.index, default=DEFAULT_PRIORITY)
+
+
+class Ticket:
+    """A queued request: its class, WFQ tags and deadline."""
+    __slots__ = ("priority", "cost", "start_tag", "finish_tag", "deadline", "enqueued",
+                 "dispatched")
+
+    def __init__(self, priority_name: str, cost: float, start_tag: float, finish_tag: float,
+                 deadline: Optional[float], enqueued: float):
+        self.priority = priority_name
+        self.cost = cost
+        self.start_tag = start_tag
+        self.finish_tag = finish_tag
+        self.deadline = deadline
+        self.enqueued = enqueued
+        self.dispatched = False
+
+
+class PriorityScheduler:
+    """
+    Decides which waiting LLM request gets the next rate-limiter slot.
+
+    - Weighted fair queuing: each request gets a virtual finish tag
+      (its estimated tokens divided by its class weight, after the class's
+      previous request), and the smallest tag among eligible classes goes
+      next. Under contention the classes share the quota in proportion to
+      their weights; an idle class's share goes to the others, and bulk
+      work still progresses behind a steady stream of interactive calls.
+    - Per-class caps: a class may hold at most its share of the limiter's
+      (adaptive) concurrency limit, so a backfill never occupies every
+      slot and an interactive call finds one free within one LLM latency.
+    - Deadlines: a request still queued past its deadline (from
+      ``priority(timeout=...)`` or the class's ``max_wait``) is dropped with
+      ``DeadlineExceeded`` instead of running late.
+
+    Requests within a class run in arrival order. Used by
+    ``AdaptiveRateLimiter``, whose ``try_acquire`` is the gate.
+    """
+    def __init__(self,
+                 weights: Optional[Dict[str, float]] = None,
+                 caps: Optional[Dict[str, float]] = None,
+                 max_wait: Optional[Dict[str, Optional[float]]] = None,
+                 poll_interval: float = 0.01,
+                 clock: Callable[[], float] = time.monotonic):
+        self.weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        self.caps = {**DEFAULT_CAPS, **(caps or {})}
+        self.max_wait = {**DEFAULT_MAX_WAIT, **(max_wait or {})}
+        self.poll_interval = poll_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._queues: Dict[str, Deque[Ticket]] = {name: deque() for name in PRIORITIES}
+        self._in_flight = {name: 0 for name in PRIORITIES}
+        self._last_finish = {name: 0.0 for name in PRIORITIES}
+        self._virtual_time = 0.0
+        self._waits: Dict[str, Deque[float]] = {
+            name: deque(maxlen=_WAIT_WINDOW) for name in PRIORITIES}
+        self._stats = {name: {"dispatched": 0, "dropped": 0, "cancelled": 0}
+                       for name in PRIORITIES}
+
+    def enqueue(self, cost: float) -> Ticket:
+        """Queue a request of the current context's priority class.
+
+        Args:
+            cost (float): Estimated tokens of the request.
+        """
+        current = _current.get()
+        name = current.name if current is not None else DEFAULT_PRIORITY
+        now = self._clock()
+        deadline = current.deadline if current is not None else None
+        if self.max_wait.get(name) is not None:
+            class_deadline = now + self.max_wait[name]
+            deadline = class_deadline if deadline is None else min(deadline, class_deadline)
+        cost = max(float(cost), 1.0)
+        with self._lock:
+            start = max(self._virtual_time, self._last_finish[name])
+            finish = start + cost / self.weights[name]
+            self._last_finish[name] = finish
+            ticket = Ticket(name, cost, start, finish, deadline, now)
+            self._queues[name].append(ticket)
+        return ticket
+
+    def try_dispatch(self, ticket: Ticket, gate: Callable[[], float],
+                     concurrency_limit: int) -> float:
+        """Start ticket if it is next in line and the gate lets it through.
+
+        Args:
+            ticket (Ticket): From ``enqueue``.
+            gate (Callable[[], float]): Reserves the underlying slot; returns
+                0.0 on success or seconds to wait (``try_acquire``).
+            concurrency_limit (int): Current limit the class caps apply to.
+
+        Returns:
+            float: 0.0 once dispatched, otherwise seconds to wait before retrying.
+
+        Raises:
+            DeadlineExceeded: If the ticket's deadline has passed.
+        """
+        with self._lock:
+            now = self._clock()
+            if ticket.deadline is not None and now >= ticket.deadline:
+                self._remove(ticket)
+                self._stats[ticket.priority]["dropped"] += 1
+                logger.warning("Dropping %s LLM request queued for %.1fs (deadline passed).",
+                               ticket.priority, now - ticket.enqueued)
+                raise DeadlineExceeded(
+                    f"{ticket.priority} request waited {now - ticket.enqueued:.1f}s "
+                    "without an LLM slot; dropped at its deadline")
+            if self._next(now, concurrency_limit) is not ticket:
+                return self.poll_interval
+            wait = gate()
+            if wait:
+                return wait
+            self._remove(ticket)
+            ticket.dispatched = True
+            self._in_flight[ticket.priority] += 1
+            self._virtual_time = max(self._virtual_time, ticket.start_tag)
+            self._stats[ticket.priority]["dispatched"] += 1
+            self._waits[ticket.priority].append(now - ticket.enqueued)
+            return 0.0
+
+    def done(self, ticket: Ticket) -> None:
+        """Free the class slot of a dispatched ticket."""
+        with self._lock:
+            if ticket.dispatched:
+                ticket.dispatched = False
+                self._in_flight[ticket.priority] = max(0, self._in_flight[ticket.priority] - 1)
+
+    def cancel(self, ticket: Ticket) -> None:
+        """Forget a ticket whose caller gave up before it was dispatched."""
+        with self._lock:
+            if not ticket.dispatched and self._remove(ticket):
+                self._stats[ticket.priority]["cancelled"] += 1
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per class: queued, in flight, dispatched / dropped / cancelled and queue wait."""
+        with self._lock:
+            return {name: {**self._stats[name],
+                           "queued": len(self._queues[name]),
+                           "in_flight": self._in_flight[name],
+                           "queue_wait": latency_percentiles(self._waits[name], (50, 99))}
+                    for name in PRIORITIES}
+
+    def _next(self, now: float, concurrency_limit: int) -> Optional[Ticket]:
+        """Eligible ticket with the smallest finish tag."""
+        best: Optional[Ticket] = None
+        for name, queue in self._queues.items():
+            if self._in_flight[name] >= max(1, int(self.caps[name] * concurrency_limit)):
+                continue
+            # Expired tickets are skipped; their owners remove them on their next poll
+            head = next((t for t in queue if t.deadline is None or now < t.deadline), None)
+            if head is not None and (best is None or head.finish_tag < best.finish_tag):
+                best = head
+        return best
+
+    def _remove(self, ticket: Ticket) -> bool:
+        try:
+            self._queues[ticket.priority].remove(ticket)
+            return True
+        except ValueError:
+            return False
+
+
+def _parse_classes(value: str) -> Dict[str, float]:
+    """``"interactive=16,bulk=1"`` -> {"interactive": 16.0, "bulk": 1.0}."""
+    parsed = {}
+    for part in filter(None, (p.strip() for p in value.split(","))):
+        name, _, number = part.partition("=")
+        if name.strip() not in PRIORITIES:
+            raise ValueError(f"Unknown priority {name.strip()!r} in {value!r}")
+        parsed[name.strip()] = float(number)
+    return parsed
+
+
+_scheduler: Optional[PriorityScheduler] = None
+_scheduler_loaded = False
+
+
+def get_scheduler() -> Optional[PriorityScheduler]:
+    """Return the process-wide scheduler, or None when disabled.
+
+    Configured by ``LLM_SCHEDULER`` (set to 0 to disable),
+    ``LLM_SCHEDULER_WEIGHTS`` and ``LLM_SCHEDULER_CAPS`` (e.g.
+    ``"interactive=16,normal=4,bulk=1"``) and ``LLM_SCHEDULER_BULK_MAX_WAIT``
+    (seconds; 0 disables dropping).
+    """
+    global _scheduler, _scheduler_loaded  # pylint: disable=global-statement
+    if not _scheduler_loaded:
+        llm_registry.load_env()
+        if os.getenv("LLM_SCHEDULER", "1").lower() not in ("0", "false", "no"):
+            bulk_max_wait = float(os.getenv("LLM_SCHEDULER_BULK_MAX_WAIT",
+                                            str(DEFAULT_MAX_WAIT["bulk"])))
+            _scheduler = PriorityScheduler(
+                weights=_parse_classes(os.getenv("LLM_SCHEDULER_WEIGHTS", "")),
+                caps=_parse_classes(os.getenv("LLM_SCHEDULER_CAPS", "")),
+                max_wait={"bulk": bulk_max_wait or None},
+            )
+        _scheduler_loaded = True
+    return _scheduler
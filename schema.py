@@ -1,8 +1,8 @@
 """Profile classification schema used for structured metadata extraction."""
 
-from typing import Optional, List , Literal
+from typing import Optional, List , Literal, Dict, Any
 from enum import Enum
-from pydantic import BaseModel, Field, model_validator
+from pydantic import BaseModel, Field, create_model, model_validator
 
 class ResumeValidationResult(BaseModel):
     """ Resume Routerclear """
@@ -10,6 +10,13 @@ class ResumeValidationResult(BaseModel):
     reason: str
     confidence: Optional[Literal["high", "medium", "low"]] = None
 
+class RouteDecision(BaseModel):
+    """ Outcome of the cascaded resume router """
+    is_resume: bool
+    tier: Literal["heuristic", "model", "llm"]
+    probability: Optional[float] = None
+    reason: str = ""
+
 class RoleType(str, Enum):
     """Enumeration representing the classification of a profile."""
     TECH = "TECH"
@@ -17,6 +24,14 @@ class RoleType(str, Enum):
     UNKNOWN = "UNKNOWN"
 
 
+class ExtractedFields(BaseModel):
+    """ Profile fields extracted deterministically, without an LLM """
+    email: Optional[str] = None
+    phone: Optional[str] = None
+    technical_skills: List[str] = Field(default_factory=list)
+    years_of_experience: Optional[float] = None
+
+
 class ContactInfo(BaseModel):
     """
     Contact information extracted from the source profile.
@@ -122,6 +137,73 @@ class Profile(BaseModel):
         return self
 
 
+# Profile fields the LLM produces; contact info, skills and experience come
+# from ``field_extractor``. Built from Profile's own field definitions so the
+# structured-output schema cannot drift from it.
+LLM_PROFILE_FIELDS = ("role_type", "confidence_score", "summary")
+
+RoleAssessment = create_model(
+    "RoleAssessment",
+    __doc__="The part of a Profile the LLM still has to produce.",
+    **{name: (Profile.model_fields[name].annotation, Profile.model_fields[name])
+       for name in LLM_PROFILE_FIELDS},
+)
+
+
+class ResumeRoleAssessment(RoleAssessment):
+    """ A RoleAssessment tagged with the resume it belongs to (batched prompts) """
+    resume_id: str = Field(..., description="The id of the resume this assessment is for.")
+
+
+class BatchRoleAssessment(BaseModel):
+    """ One assessment per resume packed into a batched classifier prompt """
+    assessments: List[ResumeRoleAssessment] = Field(
+        default_factory=list,
+        description="Exactly one assessment per resume, tagged with its id."
+    )
+
+
+class GroundingResult(BaseModel):
+    """ Outcome of the deterministic claim-level grounding check """
+    score: float
+    claims: int
+    ungrounded_fields: List[str] = Field(default_factory=list)
+
+
+class ExtractedDocument(BaseModel):
+    """ Plain text extracted from one input file (see ``doc_extract``) """
+    path: str
+    format: str
+    text: str = ""
+    error: Optional[str] = None
+    elapsed_ms: float = 0.0
+
+
+class CandidateMatch(BaseModel):
+    """One ranked hit from a corpus-wide candidate search."""
+    resume_id: str
+    score: float
+    matched_skills: List[str] = Field(default_factory=list)
+    profile: Profile
+
+
+def profile_from_dict(data: Dict[str, Any]) -> Profile:
+    """Rebuild a Profile from ``Profile.model_dump(mode="json")`` output.
+
+    ``validate_role_fields`` may leave MISSING_FIELD strings in typed fields,
+    so a round trip through ``model_validate`` would fail; build it directly.
+
+    Args:
+        data (Dict[str, Any]): Dumped profile fields.
+
+    Returns:
+        Profile: The reconstructed profile.
+    """
+    fields = dict(data)
+    fields["role_type"] = RoleType(fields["role_type"])
+    fields["contact_info"] = ContactInfo(**fields["contact_info"])
+    return Profile.model_construct(**fields)
+
 '''
     # ---------- CONDITIONAL VALIDATION ----------
     @model_validator(mode="after")
@@ -0,0 +1,182 @@
+""" Semantic Answer Cache for Resume Queries """
+import os
+import re
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, List, Optional
+import numpy as np
+import llm_registry
+from field_extractor import get_skill_matcher
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THRESHOLD = 0.92
+DEFAULT_MAX_ENTRIES = 10_000
+
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+
+
+class _Entry:
+    __slots__ = ("resume_id", "version", "query", "terms", "response", "vector")
+
+    def __init__(self, resume_id: str, version: Optional[str], query: str,
+                 response: str, vector: np.ndarray):
+        self.resume_id = resume_id
+        self.version = version
+        self.query = query
+        self.terms = query_terms(query)
+        self.response = response
+        self.vector = vector
+
+
+class SemanticAnswerCache:
+    """
+    Answers to earlier questions about a resume, matched by query embedding.
+
+    Entries are grouped by resume ID and tagged with the resume's content
+    version; a lookup only compares the query vector (cosine similarity,
+    in-process numpy, no external service) against that resume's entries,
+    and a changed version drops them. Eviction is LRU across all resumes,
+    capped at ``max_entries``.
+
+    Similarity alone cannot tell near misses apart: "Does the candidate know
+    Python?" and "... know Java?" share every word but one. When the new
+    question is passed to ``lookup``, only entries naming the same skills
+    and numbers (``query_terms``) can match.
+    """
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._by_resume: Dict[str, List[int]] = {}
+        self._next_id = 0
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "invalidations": 0}
+
+    def lookup(self, resume_id: str, query_embedding: List[float],
+               version: Optional[str] = None,
+               query: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Return the closest stored answer above the threshold, or None.
+
+        Args:
+            resume_id (str): Resume the question is about.
+            query_embedding (List[float]): Embedding of the new question.
+            version (Optional[str]): Current content version of the resume;
+                entries stored under another version are dropped.
+            query (Optional[str]): The new question; entries whose
+                ``query_terms`` differ are skipped.
+
+        Returns:
+            Optional[Dict[str, Any]]: ``response``, ``query`` (the cached
+            question) and ``similarity``.
+        """
+        vector = _unit(query_embedding)
+        terms = query_terms(query) if query is not None else None
+        with self._lock:
+            self._drop_stale(resume_id, version)
+            ids = self._by_resume.get(resume_id, [])
+            if terms is not None:
+                ids = [entry_id for entry_id in ids if self._entries[entry_id].terms == terms]
+            if not ids:
+                self._stats["misses"] += 1
+                return None
+            matrix = np.stack([self._entries[entry_id].vector for entry_id in ids])
+            scores = matrix @ vector
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self._stats["misses"] += 1
+                return None
+            entry_id = ids[best]
+            self._entries.move_to_end(entry_id)
+            self._stats["hits"] += 1
+            entry = self._entries[entry_id]
+            return {"response": entry.response, "query": entry.query,
+                    "similarity": round(float(scores[best]), 4)}
+
+    def store(self, resume_id: str, query: str, response: str,
+              query_embedding: List[float], version: Optional[str] = None) -> None:
+        """Remember the answer to query for resume_id (at the given version)."""
+        vector = _unit(query_embedding)
+        with self._lock:
+            self._drop_stale(resume_id, version)
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = _Entry(resume_id, version, query, response, vector)
+            self._by_resume.setdefault(resume_id, []).append(entry_id)
+            self._stats["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                evicted_id, evicted = self._entries.popitem(last=False)
+                self._forget(evicted.resume_id, evicted_id)
+                self._stats["evictions"] += 1
+
+    def invalidate(self, resume_id: str) -> int:
+        """Drop every answer for resume_id; returns how many were dropped."""
+        with self._lock:
+            return self._invalidate(resume_id)
+
+    def clear(self) -> None:
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+            self._by_resume.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/store/eviction/invalidation counters and current size."""
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries),
+                    "resumes": len(self._by_resume)}
+
+    def _drop_stale(self, resume_id: str, version: Optional[str]) -> None:
+        ids = self._by_resume.get(resume_id)
+        if ids and version is not None and self._entries[ids[0]].version != version:
+            logger.debug("Resume %s changed; dropping its cached answers.", resume_id)
+            self._invalidate(resume_id)
+
+    def _invalidate(self, resume_id: str) -> int:
+        ids = self._by_resume.pop(resume_id, [])
+        for entry_id in ids:
+            del self._entries[entry_id]
+        if ids:
+            self._stats["invalidations"] += 1
+        return len(ids)
+
+    def _forget(self, resume_id: str, entry_id: int) -> None:
+        ids = self._by_resume[resume_id]
+        ids.remove(entry_id)
+        if not ids:
+            del self._by_resume[resume_id]
+
+
+def query_terms(query: str) -> FrozenSet[str]:
+    """Skills (gazetteer names) and numbers mentioned in a question."""
+    return frozenset(get_skill_matcher().find(query)) | frozenset(_NUMBER_RE.findall(query))
+
+
+def _unit(embedding: List[float]) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32)
+    return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+
+_semantic_cache: Optional[SemanticAnswerCache] = None
+_semantic_cache_loaded = False
+
+
+def get_semantic_cache() -> Optional[SemanticAnswerCache]:
+    """Return the process-wide answer cache, or None when disabled.
+
+    Configured by ``SEMANTIC_CACHE`` (set to 0 to disable),
+    ``SEMANTIC_CACHE_THRESHOLD`` and ``SEMANTIC_CACHE_MAX_ENTRIES``.
+    """
+    global _semantic_cache, _semantic_cache_loaded  # pylint: disable=global-statement
+    if not _semantic_cache_loaded:
+        llm_registry.load_env()
+        if os.getenv("SEMANTIC_CACHE", "1").lower() not in ("0", "false", "no"):
+            _semantic_cache = SemanticAnswerCache(
+                threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", str(DEFAULT_THRESHOLD))),
+                max_entries=int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES",
+                                          str(DEFAULT_MAX_ENTRIES))),
+            )
+        _semantic_cache_loaded = True
+    return _semantic_cache
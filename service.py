@@ -0,0 +1,464 @@
+""" Resume Analysis HTTP Service
+
+Usage:
+    python service.py --port 8080
+    python service.py --fake --llm-latency 0.05      # offline, for load tests
+
+Endpoints (JSON in, JSON out; an ``X-Priority`` header of "interactive",
+"normal" or "bulk" overrides the endpoint's LLM scheduling class):
+    POST /analyze  {"text", "resume_id"?, "index_candidate"?}     normal
+    POST /query    {"query", "text"? | "resume_id"?, "mode"?}     interactive
+    POST /search   {"query"?, "skills"?, "min_years"?, ..., "top_k"?}
+    POST /agent    {"text"? | "resume_id"?, "query"?}             interactive
+    GET  /health
+    GET  /metrics
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import contextlib
+import threading
+from collections import deque
+from enum import Enum
+from typing import (
+    Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+)
+from aiohttp import web
+from pydantic import BaseModel
+import classifier
+import llm_registry
+from agent import agent_coalescing_stats, run_resume_agent
+from candidate_search import search_candidates
+from micro_batch import DEFAULT_MAX_BATCH, DEFAULT_WINDOW
+from near_dup import get_near_dup_index
+from rate_limiter import get_rate_limiter
+from resume_skill import (
+    QUERY_MODES, aanalyze_resume, analysis_coalescing_stats, audit_stats,
+    query_resume_with_metadata, router_stats
+)
+from resume_store import UnknownResumeError
+from schema import RoleType
+from scheduler import DEFAULT_CAPS, PRIORITIES, DeadlineExceeded, current_priority, priority
+from semantic_cache import get_semantic_cache
+from structured_output import structured_output_stats
+from tracing import latency_percentiles
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENT = 32
+DEFAULT_MAX_QUEUE = 128
+DEFAULT_QUEUE_TIMEOUT = 10.0
+# Latency samples kept per endpoint for the /metrics percentiles
+_LATENCY_WINDOW = 2048
+
+_NUMBER = (int, float)
+# /search filter -> accepted JSON type
+SEARCH_FILTERS: Dict[str, Any] = {
+    "skills": list, "min_years": _NUMBER, "max_years": _NUMBER, "min_confidence": _NUMBER,
+    "max_confidence": _NUMBER, "role_type": str, "require_all_skills": bool,
+}
+
+
+class Overloaded(Exception):
+    """Request turned away by admission control (HTTP 429 or 503)."""
+    def __init__(self, status: int, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Bounded admission for the LLM-backed endpoints.
+
+    At most ``max_concurrent`` requests run at once and at most
+    ``max_queue`` wait behind them. A request arriving to a full queue is
+    refused straight away (429); one that waits longer than
+    ``queue_timeout`` seconds gives up (503). Either way the caller gets a
+    fast answer with ``Retry-After`` instead of an ever-growing queue.
+
+    Each priority class may hold at most its ``caps`` share of the slots
+    (``scheduler.DEFAULT_CAPS``: bulk 75%), so a flood of bulk requests
+    leaves room for interactive ones.
+    """
+    def __init__(self,
+                 max_concurrent: int = DEFAULT_MAX_CONCURRENT,
+                 max_queue: int = DEFAULT_MAX_QUEUE,
+                 queue_timeout: float = DEFAULT_QUEUE_TIMEOUT,
+                 caps: Optional[Dict[str, float]] = None):
+        if max_concurrent < 1:
+            raise ValueError("max_concurrent must be at least 1.")
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._class_slots = {
+            name: asyncio.Semaphore(max(1, int(share * max_concurrent)))
+            for name, share in {**DEFAULT_CAPS, **(caps or {})}.items() if share < 1.0}
+        self._active = 0
+        self._waiting = 0
+        self._stats = {"admitted": 0, "rejected_queue_full": 0, "rejected_timeout": 0}
+
+    @contextlib.asynccontextmanager
+    async def admit(self) -> AsyncIterator[None]:
+        """Hold a slot (of the current priority class) for the duration of the block.
+
+        Raises:
+            Overloaded: 429 when the queue is full, 503 on queue timeout.
+        """
+        name = current_priority()
+        gates = ([self._class_slots[name]] if name in self._class_slots else []) + [self._slots]
+        if any(gate.locked() for gate in gates):
+            if self._waiting >= self.max_queue:
+                self._stats["rejected_queue_full"] += 1
+                raise Overloaded(429, "request queue is full", retry_after=1.0)
+            self._waiting += 1
+            try:
+                await asyncio.wait_for(_acquire_all(gates), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self._stats["rejected_timeout"] += 1
+                raise Overloaded(503, f"no capacity within {self.queue_timeout}s",
+                                 retry_after=self.queue_timeout) from None
+            finally:
+                self._waiting -= 1
+        else:
+            await _acquire_all(gates)
+        self._active += 1
+        self._stats["admitted"] += 1
+        try:
+            yield
+        finally:
+            self._active -= 1
+            for gate in gates:
+                gate.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Admission counters plus the current active / waiting counts."""
+        return {**self._stats, "active": self._active, "waiting": self._waiting,
+                "max_concurrent": self.max_concurrent, "max_queue": self.max_queue}
+
+
+async def _acquire_all(gates: List[asyncio.Semaphore]) -> None:
+    """Acquire every semaphore in order, or none of them if interrupted."""
+    acquired: List[asyncio.Semaphore] = []
+    try:
+        for gate in gates:
+            await gate.acquire()
+            acquired.append(gate)
+    except BaseException:
+        for gate in acquired:
+            gate.release()
+        raise
+
+
+class EndpointMetrics:
+    """Request counts, status codes and recent latencies per endpoint."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests: Dict[str, int] = {}
+        self._statuses: Dict[str, Dict[str, int]] = {}
+        self._latencies: Dict[str, Deque[float]] = {}
+
+    def record(self, endpoint: str, status: int, elapsed: float) -> None:
+        """Count one response and keep its latency (seconds)."""
+        with self._lock:
+            self._requests[endpoint] = self._requests.get(endpoint, 0) + 1
+            statuses = self._statuses.setdefault(endpoint, {})
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+            self._latencies.setdefault(endpoint, deque(maxlen=_LATENCY_WINDOW)).append(elapsed)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Requests, status counts and p50/p95/p99 latency (ms) per endpoint."""
+        with self._lock:
+            return {endpoint: {"requests": count,
+                               "status": dict(self._statuses[endpoint]),
+                               "latency": latency_percentiles(self._latencies[endpoint])}
+                    for endpoint, count in self._requests.items()}
+
+
+# Typed application state
+ADMISSION = web.AppKey("admission", AdmissionController)
+METRICS = web.AppKey("metrics", EndpointMetrics)
+STARTED = web.AppKey("started", float)
+
+
+def _json_default(value: Any) -> Any:
+    """JSON form of pydantic models and enums; ``str`` for anything else."""
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, Enum):
+        return value.value
+    return str(value)
+
+
+def _json_response(data: Any, status: int = 200, **kwargs: Any) -> web.Response:
+    """``web.json_response`` that also serializes models and enums."""
+    return web.json_response(data, status=status,
+                             dumps=lambda obj: json.dumps(obj, default=_json_default), **kwargs)
+
+
+class BadRequest(ValueError):
+    """Malformed request body or header (HTTP 400)."""
+
+
+async def _body(request: web.Request) -> Dict[str, Any]:
+    try:
+        body = await request.json()
+    except json.JSONDecodeError as e:
+        raise BadRequest(f"invalid JSON: {e}") from None
+    if not isinstance(body, dict):
+        raise BadRequest("request body must be a JSON object")
+    return body
+
+
+def _field(body: Dict[str, Any], name: str, kind: Any = str, required: bool = False) -> Any:
+    """body[name], checked to be a kind; None when absent (or a blank string).
+
+    Raises:
+        BadRequest: If the value has another type, or is missing but required.
+    """
+    value = body.get(name)
+    if isinstance(value, str) and not value.strip():
+        value = None
+    if value is None:
+        if required:
+            raise BadRequest(f"{name!r} is required")
+        return None
+    # bool is an int subclass; true / false are not numbers here
+    if not isinstance(value, kind) or (isinstance(value, bool) and kind is not bool):
+        raise BadRequest(f"{name!r} has the wrong type ({type(value).__name__})")
+    return value
+
+
+def _priority(request: web.Request, default: str) -> str:
+    """Scheduling class for the request's LLM calls (``X-Priority`` or default)."""
+    name = request.headers.get("X-Priority", default).strip().lower()
+    if name not in PRIORITIES:
+        raise BadRequest(f"X-Priority must be one of {PRIORITIES}, got {name!r}")
+    return name
+
+
+Handler = Callable[[web.Request], Awaitable[web.Response]]
+
+
+@web.middleware
+async def _metrics_middleware(request: web.Request, handler: Handler) -> web.StreamResponse:
+    """Record every request and map errors to JSON responses."""
+    start = time.perf_counter()
+    resource = request.match_info.route.resource
+    endpoint = resource.canonical if resource is not None else "unmatched"
+    headers: Dict[str, str] = {}
+    try:
+        response = await handler(request)
+    except Overloaded as e:
+        headers["Retry-After"] = str(max(1, round(e.retry_after)))
+        response = _json_response({"error": str(e)}, status=e.status, headers=headers)
+    except DeadlineExceeded as e:
+        # Queued LLM work dropped by the scheduler
+        headers["Retry-After"] = "5"
+        response = _json_response({"error": str(e)}, status=503, headers=headers)
+    except web.HTTPException as e:
+        response = _json_response({"error": e.reason}, status=e.status)
+    except BadRequest as e:
+        response = _json_response({"error": str(e)}, status=400)
+    except UnknownResumeError as e:
+        response = _json_response({"error": str(e.args[0]) if e.args else "not found"},
+                                  status=404)
+    except Exception as e:  # pylint: disable=broad-except
+        logger.exception("Unhandled error on %s", endpoint)
+        response = _json_response({"error": f"{type(e).__name__}: {e}"}, status=500)
+    request.app[METRICS].record(endpoint, response.status, time.perf_counter() - start)
+    return response
+
+
+async def analyze(request: web.Request) -> web.Response:
+    """Full analysis pipeline (``aanalyze_resume``)."""
+    body = await _body(request)
+    text = _field(body, "text", required=True)
+    resume_id = _field(body, "resume_id")
+    index_candidate = _field(body, "index_candidate", bool)
+    with priority(_priority(request, "normal")):
+        async with request.app[ADMISSION].admit():
+            result = await aanalyze_resume(
+                text, resume_id=resume_id,
+                index_candidate=index_candidate is not False)
+    return _json_response(result)
+
+
+async def query(request: web.Request) -> web.Response:
+    """Question about one resume (``query_resume_with_metadata``)."""
+    body = await _body(request)
+    text, resume_id = _resume_fields(body)
+    question = _field(body, "query", required=True)
+    mode = _field(body, "mode")
+    if mode is not None and mode.lower() not in QUERY_MODES:
+        raise BadRequest(f"'mode' must be one of {QUERY_MODES}, got {mode!r}")
+    # to_thread copies the context, priority included
+    with priority(_priority(request, "interactive")):
+        async with request.app[ADMISSION].admit():
+            result = await asyncio.to_thread(
+                query_resume_with_metadata, text, question, resume_id, mode)
+    return _json_response(result)
+
+
+async def search(request: web.Request) -> web.Response:
+    """Corpus-wide candidate search (``search_candidates``)."""
+    body = await _body(request)
+    question = _field(body, "query")
+    top_k = _field(body, "top_k", int)
+    if top_k is not None and top_k < 1:
+        raise BadRequest("'top_k' must be at least 1")
+    filters = {name: value for name, kind in SEARCH_FILTERS.items()
+               if (value := _field(body, name, kind)) is not None}
+    if not all(isinstance(skill, str) for skill in filters.get("skills", [])):
+        raise BadRequest("'skills' must be a list of strings")
+    if "role_type" in filters:
+        try:
+            filters["role_type"] = RoleType(filters["role_type"])
+        except ValueError:
+            raise BadRequest(f"'role_type' must be one of "
+                             f"{[role.value for role in RoleType]}") from None
+    async with request.app[ADMISSION].admit():
+        matches = await asyncio.to_thread(
+            search_candidates, question, top_k or 10, **filters)
+    return _json_response({"matches": matches})
+
+
+async def agent(request: web.Request) -> web.Response:
+    """Resume agent run (``run_resume_agent``)."""
+    body = await _body(request)
+    text, resume_id = _resume_fields(body)
+    question = _field(body, "query")
+    with priority(_priority(request, "interactive")):
+        async with request.app[ADMISSION].admit():
+            response = await run_resume_agent(resume_text=text, query=question,
+                                              resume_id=resume_id)
+    return _json_response({"response": str(response)})
+
+
+def _resume_fields(body: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+    """``(text, resume_id)`` of a request that needs at least one of them."""
+    text, resume_id = _field(body, "text"), _field(body, "resume_id")
+    if text is None and resume_id is None:
+        raise BadRequest("'text' or 'resume_id' is required")
+    return text, resume_id
+
+
+async def health(request: web.Request) -> web.Response:
+    """Liveness plus current load."""
+    admission = request.app[ADMISSION].stats()
+    return _json_response({
+        "status": "ok",
+        "uptime_s": round(time.monotonic() - request.app[STARTED], 1),
+        "active": admission["active"],
+        "waiting": admission["waiting"],
+    })
+
+
+async def metrics(request: web.Request) -> web.Response:
+    """Per-endpoint request metrics and pipeline counters."""
+    semantic_cache = get_semantic_cache()
+    near_dup_index = get_near_dup_index()
+    return _json_response({
+        "endpoints": request.app[METRICS].snapshot(),
+        "admission": request.app[ADMISSION].stats(),
+        "classifier_micro_batch": classifier.micro_batch_stats(),
+        "rate_limiter": get_rate_limiter().stats(),
+        "router": router_stats(),
+        "audit": audit_stats(),
+        "analysis_coalescing": analysis_coalescing_stats(),
+        "agent_coalescing": agent_coalescing_stats(),
+        "semantic_cache": semantic_cache.stats() if semantic_cache is not None else None,
+        "near_dup": near_dup_index.stats() if near_dup_index is not None else None,
+        "structured_output": structured_output_stats(),
+    })
+
+
+def create_app(max_concurrent: Optional[int] = None,
+               max_queue: Optional[int] = None,
+               queue_timeout: Optional[float] = None,
+               micro_batch_window: Optional[float] = None,
+               micro_batch_size: Optional[int] = None) -> web.Application:
+    """
+    Build the aiohttp application.
+
+    Arguments left as None come from ``SERVICE_MAX_CONCURRENT``,
+    ``SERVICE_MAX_QUEUE``, ``SERVICE_QUEUE_TIMEOUT`` (seconds),
+    ``MICRO_BATCH_WINDOW_MS`` and ``MICRO_BATCH_SIZE`` (0 disables
+    classifier micro-batching).
+
+    Returns:
+        web.Application: App whose startup enables classifier micro-batching
+        and whose cleanup disables it again.
+    """
+    llm_registry.load_env()
+    if micro_batch_window is None:
+        micro_batch_window = float(os.getenv("MICRO_BATCH_WINDOW_MS",
+                                             str(DEFAULT_WINDOW * 1000))) / 1000
+    if micro_batch_size is None:
+        micro_batch_size = int(os.getenv("MICRO_BATCH_SIZE", str(DEFAULT_MAX_BATCH)))
+
+    app = web.Application(middlewares=[_metrics_middleware])
+    app[ADMISSION] = AdmissionController(
+        max_concurrent=max_concurrent or int(os.getenv("SERVICE_MAX_CONCURRENT",
+                                                       str(DEFAULT_MAX_CONCURRENT))),
+        max_queue=max_queue if max_queue is not None else int(
+            os.getenv("SERVICE_MAX_QUEUE", str(DEFAULT_MAX_QUEUE))),
+        queue_timeout=queue_timeout or float(os.getenv("SERVICE_QUEUE_TIMEOUT",
+                                                       str(DEFAULT_QUEUE_TIMEOUT))),
+    )
+    app[METRICS] = EndpointMetrics()
+    app[STARTED] = time.monotonic()
+
+    async def start_micro_batching(_app: web.Application) -> None:
+        if micro_batch_size > 1:
+            classifier.enable_micro_batching(window=micro_batch_window,
+                                             max_batch=micro_batch_size)
+
+    async def stop_micro_batching(_app: web.Application) -> None:
+        classifier.disable_micro_batching()
+
+    app.on_startup.append(start_micro_batching)
+    app.on_cleanup.append(stop_micro_batching)
+    app.add_routes([
+        web.post("/analyze", analyze),
+        web.post("/query", query),
+        web.post("/search", search),
+        web.post("/agent", agent),
+        web.get("/health", health),
+        web.get("/metrics", metrics),
+    ])
+    return app
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse the server's command-line options."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0].strip())
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--fake", action="store_true",
+                        help="serve with the offline fake LLM / embedding backends")
+    parser.add_argument("--llm-latency", type=float, default=0.0,
+                        help="simulated seconds per fake LLM call (with --fake)")
+    parser.add_argument("--log-level", default="INFO")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Serve the app until interrupted; returns the process exit code."""
+    args = parse_args(argv)
+    logging.basicConfig(format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    logging.getLogger().setLevel(args.log_level.upper())
+    if args.fake:
+        from fakes import use_fake_backends  # pylint: disable=import-outside-toplevel
+        use_fake_backends(llm_latency=args.llm_latency)
+    web.run_app(create_app(), host=args.host, port=args.port)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+""" Multi-Turn Resume Agent Sessions """
+import os
+import time
+import uuid
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+import llm_registry
+from llama_index.core.tools import FunctionTool
+from llama_index.core.workflow import Context
+from agent import build_agent_prompt, build_resume_agent, query_stored_resume, store_agent_resume
+from resume_skill import analyze_resume
+from resume_store import get_resume_store
+
+logger = logging.getLogger(__name__)
+
+
+class ResumeSession:
+    """
+    One candidate conversation: an agent, its Context (chat memory) and the
+    ``analyze_resume`` output, which follow-up turns reuse instead of
+    re-running router → classifier → evaluator.
+    """
+    def __init__(self, session_id: str, resume_id: str):
+        self.session_id = session_id
+        self.resume_id = resume_id
+        self.analysis: Optional[Dict[str, Any]] = None
+        self.turns = 0
+        self.last_used = time.monotonic()
+        self.lock = asyncio.Lock()
+        self.agent = build_resume_agent(tools=[
+            FunctionTool.from_defaults(
+                name="analyze_resume",
+                description=(
+                    "Use this tool when the user wants a resume analyzed. Pass the resume_id "
+                    "from the user message. Returns the structured profile and its "
+                    "faithfulness evaluation (cached for this conversation)."
+                ),
+                fn=self._analyze,
+            ),
+            FunctionTool.from_defaults(
+                name="query_resume_data",
+                description=(
+                    "Use this tool when the user asks a question about a resume. Pass the "
+                    "resume_id from the user message and the question."
+                ),
+                fn=query_stored_resume,
+            ),
+        ])
+        self.context = Context(self.agent)
+
+    async def ask(self, query: Optional[str] = None) -> str:
+        """Run one conversational turn, keeping memory from earlier turns."""
+        async with self.lock:
+            self.last_used = time.monotonic()
+            if self.turns == 0:
+                prompt = build_agent_prompt(query=query, resume_id=self.resume_id)
+            elif query:
+                prompt = f"resume_id: {self.resume_id}\n\nQuery: {query}"
+            else:
+                raise ValueError("query is required for follow-up turns.")
+            response = await self.agent.run(user_msg=prompt, ctx=self.context)
+            self.turns += 1
+            self.last_used = time.monotonic()
+            return response
+
+    def _analyze(self, resume_id: str) -> Dict[str, Any]:
+        """Analyze the session's resume once and reuse the result afterwards."""
+        if resume_id != self.resume_id:
+            return analyze_resume(get_resume_store().get(resume_id), resume_id=resume_id)
+        if self.analysis is None:
+            self.analysis = analyze_resume(get_resume_store().get(resume_id), resume_id=resume_id)
+        return self.analysis
+
+
+class SessionManager:
+    """
+    Bounded registry of live ``ResumeSession`` objects.
+
+    Sessions idle for longer than ``idle_timeout`` seconds are dropped, and
+    the least recently used session is evicted once ``max_sessions`` is hit.
+    """
+    def __init__(self, max_sessions: int = 256, idle_timeout: float = 1800.0):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[str, ResumeSession]" = OrderedDict()
+        self._evicted = 0
+
+    def open(self, resume_text: Optional[str] = None,
+             resume_id: Optional[str] = None,
+             session_id: Optional[str] = None) -> ResumeSession:
+        """Create (or return the existing) session for a resume.
+
+        Raises:
+            ValueError: If neither resume_text nor resume_id is provided.
+            UnknownResumeError: If resume_id is unknown and no resume_text is given.
+        """
+        resume_id = store_agent_resume(resume_text, resume_id)
+        session_id = session_id or uuid.uuid4().hex
+        with self._lock:
+            self._evict_idle()
+            session = self._sessions.get(session_id)
+            if session is None or session.resume_id != resume_id:
+                session = ResumeSession(session_id, resume_id)
+                self._sessions[session_id] = session
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self._evicted += 1
+        return session
+
+    def get(self, session_id: str) -> ResumeSession:
+        """Return a live session.
+
+        Raises:
+            KeyError: If the session does not exist or has expired.
+        """
+        with self._lock:
+            self._evict_idle()
+            session = self._sessions[session_id]
+            self._sessions.move_to_end(session_id)
+            return session
+
+    async def ask(self, session_id: str, query: Optional[str] = None) -> str:
+        """Run a turn in an existing session."""
+        return await self.get(session_id).ask(query)
+
+    def close(self, session_id: str) -> None:
+        """Drop a session and its memory."""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def stats(self) -> Dict[str, int]:
+        """Live and evicted session counts."""
+        with self._lock:
+            return {"live": len(self._sessions), "evicted": self._evicted}
+
+    def _evict_idle(self) -> None:
+        cutoff = time.monotonic() - self.idle_timeout
+        for session_id in [sid for sid, s in self._sessions.items() if s.last_used < cutoff]:
+            del self._sessions[session_id]
+            self._evicted += 1
+
+
+_session_manager: Optional[SessionManager] = None
+
+
+def get_session_manager() -> SessionManager:
+    """Return the process-wide session manager, creating it on first use.
+
+    Bounded by ``AGENT_MAX_SESSIONS`` and ``AGENT_SESSION_IDLE_TIMEOUT`` (seconds).
+    """
+    global _session_manager  # pylint: disable=global-statement
+    if _session_manager is None:
+        llm_registry.load_env()
+        _session_manager = SessionManager(
+            max_sessions=int(os.getenv("AGENT_MAX_SESSIONS", "256")),
+            idle_timeout=float(os.getenv("AGENT_SESSION_IDLE_TIMEOUT", "1800")),
+        )
+    return _session_manager
@@ -0,0 +1,125 @@
+""" In-Flight Request Coalescing (single-flight) """
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """One in-flight synchronous call that followers wait on."""
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time; identical concurrent callers
+    share the leader's result (or exception) instead of repeating the work.
+
+    ``do`` coalesces threads, ``ado`` coalesces coroutines on the same event
+    loop. Nothing is cached: once the leader finishes, the next call for the
+    key starts fresh (``result_cache`` handles reuse across time).
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._tasks: Dict[Tuple[int, str], "asyncio.Task[Any]"] = {}
+        self._stats = {"leaders": 0, "coalesced": 0}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Run fn, or wait for the identical call already running.
+
+        Args:
+            key (str): Identity of the work (e.g. a content hash).
+            fn (Callable[[], Any]): The work; only the leader calls it.
+
+        Returns:
+            Tuple[Any, bool]: The result and whether it was shared from
+            another caller.
+
+        Raises:
+            Exception: Whatever fn raised, re-raised in every waiting caller.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._stats["leaders"] += 1
+            else:
+                self._stats["coalesced"] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def ado(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Async ``do``: await factory(), or the identical task already running.
+
+        The work runs as its own task, so cancelling one caller does not
+        cancel it for the others.
+
+        Returns:
+            Tuple[Any, bool]: The result and whether it was shared.
+        """
+        loop = asyncio.get_running_loop()
+        task_key = (id(loop), key)
+        with self._lock:
+            task = self._tasks.get(task_key)
+            shared = task is not None
+            if shared:
+                self._stats["coalesced"] += 1
+            else:
+                task = self._tasks[task_key] = loop.create_task(factory())
+                self._stats["leaders"] += 1
+                task.add_done_callback(lambda _: self._forget(task_key))
+        return await asyncio.shield(task), shared
+
+    def stats(self) -> Dict[str, int]:
+        """Leader and coalesced call counts, plus calls currently in flight."""
+        with self._lock:
+            return {**self._stats, "in_flight": len(self._calls) + len(self._tasks)}
+
+    def _forget(self, task_key: Tuple[int, str]) -> None:
+        with self._lock:
+            self._tasks.pop(task_key, None)
+
+
+_groups: Dict[str, SingleFlight] = {}
+_groups_lock = threading.Lock()
+
+
+def get_flight_group(name: str) -> SingleFlight:
+    """Return the process-wide SingleFlight for name, creating it on first use."""
+    with _groups_lock:
+        group = _groups.get(name)
+        if group is None:
+            group = _groups[name] = SingleFlight(name)
+        return group
+
+
+def coalescing_stats() -> Dict[str, Dict[str, int]]:
+    """Per-group leader / coalesced / in-flight counts."""
+    with _groups_lock:
+        groups = list(_groups.values())
+    return {group.name: group.stats() for group in groups}
@@ -0,0 +1,121 @@
+""" Structured Output Programs (function calling with text fallback) """
+import os
+import logging
+import threading
+from typing import Any, Dict, Optional, Type
+from pydantic import BaseModel
+from llama_index.core.llms import LLM
+from llama_index.core.program import FunctionCallingProgram, LLMTextCompletionProgram
+from llama_index.core.prompts import BasePromptTemplate
+
+logger = logging.getLogger(__name__)
+
+MODES = ("auto", "function", "text")
+# pydantic.ValidationError and json.JSONDecodeError are ValueErrors;
+# FunctionCallingProgram raises IndexError when the model made no tool call
+_PARSE_ERRORS = (ValueError, IndexError)
+
+_stats_lock = threading.Lock()
+_stats: Dict[str, Dict[str, Any]] = {}
+
+
+class StructuredProgram:
+    """
+    Pydantic program that asks the LLM for ``output_cls`` through the native
+    function-calling API when the model supports it, so the arguments are
+    produced against the JSON schema of ``output_cls`` instead of being
+    parsed out of free text.
+
+    Modes (``STRUCTURED_OUTPUT_MODE`` env var, default ``auto``):
+      - ``function``: forced tool call whose schema is ``output_cls``
+      - ``text``: ``LLMTextCompletionProgram`` (schema appended to the prompt)
+      - ``auto``: ``function`` for function-calling models, else ``text``
+
+    A response that does not validate is retried up to ``max_retries``
+    times; calls, parse failures and retries are counted per program name
+    (see ``structured_output_stats``).
+    """
+    def __init__(self,
+                 name: str,
+                 output_cls: Type[BaseModel],
+                 llm: LLM,
+                 prompt: BasePromptTemplate,
+                 function_prompt: Optional[BasePromptTemplate] = None,
+                 mode: Optional[str] = None,
+                 max_retries: int = 1):
+        mode = (mode or os.getenv("STRUCTURED_OUTPUT_MODE", "auto")).lower()
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}, got {mode!r}")
+        if mode == "auto":
+            mode = "function" if llm.metadata.is_function_calling_model else "text"
+
+        self.name = name
+        self.output_cls = output_cls
+        self.mode = mode
+        self.max_retries = max_retries
+        if mode == "function":
+            self._program = FunctionCallingProgram.from_defaults(
+                output_cls=output_cls, llm=llm, prompt=function_prompt or prompt,
+                tool_required=True,
+            )
+        else:
+            self._program = LLMTextCompletionProgram.from_defaults(
+                output_cls=output_cls, llm=llm, prompt=prompt, verbose=False,
+            )
+        with _stats_lock:
+            _stats.setdefault(name, {"mode": mode, "calls": 0, "parse_failures": 0,
+                                     "retries": 0, "failed": 0})["mode"] = mode
+
+    def __call__(self, **kwargs: Any) -> BaseModel:
+        """Run the program and return a validated ``output_cls`` instance.
+
+        Raises:
+            ValueError: If every attempt returned output that failed validation
+                (IndexError when the model never made the tool call).
+        """
+        attempt = 0
+        while True:
+            self._count("calls")
+            try:
+                return self._checked(self._program(**kwargs))
+            except _PARSE_ERRORS as e:
+                self._on_parse_failure(attempt, e)
+            attempt += 1
+
+    async def acall(self, **kwargs: Any) -> BaseModel:
+        """Async ``__call__``."""
+        attempt = 0
+        while True:
+            self._count("calls")
+            try:
+                return self._checked(await self._program.acall(**kwargs))
+            except _PARSE_ERRORS as e:
+                self._on_parse_failure(attempt, e)
+            attempt += 1
+
+    def _checked(self, output: Any) -> BaseModel:
+        # FunctionCallingProgram returns the tool's error text when the
+        # arguments do not validate against output_cls
+        if not isinstance(output, self.output_cls):
+            raise ValueError(f"{self.name}: expected {self.output_cls.__name__}, got {output!r}")
+        return output
+
+    def _on_parse_failure(self, attempt: int, error: Exception) -> None:
+        """Count a failed attempt; re-raise once retries are used up."""
+        self._count("parse_failures")
+        if attempt < self.max_retries:
+            self._count("retries")
+            logger.warning("%s: invalid structured output, retrying: %s", self.name, error)
+            return
+        self._count("failed")
+        raise error
+
+    def _count(self, key: str) -> None:
+        with _stats_lock:
+            _stats[self.name][key] += 1
+
+
+def structured_output_stats() -> Dict[str, Dict[str, Any]]:
+    """Per-program mode plus call, parse-failure, retry and give-up counts."""
+    with _stats_lock:
+        return {name: dict(values) for name, values in _stats.items()}
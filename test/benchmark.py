@@ -0,0 +1,466 @@
+""" Offline Pipeline Benchmark
+
+Runs analyze_resume, analyze_resumes, query_resume and run_resume_agent
+against deterministic fake LLM / embedding backends, so throughput and
+latency can be tracked in CI without network access. Per-resume and
+batched classification are also compared on throughput and token use, and
+interactive query latency is measured while a bulk backfill saturates a
+rate limiter, with and without the priority scheduler.
+
+    python -m test.benchmark --docs 1000 --llm-latency 0.02 --output bench.json
+    python -m test.benchmark --docs 1000 --compare bench.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+import platform
+import resource
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-offline-benchmark")
+
+# pylint: disable=wrong-import-position
+from llama_index.core import Settings
+import agent
+import batch
+import classifier
+import llm_registry
+import near_dup
+import resume_index
+import result_cache
+import resume_skill
+import semantic_cache
+from evaluator import RAGEvaluators
+from fakes import FakeAgentLLM, FakeEmbedding, FakeLLM, RateLimitedFakeLLM
+from rate_limiter import AdaptiveRateLimiter, get_rate_limiter, set_rate_limiter
+from resume_router import ResumeRouter
+from scheduler import PriorityScheduler, priority
+from structured_output import structured_output_stats
+from test import test_agent as fixtures
+
+logger = logging.getLogger(__name__)
+
+FIRST_NAMES = ["Ana", "Ben", "Chen", "Dara", "Eli", "Fatima", "Goran", "Hana", "Ivan", "Jin"]
+LAST_NAMES = ["Smith", "Garcia", "Okafor", "Nguyen", "Kowalski", "Haddad", "Ito", "Silva"]
+QUERIES = [
+    "Does the candidate know Python?",
+    "Which cloud platforms has the candidate used?",
+    "How many years of experience does the candidate have?",
+    "Has the candidate built RAG systems?",
+]
+
+
+def fixture_resumes() -> List[str]:
+    """Resume and non-resume documents from test/test_agent.py."""
+    names = [
+        "tech_resume_1", "tech_resume_2", "tech_resume_3", "assignment_resume", "pavan_resume",
+        "non_tech_resume_1", "non_tech_resume_2", "non_tech_resume_3",
+        "invalid_doc_1", "invalid_doc_2", "invalid_doc_3",
+    ]
+    return [getattr(fixtures, name) for name in names]
+
+
+def synthetic_corpus(n: int, seed: int = 7) -> Iterator[str]:
+    """Yield n unique documents derived from the fixtures (generated lazily)."""
+    rng = random.Random(seed)
+    templates = fixture_resumes()
+    for i in range(n):
+        lines = rng.choice(templates).strip("\n").splitlines()
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        out = []
+        for line in lines:
+            if "|" in line and not out:
+                line = name + " |" + line.split("|", 1)[1]
+            elif "@" in line:
+                line = line.split(":")[0] + f": {name.split()[0].lower()}.{i}@example.com"
+            elif "," in line and line.count(",") >= 3:
+                skills = [s.strip() for s in line.split(",")]
+                rng.shuffle(skills)
+                line = ", ".join(skills)
+            out.append(line)
+        out.append(f"Reference: #{i}")
+        yield "\n".join(out)
+
+
+def near_duplicate_corpus(n: int, seed: int = 11) -> Iterator[str]:
+    """Yield n documents: synthetic resumes, each followed by a lightly edited
+    copy (re-wrapped whitespace, reordered skills, a new phone number)."""
+    rng = random.Random(seed)
+    for i, doc in enumerate(synthetic_corpus((n + 1) // 2, seed=seed)):
+        yield doc
+        if 2 * i + 1 >= n:
+            return
+        lines = []
+        for line in doc.splitlines():
+            if "," in line and line.count(",") >= 3:
+                skills = [s.strip() for s in line.split(",")]
+                rng.shuffle(skills)
+                line = ",  ".join(skills)
+            elif "phone" in line.lower():
+                line = line.split(":")[0] + f": +1 555 {rng.randint(100, 999)} {rng.randint(1000, 9999)}"
+            lines.append(line + ("  " if rng.random() < 0.3 else ""))
+        yield "\n\n".join(lines)
+
+
+def percentiles(samples: List[float]) -> Dict[str, Optional[float]]:
+    """Latency summary in milliseconds."""
+    if not samples:
+        return {"count": 0, "mean_ms": None, "p50_ms": None, "p95_ms": None, "p99_ms": None}
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 3)
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+        "p50_ms": pick(0.50),
+        "p95_ms": pick(0.95),
+        "p99_ms": pick(0.99),
+    }
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes on Linux
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class StageTimer:
+    """Wraps callables and records their latencies per stage name."""
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+
+    def wrap(self, name: str, fn: Callable) -> Callable:
+        """Return fn instrumented under name (sync or async)."""
+        samples = self.samples.setdefault(name, [])
+        if asyncio.iscoroutinefunction(fn):
+            async def async_timed(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    samples.append(time.perf_counter() - start)
+            return async_timed
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                samples.append(time.perf_counter() - start)
+        return timed
+
+    def summary(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """Percentiles for every recorded stage."""
+        return {name: percentiles(values) for name, values in self.samples.items()}
+
+
+def install_fake_backends(args: argparse.Namespace, timer: StageTimer) -> Dict[str, Any]:
+    """Point every pipeline module at fake backends and stage timers."""
+    # A function-calling fake exercises the native structured-output path
+    llm_cls = FakeAgentLLM if args.function_calling else FakeLLM
+    llm = llm_cls(latency=args.llm_latency)
+    agent_llm = FakeAgentLLM(latency=args.llm_latency)
+    embed_model = FakeEmbedding(latency=args.embed_latency)
+    Settings.llm = llm
+    Settings.embed_model = embed_model
+
+    llm_registry.reset()
+    llm_registry.override("llm", llm)
+    llm_registry.override("router_llm", llm)
+    llm_registry.override("agent_llm", agent_llm)
+    llm_registry.override("embed_model", embed_model)
+
+    set_rate_limiter(AdaptiveRateLimiter(rpm=1e9, tpm=1e12, initial_concurrency=args.concurrency,
+                                         max_concurrency=max(64, args.concurrency)))
+    result_cache._result_cache = result_cache.ResultCache()  # pylint: disable=protected-access
+    resume_index._index_store = resume_index.ResumeIndexStore(  # pylint: disable=protected-access
+        backend="simple", dim=embed_model.dim)
+    semantic_cache._semantic_cache = semantic_cache.SemanticAnswerCache()  # pylint: disable=protected-access
+    semantic_cache._semantic_cache_loaded = True  # pylint: disable=protected-access
+    # The synthetic corpus is all lightly edited fixtures; near-dup reuse
+    # gets its own run so the other analyze runs measure the full pipeline
+    near_dup._near_dup_index = None  # pylint: disable=protected-access
+    near_dup._near_dup_index_loaded = True  # pylint: disable=protected-access
+
+    router = ResumeRouter()
+    router.route = timer.wrap("router", router.route)
+    router.aroute = timer.wrap("router", router.aroute)
+    evaluators = RAGEvaluators(llm=llm)
+    evaluators.audit_profile = timer.wrap("evaluator", evaluators.audit_profile)
+    evaluators.aaudit_profile = timer.wrap("evaluator", evaluators.aaudit_profile)
+    resume_skill._resume_router = router  # pylint: disable=protected-access
+    resume_skill._resume_evaluators = evaluators  # pylint: disable=protected-access
+    resume_skill.classify_resume = timer.wrap("classifier", classifier.classify_resume)
+    resume_skill.aclassify_resume = timer.wrap("classifier", classifier.aclassify_resume)
+
+    agent._resume_agent = None  # pylint: disable=protected-access
+    return {"llm": llm, "agent_llm": agent_llm, "embed_model": embed_model}
+
+
+def run_stage(name: str, docs: Iterable[Any], fn: Callable[[Any], Any],
+              timer: StageTimer) -> Dict[str, Any]:
+    """Run fn over docs sequentially and summarize throughput."""
+    result_cache.get_result_cache().clear()
+    timed = timer.wrap(name, fn)
+    start = time.perf_counter()
+    count = 0
+    for doc in docs:
+        timed(doc)
+        count += 1
+    elapsed = time.perf_counter() - start
+    return {"docs": count, "seconds": round(elapsed, 3),
+            "throughput_per_s": round(count / elapsed, 2) if elapsed else None,
+            "peak_rss_mb": peak_rss_mb()}
+
+
+async def run_async_stage(name: str, docs: Iterator[str], concurrency: int,
+                          timer: StageTimer) -> Dict[str, Any]:
+    """Run analyze_resumes over docs and summarize throughput."""
+    result_cache.get_result_cache().clear()
+    batch.aanalyze_resume = timer.wrap(name, resume_skill.aanalyze_resume)
+    start = time.perf_counter()
+    count = errors = 0
+    async for item in batch.analyze_resumes(docs, concurrency=concurrency):
+        count += 1
+        errors += item["error"] is not None
+    elapsed = time.perf_counter() - start
+    return {"docs": count, "errors": errors, "seconds": round(elapsed, 3),
+            "throughput_per_s": round(count / elapsed, 2) if elapsed else None,
+            "peak_rss_mb": peak_rss_mb()}
+
+
+async def run_agent_stage(docs: Iterator[str], timer: StageTimer) -> Dict[str, Any]:
+    """Run run_resume_agent (analyze + query) over docs sequentially."""
+    result_cache.get_result_cache().clear()
+    timed = timer.wrap("run_resume_agent", agent.run_resume_agent)
+    start = time.perf_counter()
+    count = 0
+    for i, doc in enumerate(docs):
+        await timed(resume_text=doc, query=QUERIES[i % len(QUERIES)] if i % 2 else None)
+        count += 1
+    elapsed = time.perf_counter() - start
+    return {"docs": count, "seconds": round(elapsed, 3),
+            "throughput_per_s": round(count / elapsed, 2) if elapsed else None,
+            "peak_rss_mb": peak_rss_mb()}
+
+
+async def run_classify_stage(docs: List[str], batch_size: int, llm: FakeLLM) -> Dict[str, Any]:
+    """Classify docs one request per resume (batch_size 1) or packed; report LLM usage."""
+    items = [(str(i), doc) for i, doc in enumerate(docs)]
+    before = llm.counters
+    start = time.perf_counter()
+    if batch_size == 1:
+        await asyncio.gather(*(classifier.aclassify_resume(doc, use_cache=False) for doc in docs))
+    else:
+        await classifier.aclassify_resumes(items, batch_size=batch_size, use_cache=False)
+    elapsed = time.perf_counter() - start
+    after = llm.counters
+    return {"docs": len(docs), "batch_size": batch_size, "seconds": round(elapsed, 3),
+            "throughput_per_s": round(len(docs) / elapsed, 2) if elapsed else None,
+            **{key: after[key] - before[key]
+               for key in ("calls", "prompt_tokens", "completion_tokens")}}
+
+
+async def run_priority_stage(bulk_docs: List[str], questions: List[Any], llm_latency: float,
+                             scheduler: Optional[PriorityScheduler]) -> Dict[str, Any]:
+    """Interactive query latency while bulk classification saturates the limiter.
+
+    The shared LLM is swapped for a rate-limited fake behind a limiter of 8
+    slots; bulk classifications are offered at 8x that concurrency while
+    direct-mode queries arrive every 20 ms.
+    """
+    slots = 8
+    previous_limiter, previous_llm = get_rate_limiter(), llm_registry.get_llm()
+    limiter = AdaptiveRateLimiter(rpm=1e9, tpm=1e12, initial_concurrency=slots,
+                                  max_concurrency=slots, scheduler=scheduler)
+    llm = RateLimitedFakeLLM(latency=max(llm_latency, 0.02))
+    set_rate_limiter(limiter)
+    llm_registry.override("llm", llm)
+    for program in ("classifier_program", "classifier_batch_program"):
+        llm_registry.reset(program)
+    semantic_cache.get_semantic_cache().clear()
+
+    pending = iter(bulk_docs)
+
+    async def bulk_worker() -> None:
+        with priority("bulk"):
+            for doc in pending:
+                await classifier.aclassify_resume(doc, use_cache=False)
+
+    async def interactive(item: Any) -> float:
+        start = time.perf_counter()
+        with priority("interactive"):
+            await asyncio.to_thread(resume_skill.query_resume_with_metadata,
+                                    item[0], item[1], None, "direct")
+        return time.perf_counter() - start
+
+    try:
+        start = time.perf_counter()
+        backfill = asyncio.gather(*(bulk_worker() for _ in range(8 * slots)))
+        queries = []
+        for item in questions:
+            if backfill.done():
+                break
+            queries.append(asyncio.ensure_future(interactive(item)))
+            await asyncio.sleep(0.02)
+        latencies = await asyncio.gather(*queries)
+        await backfill
+        elapsed = time.perf_counter() - start
+    finally:
+        set_rate_limiter(previous_limiter)
+        llm_registry.override("llm", previous_llm)
+        for program in ("classifier_program", "classifier_batch_program"):
+            llm_registry.reset(program)
+    return {"bulk_docs": len(bulk_docs), "seconds": round(elapsed, 3),
+            "bulk_throughput_per_s": round(len(bulk_docs) / elapsed, 2),
+            "interactive": percentiles(list(latencies)),
+            "priorities": scheduler.stats() if scheduler is not None else None}
+
+
+def run_benchmark(args: argparse.Namespace) -> Dict[str, Any]:
+    """Run every stage and return the machine-readable result document."""
+    timer = StageTimer()
+    backends = install_fake_backends(args, timer)
+    runs: Dict[str, Any] = {}
+
+    runs["analyze_resume"] = run_stage(
+        "analyze_resume", synthetic_corpus(args.docs, seed=1), resume_skill.analyze_resume, timer)
+    runs["analyze_resumes"] = asyncio.run(run_async_stage(
+        "aanalyze_resume", synthetic_corpus(args.docs, seed=2), args.concurrency, timer))
+    near_dup._near_dup_index = near_dup.NearDupIndex(  # pylint: disable=protected-access
+        max_entries=max(args.docs, 1000))
+    runs["analyze_resume_near_dup"] = run_stage(
+        "analyze_resume_near_dup", near_duplicate_corpus(args.docs),
+        resume_skill.analyze_resume, timer)
+
+    query_docs = list(synthetic_corpus(args.query_docs, seed=3))
+    for doc in query_docs:
+        resume_skill.ingest_resume(doc)
+    questions = [(doc, query) for doc in query_docs for query in QUERIES]
+    # Forced retrieval first, so auto (direct context) runs can report time saved
+    runs["query_resume_retrieval"] = run_stage(
+        "query_resume_retrieval", questions,
+        lambda item: resume_skill.query_resume(resume_text=item[0], query=item[1],
+                                               mode="retrieval"), timer)
+    runs["query_resume"] = run_stage(
+        "query_resume", questions,
+        lambda item: resume_skill.query_resume(resume_text=item[0], query=item[1]), timer)
+    # Re-asks the retrieval-mode questions (direct mode skips the answer cache)
+    runs["query_resume_cached"] = run_stage(
+        "query_resume_cached", questions,
+        lambda item: resume_skill.query_resume(resume_text=item[0], query=item[1],
+                                               mode="retrieval"), timer)
+    runs["run_resume_agent"] = asyncio.run(
+        run_agent_stage(synthetic_corpus(args.agent_docs, seed=4), timer))
+
+    classify_docs = list(synthetic_corpus(args.classify_docs, seed=5))
+    runs["classify_per_resume"] = asyncio.run(
+        run_classify_stage(classify_docs, 1, backends["llm"]))
+    runs["classify_batched"] = asyncio.run(
+        run_classify_stage(classify_docs, args.batch_size, backends["llm"]))
+
+    backfill_docs = list(synthetic_corpus(2 * args.classify_docs, seed=6))
+    runs["interactive_under_backfill"] = asyncio.run(
+        run_priority_stage(backfill_docs, questions, args.llm_latency, None))
+    runs["interactive_under_backfill_scheduled"] = asyncio.run(
+        run_priority_stage(backfill_docs, questions, args.llm_latency, PriorityScheduler()))
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "docs": args.docs,
+            "query_docs": args.query_docs,
+            "agent_docs": args.agent_docs,
+            "classify_docs": args.classify_docs,
+            "batch_size": args.batch_size,
+            "concurrency": args.concurrency,
+            "llm_latency": args.llm_latency,
+            "embed_latency": args.embed_latency,
+            "function_calling": args.function_calling,
+        },
+        "runs": runs,
+        "stages": timer.summary(),
+        "llm": backends["llm"].counters,
+        "agent_llm": backends["agent_llm"].counters,
+        "embedding": backends["embed_model"].counters,
+        "router": resume_skill.router_stats(),
+        "structured_output": structured_output_stats(),
+        "audit": resume_skill.audit_stats(),
+        "semantic_cache": semantic_cache.get_semantic_cache().stats(),
+        "near_dup": near_dup.get_near_dup_index().stats(),
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], max_regression: float) -> bool:
+    """Print throughput/latency deltas; return False on a regression."""
+    ok = True
+    for name, run in current["runs"].items():
+        base = baseline.get("runs", {}).get(name)
+        if not base or not base.get("throughput_per_s") or not run.get("throughput_per_s"):
+            continue
+        change = run["throughput_per_s"] / base["throughput_per_s"] - 1
+        flag = "REGRESSION" if change < -max_regression else "ok"
+        ok &= flag == "ok"
+        print(f"{name:20s} throughput {base['throughput_per_s']:>10} -> "
+              f"{run['throughput_per_s']:>10} ({change:+.1%}) {flag}")
+    for name, stage in current["stages"].items():
+        base = baseline.get("stages", {}).get(name)
+        if base and base.get("p95_ms") and stage.get("p95_ms"):
+            print(f"{name:20s} p95 {base['p95_ms']:>10}ms -> {stage['p95_ms']:>10}ms "
+                  f"({stage['p95_ms'] / base['p95_ms'] - 1:+.1%})")
+    return ok
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=1000,
+                        help="documents for the analyze stages (10 to 100000)")
+    parser.add_argument("--query-docs", type=int, default=50)
+    parser.add_argument("--agent-docs", type=int, default=50)
+    parser.add_argument("--classify-docs", type=int, default=200,
+                        help="documents for the per-resume vs. batched classifier stages")
+    parser.add_argument("--batch-size", type=int, default=classifier.DEFAULT_BATCH_SIZE,
+                        help="resumes per batched classifier request")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--llm-latency", type=float, default=0.0,
+                        help="simulated seconds per LLM call")
+    parser.add_argument("--embed-latency", type=float, default=0.0,
+                        help="simulated seconds per embedding call")
+    parser.add_argument("--function-calling", action="store_true",
+                        help="use a function-calling fake LLM (native structured output)")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="baseline results file to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="allowed fractional throughput drop before failing")
+    args = parser.parse_args(argv)
+    if not 10 <= args.docs <= 100_000:
+        parser.error("--docs must be between 10 and 100000")
+    return args
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    logging.getLogger().setLevel(logging.WARNING)
+    results = run_benchmark(args)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(json.dumps(results["runs"], indent=2))
+    print(f"Results written to {args.output}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            return 0 if compare(results, json.load(f), args.max_regression) else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
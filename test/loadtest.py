@@ -0,0 +1,151 @@
+""" Local Load Test for the HTTP Service
+
+Fires concurrent requests at ``service.py`` and reports throughput,
+status codes (200 / 429 / 503) and latency percentiles per endpoint.
+Without ``--url`` the service is started in-process on fake backends.
+
+    python -m test.loadtest --requests 2000 --concurrency 200 --llm-latency 0.05
+    python -m test.loadtest --url http://127.0.0.1:8080 --mix analyze=1,query=1,search=1
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+from typing import Any, Dict, List, Optional, Tuple
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-offline-loadtest")
+
+# pylint: disable=wrong-import-position
+import aiohttp
+from aiohttp import web
+from test.benchmark import QUERIES, percentiles, synthetic_corpus
+
+
+def parse_mix(spec: str) -> List[Tuple[str, float]]:
+    """``"analyze=2,query=1"`` -> [("analyze", 2.0), ("query", 1.0)]."""
+    mix = []
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        mix.append((name.strip(), float(weight or 1)))
+    return mix
+
+
+def build_request(endpoint: str, doc: str, rng: random.Random) -> Dict[str, Any]:
+    if endpoint == "analyze":
+        return {"text": doc}
+    if endpoint == "query":
+        return {"text": doc, "query": rng.choice(QUERIES)}
+    if endpoint == "search":
+        return {"query": rng.choice(["Python developers", "5+ years cloud", "RAG experience"])}
+    if endpoint == "agent":
+        return {"text": doc, "query": rng.choice(QUERIES)}
+    raise ValueError(f"unknown endpoint {endpoint!r}")
+
+
+async def run_load(url: str, requests: int, concurrency: int,
+                   mix: List[Tuple[str, float]], seed: int = 3) -> Dict[str, Any]:
+    """Send requests from concurrency workers and summarize the responses."""
+    rng = random.Random(seed)
+    docs = list(synthetic_corpus(min(requests, 500), seed=seed))
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    plan = [(endpoint, build_request(endpoint, rng.choice(docs), rng))
+            for endpoint in rng.choices(names, weights=weights, k=requests)]
+    samples: Dict[str, List[float]] = {name: [] for name in names}
+    statuses: Dict[str, Dict[str, int]] = {name: {} for name in names}
+    next_request = iter(plan)
+
+    async def worker(session: aiohttp.ClientSession) -> None:
+        for endpoint, body in next_request:
+            start = time.perf_counter()
+            try:
+                async with session.post(f"{url}/{endpoint}", json=body) as response:
+                    await response.read()
+                    status = str(response.status)
+            except aiohttp.ClientError as e:
+                status = type(e).__name__
+            samples[endpoint].append(time.perf_counter() - start)
+            statuses[endpoint][status] = statuses[endpoint].get(status, 0) + 1
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    timeout = aiohttp.ClientTimeout(total=300)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(session) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        async with session.get(f"{url}/metrics") as response:
+            server_metrics = await response.json()
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 2) if elapsed else None,
+        "endpoints": {name: {"status": statuses[name], "latency": percentiles(samples[name])}
+                      for name in names},
+        "server": {key: server_metrics.get(key)
+                   for key in ("admission", "classifier_micro_batch", "endpoints")},
+    }
+
+
+async def run_in_process(args: argparse.Namespace) -> Dict[str, Any]:
+    """Start the service on fake backends, load it, and shut it down."""
+    # pylint: disable=import-outside-toplevel
+    import near_dup
+    import service
+    from fakes import use_fake_backends
+
+    installed = use_fake_backends(llm_latency=args.llm_latency)
+    # Synthetic documents are near-copies of a few fixtures; keep every analysis on the LLM path
+    near_dup._near_dup_index = None  # pylint: disable=protected-access
+    near_dup._near_dup_index_loaded = True  # pylint: disable=protected-access
+    app = service.create_app(max_concurrent=args.max_concurrent, max_queue=args.max_queue,
+                             queue_timeout=args.queue_timeout,
+                             micro_batch_size=args.micro_batch_size)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]  # pylint: disable=protected-access
+    try:
+        report = await run_load(f"http://127.0.0.1:{port}", args.requests, args.concurrency,
+                                parse_mix(args.mix))
+    finally:
+        await runner.cleanup()
+    report["llm_calls"] = installed["llm"].counters["calls"]
+    return report
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0].strip())
+    parser.add_argument("--url", help="running service (default: start one on fake backends)")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--mix", default="analyze=1", help="endpoint weights, e.g. analyze=2,query=1")
+    parser.add_argument("--llm-latency", type=float, default=0.02)
+    parser.add_argument("--max-concurrent", type=int, default=None)
+    parser.add_argument("--max-queue", type=int, default=None)
+    parser.add_argument("--queue-timeout", type=float, default=None)
+    parser.add_argument("--micro-batch-size", type=int, default=None,
+                        help="classifier micro-batch size (0 disables)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    logging.getLogger().setLevel(logging.WARNING)
+    if args.url:
+        report = asyncio.run(run_load(args.url.rstrip("/"), args.requests, args.concurrency,
+                                      parse_mix(args.mix)))
+    else:
+        report = asyncio.run(run_in_process(args))
+    json.dump(report, sys.stdout, indent=2)
+    print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+""" Offline tests for summary embedding in the candidate search index """
+import threading
+import time
+import pytest
+from candidate_search import CandidateSearchIndex
+from fakes import FakeEmbedding
+from schema import ContactInfo, Profile, RoleType
+
+
+def profile(skills, summary):
+    """TECH profile with the given skills and summary."""
+    return Profile(role_type=RoleType.TECH, confidence_score=0.9,
+                   contact_info=ContactInfo(email="jane@example.com", phone="555-0100"),
+                   years_of_experience=5.0, technical_skills=skills, summary=summary)
+
+
+class FlakyEmbedding(FakeEmbedding):
+    """Fake embedding whose batch calls fail while ``fail`` is set."""
+    fail: bool = True
+
+    def _get_text_embeddings(self, texts):
+        if self.fail:
+            raise ConnectionError("embedding endpoint unavailable")
+        return super()._get_text_embeddings(texts)
+
+
+class BlockingEmbedding:
+    """Fake embedding whose batch calls wait until ``release`` is set."""
+    def __init__(self):
+        self.embed = FakeEmbedding()
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def get_text_embedding_batch(self, texts):
+        self.started.set()
+        assert self.release.wait(10)
+        return self.embed.get_text_embedding_batch(texts)
+
+    def get_query_embedding(self, query):
+        return self.embed.get_query_embedding(query)
+
+
+def test_failed_embedding_keeps_summaries_pending():
+    embed = FlakyEmbedding()
+    index = CandidateSearchIndex(embed_model=embed, background_embedding=False)
+    index.add("a", profile(["Python"], "Builds RAG pipelines in Python."))
+    index.add("b", profile(["Go"], "Writes payment services in Go."))
+    with pytest.raises(ConnectionError):
+        index.flush()
+    assert index.pending() == 2
+
+    embed.fail = False
+    assert index.flush() == 2
+    assert index.pending() == 0
+    assert index.search("RAG pipelines", skills=[])[0].resume_id == "a"
+
+
+def test_search_does_not_wait_for_embedding():
+    embed = BlockingEmbedding()
+    index = CandidateSearchIndex(embed_model=embed, background_embedding=False)
+    index.add("a", profile(["Python"], "Builds RAG pipelines in Python."))
+    written = []
+    flusher = threading.Thread(target=lambda: written.append(index.flush()))
+    flusher.start()
+    try:
+        assert embed.started.wait(10)
+        # The flush is mid-request: adds and searches still go through
+        index.add("b", profile(["Python", "Go"], "Writes payment services in Go."))
+        assert sorted(m.resume_id for m in index.search(skills=["python"])) == ["a", "b"]
+        index.add("a", profile(["Python"], "Now leads a data platform team."))
+    finally:
+        embed.release.set()
+        flusher.join()
+    # The stale vector for "a" is dropped; the same flush picks up the new summaries
+    assert written == [2] and index.pending() == 0
+    assert index.search("data platform team", skills=[])[0].resume_id == "a"
+
+
+def test_background_embedder_fills_vectors():
+    index = CandidateSearchIndex(embed_model=FakeEmbedding())
+    index.add("a", profile(["Python"], "Builds RAG pipelines in Python."))
+    deadline = time.monotonic() + 10
+    while index.pending() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert index.pending() == 0
+    assert index.search("RAG pipelines", skills=[])[0].resume_id == "a"
@@ -0,0 +1,52 @@
+""" Offline tests for batched classification when the scheduler drops a batch """
+import asyncio
+import pytest
+import classifier
+import llm_registry
+from scheduler import DeadlineExceeded
+
+RESUMES = [(f"cand-{i}", f"Candidate {i}\nPython developer, {i + 2} years") for i in range(3)]
+
+
+class DroppedProgram:
+    """Batch program whose request was still queued at its deadline."""
+    def __call__(self, **kwargs):
+        raise DeadlineExceeded("bulk request dropped after 300s in queue")
+
+    async def acall(self, **kwargs):
+        return self(**kwargs)
+
+
+class CountingProgram:
+    """Single-resume program that must not be reached."""
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, **kwargs):
+        self.calls += 1
+        raise AssertionError("members of a dropped batch were re-queued")
+
+    async def acall(self, **kwargs):
+        return self(**kwargs)
+
+
+@pytest.fixture
+def single():
+    program = CountingProgram()
+    llm_registry.override("classifier_batch_program", DroppedProgram())
+    llm_registry.override("classifier_program", program)
+    yield program
+    llm_registry.reset("classifier_batch_program")
+    llm_registry.reset("classifier_program")
+
+
+def test_dropped_batch_is_not_requeued(single):
+    with pytest.raises(DeadlineExceeded):
+        classifier.classify_resumes(RESUMES, use_cache=False)
+    assert single.calls == 0
+
+
+def test_dropped_async_batch_is_not_requeued(single):
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(classifier.aclassify_resumes(RESUMES, use_cache=False))
+    assert single.calls == 0
@@ -0,0 +1,67 @@
+""" Offline tests for the bulk CLI: checkpoints, malformed input, directory changes """
+import json
+import pytest
+import cli
+from cli import Checkpoint, iter_resumes, list_documents
+
+
+def test_checkpoint_keeps_runs_not_indices(tmp_path):
+    checkpoint = Checkpoint(str(tmp_path / "out.checkpoint"), {"input": "x"})
+    # Index 0 is slow: everything after it finishes first
+    for index in range(1, 1000):
+        checkpoint.mark_done(index, index, failed=False)
+    assert checkpoint.watermark == 0
+    assert checkpoint.done_above == [(1, 1000)]
+    assert checkpoint.is_done(999) and not checkpoint.is_done(0)
+
+    checkpoint.mark_done(1001, 1001, failed=False)
+    assert checkpoint.done_above == [(1, 1000), (1001, 1002)]
+    assert not checkpoint.is_done(1000)
+    checkpoint.mark_done(0, 0, failed=False)
+    checkpoint.mark_done(1000, 1000, failed=True)
+    assert (checkpoint.watermark, checkpoint.done_above) == (1002, [])
+
+    checkpoint.mark_done(1005, 1005, failed=False)
+    checkpoint.save()
+    loaded = Checkpoint.load(checkpoint.path, {"input": "x"})
+    assert (loaded.watermark, loaded.done_above, loaded.failed) == (1002, [(1005, 1006)], 1)
+
+
+def test_malformed_jsonl_lines_yield_error_records(tmp_path):
+    path = tmp_path / "resumes.jsonl"
+    path.write_text("\n".join([
+        json.dumps({"id": "a", "text": "Jane Doe, Python developer"}),
+        "{not json",
+        "",
+        json.dumps(["a", "list"]),
+        json.dumps({"id": "b", "text": "John Roe, Java developer"}),
+    ]) + "\n", encoding="utf-8")
+    records = list(iter_resumes(str(path), "jsonl"))
+    assert [(index, error is None) for index, _, _, _, error in records] == [
+        (0, True), (1, False), (2, False), (3, True)]
+    assert records[1][3].endswith(":2") and records[1][4].startswith("invalid JSON")
+    assert records[2][2] == "" and records[2][4] == "record is not a JSON object"
+    assert records[3][1] == "b"
+
+
+def test_directory_checkpoint_is_tied_to_its_contents(tmp_path, monkeypatch):
+    resumes = tmp_path / "resumes"
+    resumes.mkdir()
+    for name in ("a.txt", "b.md", "notes.bin"):
+        (resumes / name).write_text("Jane Doe, Python developer", encoding="utf-8")
+    assert sorted(list_documents(str(resumes))) == ["a.txt", "b.md"]
+
+    output = tmp_path / "out.jsonl"
+    args = cli.parse_args(["analyze", str(resumes), "-o", str(output)])
+    source = {"input": str(resumes), "format": "dir",
+              "modified": str(resumes.stat().st_mtime_ns)}
+    Checkpoint(f"{output}.checkpoint", source).save()
+    output.write_bytes(b"")
+    (resumes / "c.txt").write_text("John Roe, Java developer", encoding="utf-8")
+    monkeypatch.setattr(cli, "analyze_resumes", None)  # must not get that far
+    with pytest.raises(ValueError, match="is for"):
+        cli.asyncio.run(cli.run_analyze(args))
+
+    inside = cli.parse_args(["analyze", str(resumes), "-o", str(resumes / "out.jsonl")])
+    with pytest.raises(ValueError, match="outside the input directory"):
+        cli.asyncio.run(cli.run_analyze(inside))
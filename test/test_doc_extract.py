@@ -0,0 +1,43 @@
+""" Offline tests for pooled extraction when a worker gets stuck """
+import asyncio
+import os
+import multiprocessing
+import signal
+import time
+import pytest
+import doc_extract
+
+pytestmark = pytest.mark.skipif(
+    multiprocessing.get_start_method() != "fork",
+    reason="the stuck extractor is patched in before the workers fork")
+
+
+def stuck_or_read(path: str) -> str:
+    """Text extractor that hangs, ignoring SIGALRM, on files named stuck*."""
+    if os.path.basename(path).startswith("stuck"):
+        signal.pthread_sigmask(signal.SIG_BLOCK, [signal.SIGALRM])
+        time.sleep(60)
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def test_stuck_worker_is_replaced(tmp_path, monkeypatch):
+    monkeypatch.setitem(doc_extract._EXTRACTORS, "text", stuck_or_read)  # pylint: disable=protected-access
+    monkeypatch.setattr(doc_extract, "_TIMEOUT_GRACE", 0.2)
+    paths = []
+    for name in ("stuck.txt", "a.txt", "b.txt", "c.txt"):
+        (tmp_path / name).write_text(f"Resume {name}", encoding="utf-8")
+        paths.append(str(tmp_path / name))
+
+    async def run():
+        return [doc async for doc in doc_extract.aextract_documents(
+            paths, max_workers=1, timeout=0.3)]
+
+    start = time.perf_counter()
+    documents = {os.path.basename(doc.path): doc for doc in asyncio.run(run())}
+    # One worker: without a restart a.txt .. c.txt would queue behind the stuck file
+    assert time.perf_counter() - start < 10
+    assert documents["stuck.txt"].error.startswith("TimeoutError")
+    for name in ("a.txt", "b.txt", "c.txt"):
+        assert documents[name].error is None
+        assert documents[name].text == f"Resume {name}"
@@ -0,0 +1,50 @@
+""" Offline tests for the near-duplicate index's band table under eviction churn """
+import numpy as np
+from near_dup import NearDupIndex
+
+RESUME = """Jane Doe | Backend Engineer | +1 555 010 2030
+
+Experience
+Built payment services in Python and Go at a fintech, 2019 - present.
+Led the migration of the ledger from a monolith to event-driven services.
+
+Skills
+Python, Go, PostgreSQL, Kafka, Kubernetes
+"""
+
+
+def live_keys(index: NearDupIndex) -> dict:
+    """Band key -> newest live slot holding it, as the table should record."""
+    # pylint: disable=protected-access
+    expected = {}
+    for age in range(index.max_entries):
+        slot = (index._next_slot + age) % index.max_entries
+        if index._refs[slot] is not None:
+            for key in index._band_keys[slot]:
+                expected[int(key)] = slot
+    return expected
+
+
+def test_finds_edited_copy():
+    index = NearDupIndex(max_entries=16)
+    index.add("original", RESUME)
+    edited = RESUME.replace("+1 555 010 2030", "+1 555 999 0000").replace(
+        "Python, Go, PostgreSQL, Kafka, Kubernetes", "Kafka, Go, Python, Kubernetes, PostgreSQL")
+    match = index.query(edited)
+    assert match is not None and match[0] == "original"
+    assert index.query("Chef de cuisine, French pastry, banquets for 300 guests") is None
+
+
+def test_eviction_churn_keeps_the_table_exact():
+    # Small rows and values make bands collide, so shared keys are exercised too
+    index = NearDupIndex(num_perm=32, bands=16, max_entries=8)
+    rng = np.random.default_rng(7)
+    for n in range(2000):
+        index.add(f"ref-{n}", signature=rng.integers(0, 3, size=32, dtype=np.uint32))
+    expected = live_keys(index)
+    # pylint: disable=protected-access
+    assert np.count_nonzero(index._table_keys) == len(expected)
+    for key, slot in expected.items():
+        assert index._find(key) == slot
+    assert len(index) == 8
+    assert index.stats()["evictions"] == 2000 - 8
@@ -0,0 +1,42 @@
+""" Offline tests for direct-context queries followed up by resume ID """
+import pytest
+import llm_registry
+import resume_index
+import resume_skill
+import resume_store
+import semantic_cache
+from fakes import FakeEmbedding, FakeLLM
+
+RESUME = """Jane Doe | Backend Engineer
+
+Skills
+Python, Django, PostgreSQL, AWS
+"""
+
+
+@pytest.fixture(autouse=True)
+def pipeline(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-offline-test")
+    llm_registry.override("llm", FakeLLM())
+    llm_registry.override("embed_model", FakeEmbedding())
+    monkeypatch.setattr(resume_index, "_index_store", resume_index.ResumeIndexStore(backend="simple"))
+    monkeypatch.setattr(resume_store, "_resume_store", resume_store.ResumeStore())
+    monkeypatch.setattr(semantic_cache, "_semantic_cache", None)
+    monkeypatch.setattr(semantic_cache, "_semantic_cache_loaded", True)
+    yield
+    llm_registry.reset("llm")
+    llm_registry.reset("embed_model")
+
+
+@pytest.mark.parametrize("resume_id", [None, "cand-1"])
+@pytest.mark.parametrize("follow_up_mode", [None, "direct", "retrieval"])
+def test_follow_up_by_returned_id(resume_id, follow_up_mode):
+    first = resume_skill.query_resume_with_metadata(
+        RESUME, "Does the candidate know Python?", resume_id, mode="direct")
+    assert first["query_mode"] == "direct"
+    assert first["resume_id"] == (resume_id or first["resume_id"])
+
+    follow_up = resume_skill.query_resume_with_metadata(
+        None, "Has the candidate used AWS?", first["resume_id"], mode=follow_up_mode)
+    assert follow_up["resume_id"] == first["resume_id"]
+    assert follow_up["query_mode"] == (follow_up_mode or "direct")
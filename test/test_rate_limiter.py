@@ -0,0 +1,136 @@
+""" Offline tests for the shared adaptive rate limiter """
+import asyncio
+import pytest
+import rate_limiter
+from fakes import FakeRateLimitError, RateLimitedFakeEmbedding, RateLimitedFakeLLM
+from rate_limiter import AdaptiveRateLimiter, TokenBucket
+
+
+class FakeClock:
+    """Monotonic clock that only moves when something sleeps on it."""
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class RetryAfterError(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after: str):
+        super().__init__("Too Many Requests")
+        self.response = type("Response", (), {"headers": {"retry-after": retry_after}})()
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def install(monkeypatch, clock: FakeClock, **kwargs) -> AdaptiveRateLimiter:
+    kwargs.setdefault("rpm", 1000)
+    kwargs.setdefault("tpm", 1_000_000)
+    limiter = AdaptiveRateLimiter(clock=clock, sleep=clock.sleep, **kwargs)
+    monkeypatch.setattr(rate_limiter, "_rate_limiter", limiter)
+    return limiter
+
+
+def test_token_bucket_waits_then_refills(clock):
+    bucket = TokenBucket(2, period=60.0, clock=clock)
+    assert bucket.try_acquire() == 0.0
+    assert bucket.try_acquire() == 0.0
+    assert bucket.try_acquire() == pytest.approx(30.0)
+    clock.sleep(30.0)
+    assert bucket.try_acquire() == 0.0
+
+
+def test_request_bucket_paces_calls(monkeypatch, clock):
+    limiter = install(monkeypatch, clock, rpm=2)
+    llm = RateLimitedFakeLLM(clock=clock)
+    for _ in range(3):
+        llm.complete("ping")
+    assert clock.now == pytest.approx(30.0)
+    assert limiter.stats()["requests"] == 3
+    assert llm.counters["rate_limited"] == 0
+
+
+def test_429_halves_concurrency_and_retries(monkeypatch, clock):
+    limiter = install(monkeypatch, clock, initial_concurrency=8, base_delay=10.0,
+                      max_delay=60.0)
+    llm = RateLimitedFakeLLM(rpm_limit=5, clock=clock)
+    responses = [llm.complete("ping") for _ in range(6)]
+    stats = limiter.stats()
+    assert len(responses) == 6
+    assert llm.counters["rate_limited"] >= 1
+    assert stats["rate_limited"] == llm.counters["rate_limited"]
+    assert stats["retries"] == stats["rate_limited"]
+    assert stats["concurrency_limit"] < 8
+    # The sixth call only succeeds once the fake's 60 s window has moved on
+    assert clock.now >= 60.0
+
+
+def test_gives_up_after_max_retries(monkeypatch, clock):
+    limiter = install(monkeypatch, clock, max_retries=2, base_delay=1.0)
+    llm = RateLimitedFakeLLM(rpm_limit=1, clock=clock)
+    llm.complete("ping")
+    with pytest.raises(FakeRateLimitError):
+        llm.complete("ping")
+    assert llm.counters["rate_limited"] == 3
+    assert limiter.stats()["retries"] == 2
+
+
+def test_honours_retry_after(monkeypatch, clock):
+    limiter = install(monkeypatch, clock, base_delay=1.0)
+    attempts = []
+
+    def flaky():
+        attempts.append(clock.now)
+        if len(attempts) == 1:
+            raise RetryAfterError("7")
+        return "ok"
+
+    assert limiter.call(flaky, tokens=10) == "ok"
+    assert attempts[1] - attempts[0] >= 7.0
+    assert 7.0 in clock.sleeps
+
+
+def test_concurrency_grows_after_a_window_of_successes(monkeypatch, clock):
+    limiter = install(monkeypatch, clock, initial_concurrency=2, max_concurrency=3)
+    llm = RateLimitedFakeLLM(clock=clock)
+    for _ in range(2):
+        llm.complete("ping")
+    assert limiter.stats()["concurrency_limit"] == 3
+    for _ in range(6):
+        llm.complete("ping")
+    assert limiter.stats()["concurrency_limit"] == 3
+
+
+def test_async_calls_share_the_limiter(monkeypatch, clock):
+    limiter = install(monkeypatch, clock, initial_concurrency=2)
+    llm = RateLimitedFakeLLM(latency=0.01)
+
+    async def run():
+        return await asyncio.gather(*(llm.acomplete("ping") for _ in range(6)))
+
+    assert len(asyncio.run(run())) == 6
+    stats = limiter.stats()
+    assert stats["requests"] == 6
+    assert stats["in_flight"] == 0
+
+
+def test_embeddings_go_through_the_limiter(monkeypatch, clock):
+    limiter = install(monkeypatch, clock, rpm=2)
+    embed_model = RateLimitedFakeEmbedding()
+    asyncio.run(embed_model.aget_query_embedding("who knows java?"))
+    embed_model.get_text_embedding_batch(["python developer", "java developer"])
+    embed_model.get_query_embedding("who knows python?")
+    assert limiter.stats()["requests"] == 3
+    assert embed_model.counters["calls"] == 3
+    # rpm=2: the third request waited for the bucket
+    assert clock.now == pytest.approx(30.0)
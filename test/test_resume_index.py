@@ -0,0 +1,77 @@
+""" Offline tests for incremental upsert / delete / compaction of the resume index """
+import pytest
+import llm_registry
+from fakes import FakeEmbedding
+from resume_index import ResumeIndexStore
+
+RESUME_A = """Jane Doe | Backend Engineer
+
+Experience
+Built payment services in Python and Go at a fintech, 2019 - present.
+
+Skills
+Python, Go, PostgreSQL, Kafka
+"""
+
+RESUME_B = RESUME_A.replace("Python, Go, PostgreSQL, Kafka", "Rust, Kubernetes, Terraform")
+
+
+@pytest.fixture
+def store(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-offline-test")
+    llm_registry.override("embed_model", FakeEmbedding())
+    yield ResumeIndexStore(backend="simple")
+    llm_registry.reset("embed_model")
+
+
+def stored_texts(store: ResumeIndexStore, resume_id: str) -> str:
+    """Text of every chunk a query for resume_id can retrieve."""
+    # pylint: disable=protected-access
+    retriever = store._index.as_retriever(similarity_top_k=50)
+    nodes = retriever.retrieve("python go rust kubernetes experience skills")
+    live = store._live.get(resume_id, set())
+    return "\n".join(n.node.get_content() for n in nodes
+                     if n.node.metadata["resume_id"] == resume_id
+                     and n.node.metadata["chunk_hash"] in live)
+
+
+def test_upsert_reembeds_only_changed_chunks(store):
+    first = store.upsert("cand-1", RESUME_A)
+    second = store.upsert("cand-1", RESUME_B)
+    assert second["embedded"] == 1
+    assert second["tombstoned"] == 1
+    assert second["kept"] == first["embedded"] - 1
+
+
+def test_edit_back_to_previous_text_survives_compaction(store):
+    store.upsert("cand-1", RESUME_A)
+    store.upsert("cand-1", RESUME_B)
+    counts = store.upsert("cand-1", RESUME_A)
+
+    assert counts["embedded"] == 0  # the tombstoned chunk is revived, not re-embedded
+    assert store.stats()["pending_tombstones"] == 1  # only B's skills chunk
+    assert store.compact() == 1
+    texts = stored_texts(store, "cand-1")
+    assert "Python, Go, PostgreSQL, Kafka" in texts
+    assert "Rust" not in texts
+
+
+def test_delete_then_readd_survives_compaction(store):
+    store.upsert("cand-1", RESUME_A)
+    store.delete("cand-1")
+    assert not store.has("cand-1")
+
+    store.ingest(RESUME_A, resume_id="cand-1")
+    assert store.stats()["pending_tombstones"] == 0
+    store.compact()
+    assert store.has("cand-1")
+    assert "Python, Go, PostgreSQL, Kafka" in stored_texts(store, "cand-1")
+
+
+def test_delete_then_compact_removes_vectors(store):
+    store.upsert("cand-1", RESUME_A)
+    removed = store.delete("cand-1")
+    assert store.compact() == removed
+    assert stored_texts(store, "cand-1") == ""
+    # pylint: disable=protected-access
+    assert not store._index.docstore.docs
@@ -0,0 +1,31 @@
+""" Offline tests for the resume store's in-memory cache in front of SQLite """
+from resume_store import ResumeStore
+
+
+def resume(i: int) -> str:
+    """Distinct short resume text."""
+    return f"Candidate {i} | Backend Engineer\nPython, Go, {i + 2} years"
+
+
+def test_cache_is_bounded_with_a_database(tmp_path):
+    store = ResumeStore(path=str(tmp_path / "resumes.db"), cache_size=2)
+    ids = [store.put(resume(i), resume_id=f"cand-{i}") for i in range(5)]
+    assert len(store._entries) == 2  # pylint: disable=protected-access
+    # Evicted resumes are read back from the file, still within the bound
+    for i, resume_id in enumerate(ids):
+        assert store.get(resume_id) == resume(i)
+        assert len(store._entries) <= 2  # pylint: disable=protected-access
+
+    store.get("cand-3")
+    store.get("cand-0")  # evicts cand-4, the least recently used
+    assert list(store._entries) == ["cand-3", "cand-0"]  # pylint: disable=protected-access
+
+    store.delete("cand-0")
+    assert "cand-0" not in store
+    assert "cand-1" in store
+
+
+def test_memory_only_store_keeps_everything():
+    store = ResumeStore(cache_size=2)
+    ids = [store.put(resume(i)) for i in range(5)]
+    assert [store.get(resume_id) for resume_id in ids] == [resume(i) for i in range(5)]
@@ -0,0 +1,105 @@
+""" Offline tests for the semantic answer cache: rewordings hit, near misses do not """
+import numpy as np
+import pytest
+import llm_registry
+import resume_index
+import resume_skill
+import resume_store
+import semantic_cache
+from fakes import FakeEmbedding, FakeLLM
+from semantic_cache import SemanticAnswerCache
+
+RESUME = """Jane Doe | Backend Engineer
+
+Skills
+Python, Django, PostgreSQL, AWS
+"""
+
+# Same question, reworded: should be answered from the cache
+REWORDINGS = [
+    ("Does the candidate know Python?", "does the candidate know python"),
+    ("Does the candidate know Python?", "Does the candidate know Python well?"),
+    ("Has the candidate built RAG systems?", "Has the candidate ever built RAG systems?"),
+]
+
+# One skill or number apart: a cached answer would be wrong
+NEAR_MISSES = [
+    ("Does the candidate know Python?", "Does the candidate know Java?"),
+    ("Does the candidate have production experience with Python and Django?",
+     "Does the candidate have production experience with Java and Django?"),
+    ("Does the candidate have more than 5 years of backend experience?",
+     "Does the candidate have more than 10 years of backend experience?"),
+    ("Has the candidate deployed services on AWS?", "Has the candidate deployed services on GCP?"),
+]
+
+# Below every pair above with the offline embeddings, so only query_terms decides
+THRESHOLD = 0.75
+
+
+@pytest.fixture
+def embed_model():
+    return FakeEmbedding()
+
+
+def similarity(embed_model: FakeEmbedding, first: str, second: str) -> float:
+    return float(np.dot(embed_model.get_query_embedding(first),
+                        embed_model.get_query_embedding(second)))
+
+
+@pytest.mark.parametrize("cached_query,query", REWORDINGS)
+def test_rewording_hits(embed_model, cached_query, query):
+    cache = SemanticAnswerCache(threshold=THRESHOLD)
+    cache.store("cand-1", cached_query, "yes", embed_model.get_query_embedding(cached_query))
+    hit = cache.lookup("cand-1", embed_model.get_query_embedding(query), query=query)
+    assert hit is not None and hit["query"] == cached_query
+
+
+@pytest.mark.parametrize("cached_query,query", NEAR_MISSES)
+def test_near_miss_does_not_hit(embed_model, cached_query, query):
+    assert similarity(embed_model, cached_query, query) >= THRESHOLD
+    cache = SemanticAnswerCache(threshold=THRESHOLD)
+    cache.store("cand-1", cached_query, "yes", embed_model.get_query_embedding(cached_query))
+    assert cache.lookup("cand-1", embed_model.get_query_embedding(query), query=query) is None
+
+
+def test_changed_resume_drops_its_answers(embed_model):
+    cache = SemanticAnswerCache()
+    query = "Does the candidate know Python?"
+    cache.store("cand-1", query, "yes", embed_model.get_query_embedding(query), version="v1")
+    assert cache.lookup("cand-1", embed_model.get_query_embedding(query), "v2", query) is None
+    assert cache.stats()["entries"] == 0
+
+
+@pytest.fixture
+def pipeline(monkeypatch, embed_model):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-offline-test")
+    llm_registry.override("llm", FakeLLM())
+    llm_registry.override("embed_model", embed_model)
+    monkeypatch.setattr(resume_index, "_index_store", resume_index.ResumeIndexStore(backend="simple"))
+    monkeypatch.setattr(resume_store, "_resume_store", resume_store.ResumeStore())
+    monkeypatch.setattr(semantic_cache, "_semantic_cache", SemanticAnswerCache())
+    monkeypatch.setattr(semantic_cache, "_semantic_cache_loaded", True)
+    yield semantic_cache.get_semantic_cache()
+    llm_registry.reset("llm")
+    llm_registry.reset("embed_model")
+
+
+def test_direct_mode_skips_the_cache(pipeline, embed_model):
+    for _ in range(2):
+        result = resume_skill.query_resume_with_metadata(
+            resume_text=RESUME, query="Does the candidate know Python?", mode="direct")
+        assert result["query_mode"] == "direct"
+    assert embed_model.counters["calls"] == 0
+    assert pipeline.stats()["stores"] == 0
+
+
+def test_retrieval_mode_answers_repeats_from_the_cache(pipeline):
+    first = resume_skill.query_resume_with_metadata(
+        resume_text=RESUME, query="Does the candidate know Python?", mode="retrieval")
+    repeat = resume_skill.query_resume_with_metadata(
+        resume_text=RESUME, query="does the candidate know python", mode="retrieval")
+    near_miss = resume_skill.query_resume_with_metadata(
+        resume_text=RESUME, query="Does the candidate know Java?", mode="retrieval")
+    assert first["query_mode"] == "retrieval"
+    assert repeat["query_mode"] == "cache"
+    assert near_miss["query_mode"] == "retrieval"
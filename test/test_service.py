@@ -0,0 +1,61 @@
+""" Offline tests for the HTTP service's error mapping (400 / 404 / 500) """
+import asyncio
+from aiohttp.test_utils import TestClient, TestServer
+import pytest
+import resume_store
+import service
+from fakes import use_fake_backends
+
+
+@pytest.fixture(autouse=True)
+def backends(monkeypatch):
+    use_fake_backends()
+    monkeypatch.setattr(resume_store, "_resume_store", resume_store.ResumeStore())
+
+
+def call(method: str, path: str, **kwargs):
+    """Send one request to a fresh app; returns (status, JSON body)."""
+    async def run():
+        async with TestClient(TestServer(service.create_app(micro_batch_size=0))) as client:
+            response = await client.request(method, path, **kwargs)
+            return response.status, await response.json()
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("path,body,headers", [
+    ("/analyze", "not json", {}),
+    ("/analyze", [1, 2], {}),
+    ("/analyze", {"text": "  "}, {}),
+    ("/analyze", {"text": "Jane Doe", "resume_id": 42}, {}),
+    ("/query", {"query": "Python?"}, {}),
+    ("/query", {"text": "Jane Doe", "query": "Python?", "mode": "fast"}, {}),
+    ("/query", {"text": "Jane Doe", "query": "Python?"}, {"X-Priority": "urgent"}),
+    ("/search", {"top_k": "ten"}, {}),
+    ("/search", {"min_years": True}, {}),
+    ("/search", {"skills": [1]}, {}),
+    ("/search", {"role_type": "Astronaut"}, {}),
+    ("/agent", {"query": "Python?"}, {}),
+])
+def test_malformed_requests_are_400(path, body, headers):
+    kwargs = {"data": body} if isinstance(body, str) else {"json": body}
+    status, payload = call("POST", path, headers=headers, **kwargs)
+    assert status == 400, payload
+
+
+def test_unknown_resume_id_is_404():
+    for mode in ("direct", "retrieval"):
+        status, payload = call("POST", "/query", json={
+            "resume_id": "no-such-resume", "query": "Python?", "mode": mode})
+        assert status == 404
+        assert payload["error"] == "Unknown resume_id: no-such-resume"
+
+
+@pytest.mark.parametrize("error", [ValueError("bad state"), KeyError("missing"),
+                                   TypeError("bad call")])
+def test_internal_errors_are_500(monkeypatch, error):
+    def broken(*args, **kwargs):
+        raise error
+    monkeypatch.setattr(service, "search_candidates", broken)
+    status, payload = call("POST", "/search", json={"query": "python"})
+    assert status == 500
+    assert payload["error"].startswith(type(error).__name__)
@@ -0,0 +1,39 @@
+""" Text Normalization & Hashing Helpers """
+import hashlib
+import re
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so trivially re-formatted resumes hash identically.
+
+    Args:
+        text (str): Raw resume text.
+
+    Returns:
+        str: Stripped text with every whitespace run replaced by one space.
+    """
+    return _WHITESPACE_RE.sub(" ", text or "").strip()
+
+
+def content_hash(text: str, *versions: str) -> str:
+    """Return a SHA-256 hex digest of normalized text plus version tags.
+
+    Args:
+        text (str): Raw resume text.
+        *versions (str): Extra strings (prompt, model name, ...) mixed into the key.
+
+    Returns:
+        str: Hex digest identifying this exact content/version combination.
+    """
+    digest = hashlib.sha256(normalize_text(text).encode("utf-8"))
+    for version in versions:
+        digest.update(b"\x00")
+        digest.update(str(version).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def make_resume_id(text: str) -> str:
+    """Derive a short, stable resume ID from the resume content."""
+    return content_hash(text)[:16]
@@ -0,0 +1,282 @@
+""" Per-Stage Tracing, Token and Cost Instrumentation """
+import os
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import llm_registry
+
+logger = logging.getLogger(__name__)
+
+# USD per 1K tokens: (prompt, completion)
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-3.5-turbo": (0.0005, 0.0015),
+    "gpt-4o-mini": (0.00015, 0.0006),
+    "gpt-4o": (0.0025, 0.01),
+    "gpt-4-turbo": (0.01, 0.03),
+    "text-embedding-ada-002": (0.0001, 0.0),
+    "text-embedding-3-small": (0.00002, 0.0),
+    "text-embedding-3-large": (0.00013, 0.0),
+}
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int = 0) -> float:
+    """Estimated USD cost of a call; 0.0 for models without a known price."""
+    prices = MODEL_PRICES.get(model)
+    if prices is None:
+        prices = next((p for name, p in MODEL_PRICES.items() if model.startswith(name)), (0.0, 0.0))
+    return (prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1000.0
+
+
+def latency_percentiles(samples: Iterable[float],
+                        quantiles: Sequence[int] = (50, 95, 99)) -> Dict[str, Optional[float]]:
+    """``{"p50_ms": ..., ...}`` over latencies in seconds; values are None without samples."""
+    ordered = sorted(samples)
+    if not ordered:
+        return {f"p{q}_ms": None for q in quantiles}
+    return {f"p{q}_ms": round(ordered[int(q / 100 * (len(ordered) - 1))] * 1000, 3)
+            for q in quantiles}
+
+
+class Span:
+    """One timed stage inside a trace."""
+    __slots__ = ("name", "parent", "start", "end", "attributes")
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.name = name
+        self.parent = parent
+        self.start = time.time()
+        self.end: Optional[float] = None
+        self.attributes = attributes
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        """Elapsed milliseconds, or None while the span is open."""
+        return None if self.end is None else (self.end - self.start) * 1000.0
+
+    def set(self, **attributes: Any) -> None:
+        """Attach attributes (e.g. ``cache_hit=True``)."""
+        self.attributes.update(attributes)
+
+    def add_usage(self, model: str, prompt_tokens: int, completion_tokens: int) -> None:
+        """Accumulate token counts and estimated cost."""
+        attrs = self.attributes
+        attrs["prompt_tokens"] = attrs.get("prompt_tokens", 0) + prompt_tokens
+        attrs["completion_tokens"] = attrs.get("completion_tokens", 0) + completion_tokens
+        attrs["llm_calls"] = attrs.get("llm_calls", 0) + 1
+        attrs["cost_usd"] = attrs.get("cost_usd", 0.0) + estimate_cost(
+            model, prompt_tokens, completion_tokens)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Name, parent name, timing and attributes as a flat dict."""
+        return {
+            "name": self.name,
+            "parent": self.parent.name if self.parent else None,
+            "start": self.start,
+            "duration_ms": self.duration_ms,
+            **self.attributes,
+        }
+
+
+class Trace:
+    """All spans recorded for one pipeline call."""
+    def __init__(self, name: str):
+        self.name = name
+        self.root = Span(name, None, {})
+        self.spans: List[Span] = [self.root]
+
+    def totals(self) -> Dict[str, Any]:
+        """Token and cost totals across every span."""
+        totals = {"prompt_tokens": 0, "completion_tokens": 0, "llm_calls": 0, "cost_usd": 0.0}
+        for span in self.spans:
+            for key in totals:
+                totals[key] += span.attributes.get(key, 0)
+        return totals
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Duration, totals and every child span (root excluded) as a dict."""
+        return {
+            "name": self.name,
+            "duration_ms": self.root.duration_ms,
+            **self.totals(),
+            "spans": [span.to_dict() for span in self.spans[1:]],
+        }
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class _NullSpan:
+    """Shared no-op returned when tracing is off."""
+    __slots__ = ()
+
+    def set(self, **attributes: Any) -> None:
+        """Ignore attributes."""
+
+    def add_usage(self, model: str, prompt_tokens: int, completion_tokens: int) -> None:
+        """Ignore usage."""
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        return None
+
+
+NULL_SPAN = _NullSpan()
+
+
+class InMemoryExporter:
+    """Keeps the most recent traces as dicts (for tests and debugging)."""
+    def __init__(self, max_traces: int = 1000):
+        self._lock = threading.Lock()
+        self.traces: Deque[Dict[str, Any]] = deque(maxlen=max_traces)
+
+    def export(self, trace: Trace) -> None:
+        """Append the trace's dict form, dropping the oldest past max_traces."""
+        with self._lock:
+            self.traces.append(trace.to_dict())
+
+    def clear(self) -> None:
+        """Forget every kept trace."""
+        with self._lock:
+            self.traces.clear()
+
+
+class OpenTelemetryExporter:
+    """
+    Replays finished traces as OpenTelemetry spans.
+
+    Requires ``opentelemetry-api`` (plus an SDK/exporter configured by the
+    application); raises ImportError otherwise.
+    """
+    def __init__(self, tracer_name: str = "resume-pipeline"):
+        # pylint: disable=import-outside-toplevel
+        from opentelemetry import trace as otel_trace
+        self._otel = otel_trace
+        self._tracer = otel_trace.get_tracer(tracer_name)
+
+    def export(self, trace: Trace) -> None:
+        """Start and end one OpenTelemetry span per span, keeping the parent links."""
+        otel_spans: Dict[int, Any] = {}
+        for span in trace.spans:
+            parent = otel_spans.get(id(span.parent)) if span.parent else None
+            context = self._otel.set_span_in_context(parent) if parent is not None else None
+            otel_span = self._tracer.start_span(
+                span.name, context=context, start_time=int(span.start * 1e9),
+                attributes={k: v for k, v in span.attributes.items()
+                            if isinstance(v, (str, bool, int, float))},
+            )
+            otel_spans[id(span)] = otel_span
+        for span in reversed(trace.spans):
+            otel_spans[id(span)].end(end_time=int((span.end or span.start) * 1e9))
+
+
+class Tracer:
+    """
+    Entry point for pipeline instrumentation.
+
+    Disabled by default (``PIPELINE_TRACING=1`` enables it); when disabled,
+    ``trace`` yields None and ``span`` returns a shared no-op object, so the
+    only cost is one attribute check per stage.
+    """
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.exporters: List[Any] = []
+
+    def add_exporter(self, exporter: Any) -> None:
+        """Register an object with an ``export(trace)`` method."""
+        self.exporters.append(exporter)
+
+    @contextmanager
+    def trace(self, name: str) -> Iterator[Optional[Trace]]:
+        """Open a trace and yield it.
+
+        Nested inside another trace, this opens a child span instead and
+        yields None, so only the outermost call reports the trace.
+        """
+        if not self.enabled:
+            yield None
+            return
+        if _current_trace.get() is not None:
+            with self.span(name):
+                yield None
+            return
+
+        trace = Trace(name)
+        trace_token = _current_trace.set(trace)
+        span_token = _current_span.set(trace.root)
+        try:
+            yield trace
+        finally:
+            trace.root.end = time.time()
+            _current_span.reset(span_token)
+            _current_trace.reset(trace_token)
+            for exporter in self.exporters:
+                try:
+                    exporter.export(trace)
+                except Exception as e:  # pylint: disable=broad-except
+                    logger.warning("Trace exporter %s failed: %s", exporter, e)
+
+    def span(self, name: str, **attributes: Any):
+        """Context manager timing one stage of the active trace."""
+        if not self.enabled:
+            return NULL_SPAN
+        trace = _current_trace.get()
+        if trace is None:
+            return NULL_SPAN
+        return _SpanContext(trace, name, attributes)
+
+
+class _SpanContext:
+    __slots__ = ("trace", "span", "token")
+
+    def __init__(self, trace: Trace, name: str, attributes: Dict[str, Any]):
+        self.trace = trace
+        self.span = Span(name, _current_span.get(), attributes)
+        self.token = None
+
+    def __enter__(self) -> Span:
+        self.span.start = time.time()
+        self.trace.spans.append(self.span)
+        self.token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.span.end = time.time()
+        if exc is not None:
+            self.span.attributes["error"] = repr(exc)
+        _current_span.reset(self.token)
+
+
+def current_span():
+    """The innermost open span, or the no-op span when none is active."""
+    return _current_span.get() or NULL_SPAN
+
+
+def is_tracing() -> bool:
+    """True inside an active trace (lets callers skip costly bookkeeping)."""
+    return _current_span.get() is not None
+
+
+def record_llm_usage(model: str, prompt_tokens: int, completion_tokens: int) -> None:
+    """Attribute one LLM/embedding call's tokens to the innermost span."""
+    span = _current_span.get()
+    if span is not None:
+        span.add_usage(model, prompt_tokens, completion_tokens)
+
+
+_tracer: Optional[Tracer] = None
+
+
+def get_tracer() -> Tracer:
+    """Return the process-wide tracer, creating it on first use."""
+    global _tracer  # pylint: disable=global-statement
+    if _tracer is None:
+        llm_registry.load_env()
+        _tracer = Tracer(enabled=os.getenv("PIPELINE_TRACING", "0").lower() in ("1", "true", "yes"))
+    return _tracer